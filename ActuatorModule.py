@@ -0,0 +1,760 @@
+import collections
+import ctypes
+import ctypes.util
+import math
+import os
+import re
+import sys
+import threading
+import time
+
+# Backend calls a profiler can time, see ProfilerModule.Profiler.instrument
+BACKEND_METHODS = ("move", "click", "press", "release", "scroll", "flush")
+
+# One monitor's rectangle on the virtual desktop, in pixels; x and y may be negative
+Monitor = collections.namedtuple("Monitor", "x y width height")
+# Continuous scrolling that has coasted below this many detents per second stops
+SCROLL_STOP_RATE = 0.1
+
+
+class MouseBackend:
+    """
+    Base class of the mouse backends CursorActuator drives.
+
+    move, click, press, release and scroll may be buffered by the backend;
+    the actuator calls flush once per output tick, so a tick's events reach
+    the OS together. Buttons are "left", "right" or "middle".
+
+    Scroll amounts are in wheel detents and come in multiples of
+    1 / scrollResolution: whole detents unless the backend can inject
+    high-resolution wheel events.
+    """
+    scrollResolution = 1
+
+    def position(self):
+        """
+        Returns the cursor position, or None when the backend cannot read it.
+        """
+        return None
+
+    def size(self):
+        """
+        Returns the (width, height) of the screen if the backend knows it, otherwise None.
+        """
+        return None
+
+    def monitors(self):
+        """
+        Returns the list of Monitors if the backend knows the layout, otherwise None.
+        """
+        return None
+
+    def move(self, x, y):
+        raise NotImplementedError
+
+    def click(self, button):
+        self.press(button)
+        self.release(button)
+
+    def press(self, button):
+        raise NotImplementedError
+
+    def release(self, button):
+        raise NotImplementedError
+
+    def scroll(self, dx, dy):
+        raise NotImplementedError
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class PynputBackend(MouseBackend):
+    """
+    Mouse backend on top of pynput.
+    """
+    def __init__(self):
+        from pynput.mouse import Button, Controller
+        self.mouse = Controller()
+        self.buttons = {"left": Button.left, "right": Button.right, "middle": Button.middle}
+
+    def position(self):
+        return self.mouse.position
+
+    def move(self, x, y):
+        self.mouse.position = (x, y)
+
+    def click(self, button):
+        self.mouse.click(self.buttons[button])
+
+    def press(self, button):
+        self.mouse.press(self.buttons[button])
+
+    def release(self, button):
+        self.mouse.release(self.buttons[button])
+
+    def scroll(self, dx, dy):
+        self.mouse.scroll(dx, dy)
+
+
+class PyAutoGUIBackend(MouseBackend):
+    """
+    Mouse backend on top of pyautogui, with its per-call pause and fail-safe turned off.
+    """
+    def __init__(self):
+        import pyautogui
+        pyautogui.PAUSE = 0
+        pyautogui.FAILSAFE = False
+        self.pyautogui = pyautogui
+
+    def position(self):
+        return tuple(self.pyautogui.position())
+
+    def size(self):
+        return tuple(self.pyautogui.size())
+
+    def move(self, x, y):
+        self.pyautogui.moveTo(x, y, _pause=False)
+
+    def click(self, button):
+        self.pyautogui.click(button=button, _pause=False)
+
+    def press(self, button):
+        self.pyautogui.mouseDown(button=button, _pause=False)
+
+    def release(self, button):
+        self.pyautogui.mouseUp(button=button, _pause=False)
+
+    def scroll(self, dx, dy):
+        if dy:
+            self.pyautogui.scroll(dy, _pause=False)
+        if dx:
+            self.pyautogui.hscroll(dx, _pause=False)
+
+
+class PyMouseBackend(MouseBackend):
+    """
+    Mouse backend on top of PyUserInput's pymouse.
+    """
+    BUTTONS = {"left": 1, "right": 2, "middle": 3}
+
+    def __init__(self):
+        from pymouse import PyMouse
+        self.mouse = PyMouse()
+
+    def position(self):
+        return tuple(self.mouse.position())
+
+    def size(self):
+        return tuple(self.mouse.screen_size())
+
+    def move(self, x, y):
+        self.mouse.move(x, y)
+
+    def click(self, button):
+        x, y = self.mouse.position()
+        self.mouse.click(x, y, self.BUTTONS[button])
+
+    def press(self, button):
+        x, y = self.mouse.position()
+        self.mouse.press(x, y, self.BUTTONS[button])
+
+    def release(self, button):
+        x, y = self.mouse.position()
+        self.mouse.release(x, y, self.BUTTONS[button])
+
+    def scroll(self, dx, dy):
+        self.mouse.scroll(vertical=dy or None, horizontal=dx or None)
+
+
+class XTestBackend(MouseBackend):
+    """
+    Linux X11 backend injecting events through the XTEST extension (python-xlib).
+    Events are buffered by Xlib and sent with one flush per output tick.
+    """
+    BUTTONS = {"left": 1, "middle": 2, "right": 3}
+
+    def __init__(self):
+        from Xlib import X, display
+        from Xlib.ext import xtest
+        self.X = X
+        self.xtest = xtest
+        self.display = display.Display()
+        if not self.display.has_extension("XTEST"):
+            raise OSError("The X server has no XTEST extension")
+        self.screen = self.display.screen()
+
+    def position(self):
+        pointer = self.screen.root.query_pointer()
+        return pointer.root_x, pointer.root_y
+
+    def size(self):
+        return self.screen.width_in_pixels, self.screen.height_in_pixels
+
+    def monitors(self):
+        if not self.display.has_extension("RANDR"):
+            return None
+        from Xlib.ext import randr
+        reply = randr.get_monitors(self.screen.root, is_active=True)
+        return [Monitor(m.x, m.y, m.width_in_pixels, m.height_in_pixels) for m in reply.monitors] or None
+
+    def move(self, x, y):
+        self.xtest.fake_input(self.display, self.X.MotionNotify, x=int(x), y=int(y))
+
+    def press(self, button):
+        self.xtest.fake_input(self.display, self.X.ButtonPress, self.BUTTONS[button])
+
+    def release(self, button):
+        self.xtest.fake_input(self.display, self.X.ButtonRelease, self.BUTTONS[button])
+
+    def scroll(self, dx, dy):
+        # X11 scrolls in button clicks: 4/5 up/down, 6/7 left/right
+        for amount, positive, negative in ((dy, 4, 5), (dx, 7, 6)):
+            button = positive if amount > 0 else negative
+            for _ in range(abs(int(amount))):
+                self.xtest.fake_input(self.display, self.X.ButtonPress, button)
+                self.xtest.fake_input(self.display, self.X.ButtonRelease, button)
+
+    def flush(self):
+        self.display.flush()
+
+    def close(self):
+        self.display.close()
+
+
+class UInputBackend(MouseBackend):
+    """
+    Linux backend writing to a virtual absolute pointer through /dev/uinput
+    (python-evdev), so it works under Wayland and on the console. Events
+    are written as they come and reported to the kernel with one SYN per
+    output tick. Needs write access to /dev/uinput.
+
+    Parameters:
+    size (tuple): Screen (width, height) the absolute axes map onto.
+    """
+    def __init__(self, size):
+        from evdev import AbsInfo, UInput, ecodes
+        self.ecodes = ecodes
+        self.buttons = {"left": ecodes.BTN_LEFT, "right": ecodes.BTN_RIGHT, "middle": ecodes.BTN_MIDDLE}
+        self._size = tuple(size)
+        width, height = self._size
+        # High-resolution wheels (Linux 5.0+) report 120 units per detent
+        self.wheels = {"y": (ecodes.REL_WHEEL, getattr(ecodes, "REL_WHEEL_HI_RES", None)),
+                       "x": (ecodes.REL_HWHEEL, getattr(ecodes, "REL_HWHEEL_HI_RES", None))}
+        hiRes = [code for _, code in self.wheels.values() if code is not None]
+        self.scrollResolution = 120 if hiRes else 1
+        capabilities = {
+            ecodes.EV_KEY: list(self.buttons.values()),
+            ecodes.EV_ABS: [(ecodes.ABS_X, AbsInfo(0, 0, width - 1, 0, 0, 0)),
+                            (ecodes.ABS_Y, AbsInfo(0, 0, height - 1, 0, 0, 0))],
+            ecodes.EV_REL: [ecodes.REL_WHEEL, ecodes.REL_HWHEEL] + hiRes,
+        }
+        self.device = UInput(capabilities, name="hand-gesture-mouse")
+        self._position = None
+        self._pending = False
+        self._detents = {"x": 0.0, "y": 0.0}  # high-resolution travel not reported as a whole detent yet
+
+    def position(self):
+        return self._position
+
+    def size(self):
+        return self._size
+
+    def _write(self, type, code, value):
+        self.device.write(type, code, value)
+        self._pending = True
+
+    def move(self, x, y):
+        self._position = (x, y)
+        self._write(self.ecodes.EV_ABS, self.ecodes.ABS_X, int(x))
+        self._write(self.ecodes.EV_ABS, self.ecodes.ABS_Y, int(y))
+
+    def click(self, button):
+        # Press and release in one report would be merged away, so they get one each
+        self.press(button)
+        self.flush()
+        self.release(button)
+
+    def press(self, button):
+        self._write(self.ecodes.EV_KEY, self.buttons[button], 1)
+
+    def release(self, button):
+        self._write(self.ecodes.EV_KEY, self.buttons[button], 0)
+
+    def scroll(self, dx, dy):
+        for axis, amount in (("y", dy), ("x", dx)):
+            if not amount:
+                continue
+            wheel, hiRes = self.wheels[axis]
+            if hiRes is None:
+                self._write(self.ecodes.EV_REL, wheel, int(amount))
+                continue
+            self._write(self.ecodes.EV_REL, hiRes, round(amount * 120))
+            # Clients that only read the classic wheel get a detent whenever the travel adds up to one
+            self._detents[axis] += amount
+            whole = int(self._detents[axis])
+            if whole:
+                self._write(self.ecodes.EV_REL, wheel, whole)
+                self._detents[axis] -= whole
+
+    def flush(self):
+        if self._pending:
+            self.device.syn()
+            self._pending = False
+
+    def close(self):
+        self.device.close()
+
+
+class RecordingBackend(MouseBackend):
+    """
+    Backend that injects nothing and records every call, for benchmarks,
+    tests and headless runs.
+
+    Parameters:
+    size (tuple): Screen (width, height) it reports.
+    maxEvents (int): Most recent calls kept in self.events as (t, name, args).
+    scrollResolution (int): Scroll steps per detent it accepts, like a high-resolution wheel.
+    """
+    def __init__(self, size=(1920, 1080), maxEvents=10000, scrollResolution=120):
+        self._size = tuple(size)
+        self.scrollResolution = scrollResolution
+        self._position = (0, 0)
+        self.events = collections.deque(maxlen=maxEvents)
+        self.counts = collections.Counter()
+        self.flushes = 0
+
+    def _record(self, name, *args):
+        self.events.append((time.perf_counter(), name, args))
+        self.counts[name] += 1
+
+    def position(self):
+        return self._position
+
+    def size(self):
+        return self._size
+
+    def move(self, x, y):
+        self._position = (x, y)
+        self._record("move", x, y)
+
+    def click(self, button):
+        self._record("click", button)
+
+    def press(self, button):
+        self._record("press", button)
+
+    def release(self, button):
+        self._record("release", button)
+
+    def scroll(self, dx, dy):
+        self._record("scroll", dx, dy)
+
+    def flush(self):
+        self.flushes += 1
+
+
+BACKENDS = {
+    "xtest": XTestBackend,
+    "uinput": UInputBackend,
+    "pynput": PynputBackend,
+    "pymouse": PyMouseBackend,
+    "pyautogui": PyAutoGUIBackend,
+    "record": RecordingBackend,
+}
+
+
+def _auto_backends():
+    if sys.platform.startswith("linux"):
+        names = ["xtest"] if os.environ.get("DISPLAY") else []
+        return names + ["uinput", "pynput", "pymouse", "pyautogui"]
+    return ["pynput", "pymouse", "pyautogui"]
+
+
+def create_backend(name="auto", size=None):
+    """
+    Creates a mouse backend by name from BACKENDS. "auto" takes the first one
+    that loads on this platform: XTEST or uinput on Linux, then pynput,
+    pymouse and pyautogui.
+
+    Parameters:
+    name (str): Backend name or "auto".
+    size (tuple): Screen (width, height) for backends that need it, queried when not given.
+    """
+    if name != "auto":
+        if name == "uinput":
+            return UInputBackend(size or screen_size())
+        return BACKENDS[name]()
+    errors = []
+    for candidate in _auto_backends():
+        try:
+            return create_backend(candidate, size)
+        except (ImportError, OSError) as e:
+            errors.append(f"{candidate}: {e}")
+    raise OSError("No mouse backend available (" + "; ".join(errors) + ")")
+
+
+def _library(name):
+    path = ctypes.util.find_library(name)
+    if path is None:
+        raise OSError(f"lib{name} not found")
+    return ctypes.cdll.LoadLibrary(path)
+
+
+def screen_size(backend=None):
+    """
+    Returns the (width, height) of the primary screen in pixels. Query it once
+    at start-up: the backend is asked first, then the platform (Win32,
+    CoreGraphics or Xlib, through ctypes so no extra package is needed).
+    """
+    size = backend.size() if backend is not None else None
+    if size:
+        return tuple(size)
+    if sys.platform == "win32":
+        user32 = ctypes.windll.user32
+        user32.SetProcessDPIAware()
+        return user32.GetSystemMetrics(0), user32.GetSystemMetrics(1)
+    if sys.platform == "darwin":
+        cg = _library("CoreGraphics")
+        cg.CGMainDisplayID.restype = ctypes.c_uint32
+        cg.CGDisplayPixelsWide.restype = cg.CGDisplayPixelsHigh.restype = ctypes.c_size_t
+        cg.CGDisplayPixelsWide.argtypes = cg.CGDisplayPixelsHigh.argtypes = [ctypes.c_uint32]
+        display = cg.CGMainDisplayID()
+        return cg.CGDisplayPixelsWide(display), cg.CGDisplayPixelsHigh(display)
+
+    x11 = _library("X11")
+    x11.XOpenDisplay.restype = ctypes.c_void_p
+    x11.XOpenDisplay.argtypes = [ctypes.c_char_p]
+    x11.XDefaultScreen.argtypes = [ctypes.c_void_p]
+    x11.XDisplayWidth.argtypes = x11.XDisplayHeight.argtypes = [ctypes.c_void_p, ctypes.c_int]
+    x11.XCloseDisplay.argtypes = [ctypes.c_void_p]
+    display = x11.XOpenDisplay(None)
+    if not display:
+        raise OSError("Cannot open the X display to read the screen size")
+    try:
+        screen = x11.XDefaultScreen(display)
+        return x11.XDisplayWidth(display, screen), x11.XDisplayHeight(display, screen)
+    finally:
+        x11.XCloseDisplay(display)
+
+
+def _win32_monitors():
+    import ctypes.wintypes
+    user32 = ctypes.windll.user32
+    user32.SetProcessDPIAware()
+    found = []
+
+    def add(handle, dc, rect, data):
+        r = rect.contents
+        found.append(Monitor(r.left, r.top, r.right - r.left, r.bottom - r.top))
+        return 1
+
+    callback = ctypes.WINFUNCTYPE(ctypes.c_int, ctypes.c_void_p, ctypes.c_void_p,
+                                  ctypes.POINTER(ctypes.wintypes.RECT), ctypes.c_void_p)(add)
+    user32.EnumDisplayMonitors(None, None, callback, None)
+    return found
+
+
+def parse_monitors(text):
+    """
+    Parses a monitor layout given as comma separated WIDTHxHEIGHT+X+Y
+    rectangles, e.g. "1920x1080+0+0,2560x1440+1920+0".
+    """
+    layout = []
+    for item in text.split(","):
+        match = re.fullmatch(r"(\d+)x(\d+)(?:([+-]\d+)([+-]\d+))?", item.strip())
+        if match is None:
+            raise ValueError(f"Bad monitor {item!r}, expected WIDTHxHEIGHT+X+Y")
+        width, height, x, y = match.groups()
+        layout.append(Monitor(int(x or 0), int(y or 0), int(width), int(height)))
+    return layout
+
+
+def monitors(backend=None):
+    """
+    Returns the layout of every monitor on the virtual desktop as a list of
+    Monitors, primary first where the platform says which it is. The backend
+    is asked first (XRandR through python-xlib), then the optional screeninfo
+    package, then Win32; a single monitor of screen_size is the fallback.
+    """
+    layout = backend.monitors() if backend is not None else None
+    if layout:
+        return list(layout)
+    try:
+        import screeninfo
+        layout = [Monitor(m.x, m.y, m.width, m.height)
+                  for m in sorted(screeninfo.get_monitors(), key=lambda m: not m.is_primary)]
+    except Exception:
+        layout = None
+    if not layout and sys.platform == "win32":
+        layout = _win32_monitors()
+    if layout:
+        return layout
+    return [Monitor(0, 0, *screen_size(backend))]
+
+
+class CursorActuator:
+    """
+    Drives the mouse from a dedicated thread so the vision loop never blocks on it.
+
+    Cursor targets are interpolated at a fixed output rate, independent of the
+    camera FPS, and a new target supersedes the previous one instead of
+    queueing behind it. Clicks, presses, releases and scrolls are queued
+    fire-and-forget events that run in order on the next output tick, with
+    back-to-back scrolls merged, and the backend is flushed once per tick.
+
+    Continuous motion is integrated on every tick, so it is as smooth as the
+    output rate whatever the camera FPS: track() extrapolates the cursor
+    along a velocity between targets, and scrollVelocity() scrolls at a rate,
+    optionally coasting down exponentially. Scroll travel is emitted in the
+    backend's scroll resolution, with the remainder carried to later ticks.
+
+    Parameters:
+    backend (MouseBackend): Backend that injects the events, see create_backend.
+    rate (int): Output rate in Hz.
+    duration (float): Default time, in seconds, to glide to a new target.
+    """
+    def __init__(self, backend, rate=200, duration=0.02):
+        self.backend = backend
+        self.period = 1.0 / rate
+        self.duration = duration
+
+        self._cond = threading.Condition()
+        self._events = collections.deque()
+        self._start = None
+        self._target = None
+        self._tStart = 0.0
+        self._moveDuration = duration
+        self._position = None
+        self._velocity = None      # (vx, vy) pixels per second the target moves at, see track
+        self._horizon = 0.0
+        self._scrollVelocity = None
+        self._scrollDecay = None
+        self._tScroll = 0.0
+        # Scroll travel below the backend's resolution, kept per path so stopping the
+        # continuous scroll does not drop what scroll() calls left over
+        self._scrollCarry = [0.0, 0.0]
+        self._velocityCarry = [0.0, 0.0]
+        self._thread = None
+        self.running = False
+
+        self.moves = 0
+        self.coalesced = 0
+        self.scrollsCoalesced = 0
+        self.scrollTicks = 0
+
+    def start(self):
+        """
+        Starts the output thread.
+        """
+        if self._thread is not None:
+            return self
+        self.running = True
+        self._thread = threading.Thread(target=self._loop, name="actuator", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """
+        Runs the pending events and stops the output thread.
+        """
+        with self._cond:
+            self.running = False
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+
+    def clear(self):
+        """
+        Drops the queued events without running them, e.g. on an actuator that was never
+        started. Returns how many were dropped.
+        """
+        with self._cond:
+            dropped = len(self._events)
+            self._events.clear()
+            return dropped
+
+    def moveTo(self, x, y, duration=None):
+        """
+        Glides the cursor to (x, y), replacing any target that was not reached yet.
+        """
+        with self._cond:
+            if self._target is not None:
+                self.coalesced += 1
+            self._start = self._position
+            self._target = (float(x), float(y))
+            self._velocity = None
+            self._tStart = time.perf_counter()
+            self._moveDuration = self.duration if duration is None else duration
+            self._cond.notify()
+
+    def track(self, x, y, vx, vy, horizon=0.05):
+        """
+        Moves the cursor to (x, y) and keeps it moving at (vx, vy) pixels per second
+        on every tick, for at most horizon seconds or until the next track or moveTo.
+        """
+        with self._cond:
+            if self._target is not None:
+                self.coalesced += 1
+            self._start = None
+            self._target = (float(x), float(y))
+            self._velocity = (float(vx), float(vy))
+            self._horizon = horizon
+            self._tStart = time.perf_counter()
+            self._cond.notify()
+
+    def scrollVelocity(self, vx, vy, decay=None):
+        """
+        Scrolls continuously at (vx, vy) detents per second until the next call.
+        With decay, the rate falls off exponentially with that time constant in
+        seconds, so a released scroll coasts to a stop. (0, 0) stops scrolling.
+        """
+        with self._cond:
+            if vx == 0 and vy == 0:
+                self._scrollVelocity = None
+                self._velocityCarry = [0.0, 0.0]
+                return
+            if self._scrollVelocity is None:
+                self._tScroll = time.perf_counter()
+            self._scrollVelocity = (float(vx), float(vy))
+            self._scrollDecay = decay
+            self._cond.notify()
+
+    @property
+    def scrolling(self):
+        return self._scrollVelocity is not None
+
+    def click(self, button="left"):
+        self._push("click", button)
+
+    def press(self, button="left"):
+        self._push("press", button)
+
+    def release(self, button="left"):
+        self._push("release", button)
+
+    def scroll(self, dx, dy):
+        self._push("scroll", dx, dy)
+
+    def _push(self, name, *args):
+        with self._cond:
+            self._events.append((name, args))
+            self._cond.notify()
+
+    def _step(self, now):
+        # Cursor position for this tick, or None once the target was reached
+        if self._velocity is not None:
+            elapsed = min(now - self._tStart, self._horizon)
+            (x, y), (vx, vy) = self._target, self._velocity
+            if elapsed >= self._horizon:
+                self._target = None
+            return x + vx * elapsed, y + vy * elapsed
+        if self._start is None or self._moveDuration <= 0:
+            alpha = 1.0
+        else:
+            alpha = min((now - self._tStart) / self._moveDuration, 1.0)
+        (x0, y0), (x1, y1) = self._start or self._target, self._target
+        position = (x0 + (x1 - x0) * alpha, y0 + (y1 - y0) * alpha)
+        if alpha >= 1.0:
+            self._target = None
+        return position
+
+    def _integrate(self, now):
+        # Scroll travel since the last tick; with a decay the rate coasts down, integrated exactly
+        (vx, vy), dt = self._scrollVelocity, now - self._tScroll
+        self._tScroll = now
+        if not self._scrollDecay:
+            return vx * dt, vy * dt
+        keep = math.exp(-dt / self._scrollDecay)
+        travel = self._scrollDecay * (1.0 - keep)
+        if max(abs(vx), abs(vy)) * keep < SCROLL_STOP_RATE:
+            self._scrollVelocity = None
+        else:
+            self._scrollVelocity = (vx * keep, vy * keep)
+        return vx * travel, vy * travel
+
+    def _quantize(self, dx, dy, carry):
+        # Travel the backend can express, whole detents or hi-res steps; the rest carries over
+        resolution = getattr(self.backend, "scrollResolution", 1)
+        carry[0] += dx
+        carry[1] += dy
+        steps = [math.trunc(c * resolution) for c in carry]
+        carry[0] -= steps[0] / resolution
+        carry[1] -= steps[1] / resolution
+        if resolution == 1:
+            return steps[0], steps[1]
+        return steps[0] / resolution, steps[1] / resolution
+
+    def _batch(self, events):
+        # Scrolls queued back to back within one tick become one scroll of their total
+        batch = []
+        for name, args in events:
+            if name == "scroll" and batch and batch[-1][0] == "scroll":
+                (dx, dy), (ddx, ddy) = batch[-1][1], args
+                batch[-1] = ("scroll", (dx + ddx, dy + ddy))
+                self.scrollsCoalesced += 1
+            else:
+                batch.append((name, args))
+        return batch
+
+    def _loop(self):
+        try:
+            self._position = tuple(self.backend.position())
+        except Exception:
+            self._position = None
+
+        nextTick = time.perf_counter()
+        while True:
+            with self._cond:
+                if (self.running and not self._events and self._target is None
+                        and self._scrollVelocity is None):
+                    self._cond.wait()
+                    nextTick = time.perf_counter()
+                events = list(self._events)
+                self._events.clear()
+                now = time.perf_counter()
+                position = self._step(now) if self._target is not None else None
+                if position is not None:
+                    self._position = position
+                travel = None
+                if self._scrollVelocity is not None:
+                    travel = self._quantize(*self._integrate(now), self._velocityCarry)
+                    self.scrollTicks += 1
+                running = self.running
+
+            if position is not None:
+                try:
+                    self.backend.move(int(position[0]), int(position[1]))
+                    self.moves += 1
+                except Exception as e:
+                    print(f"Error setting cursor position {position}: {e}")
+            batch = [(name, self._quantize(*args, self._scrollCarry) if name == "scroll" else args)
+                     for name, args in self._batch(events)]
+            if travel is not None:
+                batch.append(("scroll", travel))
+            for name, args in batch:
+                if name == "scroll" and not any(args):
+                    continue
+                try:
+                    getattr(self.backend, name)(*args)
+                except Exception as e:
+                    print(f"Error running mouse {name}{args}: {e}")
+            if position is not None or batch:
+                try:
+                    self.backend.flush()
+                except Exception as e:
+                    print(f"Error flushing mouse events: {e}")
+
+            if not running:
+                break
+
+            nextTick += self.period
+            delay = nextTick - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                nextTick = time.perf_counter()
@@ -0,0 +1,273 @@
+import argparse
+import json
+import platform
+import subprocess
+import time
+import tracemalloc
+import numpy as np
+import HandTrackingModule as htm
+import MouseController2 as mc2
+from TraceModule import TraceRecord, TraceReplay, ReplayDetector
+from OverlayModule import Overlay
+from ActuatorModule import CursorActuator, RecordingBackend
+from GestureModule import GestureEngine, ENTER
+
+# An upright open right hand in normalized image coordinates (x, y, z)
+HAND_TEMPLATE = np.array([
+    (0.50, 0.80, 0.00),
+    (0.44, 0.75, -0.01), (0.40, 0.69, -0.02), (0.37, 0.64, -0.03), (0.34, 0.60, -0.04),
+    (0.45, 0.58, -0.02), (0.44, 0.50, -0.03), (0.44, 0.45, -0.04), (0.44, 0.40, -0.05),
+    (0.50, 0.57, -0.02), (0.50, 0.48, -0.03), (0.50, 0.43, -0.04), (0.50, 0.38, -0.05),
+    (0.55, 0.59, -0.02), (0.56, 0.51, -0.03), (0.56, 0.46, -0.04), (0.57, 0.42, -0.05),
+    (0.60, 0.62, -0.02), (0.62, 0.56, -0.03), (0.63, 0.52, -0.04), (0.64, 0.49, -0.05),
+], np.float32)
+
+# Finger poses cycled through by the synthetic fixture, thumb first: 0 folded, 1 raised,
+# 2 half-closed. In order they enter every gesture of gestures.json: move, leftClick,
+# rightClick, drag and scroll, then an open hand and a fist that match none
+POSES = [[0, 1, 0, 0, 0], [0, 2, 0, 0, 0], [0, 1, 1, 0, 0], [0, 1, 0, 0, 1], [0, 1, 1, 1, 0], [1, 1, 1, 1, 1],
+         [0, 0, 0, 0, 0]]
+
+
+def synthetic_records(frames=600, size=(640, 480), fps=30, seed=0):
+    """
+    Builds a landmark-only fixture: the template hand drifting across the frame,
+    cycling through the gesture poses every second, with landmark noise.
+    """
+    rng = np.random.default_rng(seed)
+    w, h = size
+    records = []
+    for i in range(frames):
+        hand = HAND_TEMPLATE.copy()
+        pose = POSES[(i // fps) % len(POSES)]
+        for finger, state in enumerate(pose[1:], start=1):
+            tip = htm.TIP_IDS[finger]
+            if state == 0:
+                hand[tip, 1] = hand[tip - 3, 1] + 0.02
+            elif state == 2:
+                # Fingertip halfway between the knuckle and the DIP joint
+                hand[tip, 1] = (hand[tip - 3, 1] + hand[tip - 1, 1]) / 2
+        if not pose[0]:
+            # Thumb tucked across the palm onto the folded middle and ring fingertips, for drag
+            hand[4, :2] = (hand[12, 0] + hand[16, 0]) / 2, (hand[12, 1] + hand[16, 1]) / 2
+        if pose[1] and pose[2]:
+            # Bring index and middle tips together for the click/scroll distance checks
+            hand[12, 0] = hand[8, 0] + 0.01
+            if pose[3]:
+                # and the ring tip to the middle one for scroll
+                hand[16, 0] = hand[12, 0] + 0.01
+        hand[:, 0] += 0.1 * np.sin(i / fps)
+        hand[:, :2] += rng.normal(0, 0.002, (htm.NUM_LANDMARKS, 2))
+        hand[:, :2] *= (w, h)
+        records.append(TraceRecord(i / fps, i, size, hand[None], np.array([True]), np.array([0.95], np.float32)))
+    return records
+
+
+def gesture_coverage(records, gestures="gestures.json"):
+    """
+    Replays records through a GestureEngine and returns {gesture name: times entered}
+    for every gesture it defines, so a fixture can be checked to exercise them all.
+    """
+    replay = TraceReplay(records=records)
+    detector = ReplayDetector(replay, maxHands=1)
+    engine = GestureEngine.load(gestures)
+    entered = {gesture.name: 0 for gesture in engine.gestures}
+    while True:
+        success, img = replay.read()
+        if not success:
+            return entered
+        detector.findHands(img, draw=False)
+        detector.evaluateHands()
+        for event in engine.update(detector, t=img.record.t):
+            if event.kind == ENTER:
+                entered[event.gesture.name] += 1
+
+
+def percentiles(samples):
+    samples = np.asarray(samples, float)
+    p50, p95, p99 = np.percentile(samples, (50, 95, 99))
+    return {
+        "p50_us": p50 / 1e3,
+        "p95_us": p95 / 1e3,
+        "p99_us": p99 / 1e3,
+        "mean_us": samples.mean() / 1e3,
+        "throughput_per_s": 1e9 / samples.mean() if samples.mean() else 0.0,
+    }
+
+
+def build_steps(detector, controller, state):
+    """
+    Returns the ordered (name, callable) steps run on every frame. state["img"]
+    holds the current frame, state["t"] its capture time, and the steps pass their
+    results along in state.
+    """
+    engine = GestureEngine.load("gestures.json")
+
+    def findHands():
+        detector.findHands(state["img"], draw=False)
+
+    def findPosition():
+        state["lmList"], _ = detector.findPosition(state["img"], draw=False)
+
+    def fingersUp():
+        state["fingers"] = detector.fingersUp()
+
+    def fingersHalfClosed():
+        state["folded"] = detector.fingersHalfClosed()
+
+    def findDistance():
+        if state["lmList"]:
+            detector.findDistance(8, 12, state["img"], draw=False)
+
+    def recognize():
+        detector.evaluateHands()
+        state["events"] = engine.update(detector, t=state["t"])
+
+    def dispatch():
+        entered = any(event.kind == ENTER for event in state["events"])
+        mc2.dispatch_gesture(state["img"], detector, controller, engine.current, state["lmList"], entered,
+                             state["t"], seen=engine.matched is engine.current)
+
+    return [("findHands", findHands), ("findPosition", findPosition), ("fingersUp", fingersUp),
+            ("fingersHalfClosed", fingersHalfClosed), ("findDistance", findDistance), ("recognize", recognize),
+            ("dispatch", dispatch)]
+
+
+def run_benchmark(replay, detector, repeat=3, warmup=30):
+    """
+    Times every step over all frames of the replay and measures, in a separate
+    tracemalloc pass, the peak bytes each step allocates during a frame.
+    """
+    # Detection and dispatch are timed as pure data, without drawing
+    detector.overlay = Overlay(enabled=False)
+    # Dispatch pays for queueing mouse events on the actuator; its output thread is not
+    # started, so the timings do not depend on when it wakes up, and the queue is cleared
+    # between frames so it does not grow over the run
+    actuator = CursorActuator(RecordingBackend(), duration=0)
+    controller = mc2.MouseController(actuator=actuator, overlay=detector.overlay)
+    state = {}
+    steps = build_steps(detector, controller, state)
+    timings = {name: [] for name, _ in steps}
+    peaks = {name: [] for name, _ in steps}
+
+    frames = []
+    while True:
+        success, img = replay.read()
+        if not success:
+            break
+        frames.append(img)  # a ReplayFrame, carrying its record
+
+    # Gestures and motion run on the trace's clock rather than the much faster benchmark's,
+    # so holds, debounces and velocities behave as they did live; every pass continues it
+    clock = {"offset": 0.0}
+
+    def frames_in_order(limit=None):
+        start, t = frames[0].record.t, clock["offset"]
+        for img in frames[:limit]:
+            actuator.clear()
+            t = clock["offset"] + img.record.t - start
+            state["img"], state["t"] = img, t
+            yield
+        clock["offset"] = t + 1.0
+
+    for _ in frames_in_order(warmup):
+        for _, step in steps:
+            step()
+
+    for _ in range(repeat):
+        for _ in frames_in_order():
+            for name, step in steps:
+                start = time.perf_counter_ns()
+                step()
+                timings[name].append(time.perf_counter_ns() - start)
+
+    tracemalloc.start()
+    for _ in frames_in_order():
+        for name, step in steps:
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+            step()
+            peaks[name].append(tracemalloc.get_traced_memory()[1] - base)
+    tracemalloc.stop()
+
+    results = {}
+    for name, samples in timings.items():
+        results[name] = percentiles(samples)
+        results[name]["peak_alloc_bytes"] = float(np.mean(peaks[name]))
+    results["frame"] = percentiles(np.sum(list(timings.values()), axis=0))
+    return results, len(frames)
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(basePath, newResults):
+    """
+    Prints the p50/p95 change of every step against a previous results file.
+    """
+    with open(basePath) as f:
+        base = json.load(f)["results"]
+    print(f"{'step':20s} {'p50 before':>11s} {'p50 after':>10s} {'p95 change':>11s}")
+    for name, result in newResults.items():
+        if name not in base:
+            continue
+        before = base[name]
+        change = (result["p95_us"] / before["p95_us"] - 1) * 100 if before["p95_us"] else 0.0
+        print(f"{name:20s} {before['p50_us']:9.1f}us {result['p50_us']:8.1f}us {change:+10.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless benchmark of the detection and gesture hot paths")
+    parser.add_argument("--trace", help="TraceModule recording; a synthetic landmark fixture is used when omitted")
+    parser.add_argument("--inference", action="store_true",
+                        help="Run MediaPipe on the trace's recorded frames instead of replaying its landmarks")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", help="Write machine-readable results to this JSON file")
+    parser.add_argument("--compare", help="Previous JSON results to compare against")
+    args = parser.parse_args()
+
+    if args.trace:
+        replay = TraceReplay(args.trace)
+    else:
+        records = synthetic_records()
+        missed = [name for name, count in gesture_coverage(records).items() if not count]
+        if missed:
+            raise SystemExit(f"The synthetic fixture never enters {', '.join(missed)}")
+        replay = TraceReplay(records=records)
+    detector = htm.handDetector(maxHands=1) if args.inference else ReplayDetector(replay, maxHands=1)
+
+    results, frames = run_benchmark(replay, detector, args.repeat)
+    for name, result in results.items():
+        # tracemalloc measures the peak bytes a step holds during a frame, not its allocation count
+        peak = f"  peak {result['peak_alloc_bytes']:8.0f} B" if "peak_alloc_bytes" in result else ""
+        print(f"{name:18s} p50 {result['p50_us']:8.1f}us  p95 {result['p95_us']:8.1f}us  "
+              f"p99 {result['p99_us']:8.1f}us  {result['throughput_per_s']:10.0f}/s{peak}")
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "fixture": args.trace or "synthetic",
+            "inference": args.inference,
+            "frames": frames,
+            "repeat": args.repeat,
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        compare(args.compare, results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,240 @@
+import glob
+import os
+import time
+import cv2
+from PipelineModule import StageStats
+
+# Capture backends by name, for platforms where the default pick is slow or buffers deeply
+BACKENDS = {
+    "any": cv2.CAP_ANY,
+    "v4l2": cv2.CAP_V4L2,
+    "dshow": cv2.CAP_DSHOW,
+    "msmf": cv2.CAP_MSMF,
+    "avfoundation": cv2.CAP_AVFOUNDATION,
+    "gstreamer": cv2.CAP_GSTREAMER,
+    "ffmpeg": cv2.CAP_FFMPEG,
+}
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+
+
+def fourcc_name(code):
+    """
+    Decodes a CAP_PROP_FOURCC value into its four-character name.
+    """
+    code = int(code)
+    return "".join(chr((code >> 8 * i) & 0xFF) for i in range(4)).strip("\0") or None
+
+
+class ImageFolder:
+    """
+    Reads the images of a directory in name order with the cv2.VideoCapture read() interface.
+
+    Parameters:
+    path (str): Directory holding the frames.
+    loop (bool): Start over after the last image.
+    """
+    def __init__(self, path, loop=False):
+        self.files = sorted(f for f in glob.glob(os.path.join(path, "*")) if f.lower().endswith(IMAGE_EXTENSIONS))
+        self.loop = loop
+        self.position = -1
+
+    def isOpened(self):
+        return bool(self.files)
+
+    def read(self):
+        self.position += 1
+        if self.position >= len(self.files):
+            if not self.loop or not self.files:
+                return False, None
+            self.position = 0
+        img = cv2.imread(self.files[self.position])
+        return img is not None, img
+
+    def get(self, prop):
+        if prop == cv2.CAP_PROP_FRAME_COUNT:
+            return len(self.files)
+        return 0
+
+    def release(self):
+        pass
+
+
+class Capture:
+    """
+    A frame source for every entry point: a camera tuned for low latency, or a
+    video file or image directory for offline runs.
+
+    Cameras get the requested backend, pixel format, resolution and frame
+    rate, and a one-frame driver buffer so read() returns the newest frame
+    instead of one several frames old. What the driver actually negotiated
+    is read back, since cameras silently fall back to modes they support.
+
+    Parameters:
+    source (int or str): Camera index, video file or directory of images.
+    width (int): Requested frame width, or None for the camera default.
+    height (int): Requested frame height, or None for the camera default.
+    fps (float): Requested camera frame rate.
+    fourcc (str): Pixel format, e.g. "MJPG" (compressed, high frame rates over USB 2) or "YUYV".
+    bufferSize (int): Driver-side frame buffer (CAP_PROP_BUFFERSIZE); 1 keeps latency lowest.
+    backend (str): Capture backend name from BACKENDS.
+    loop (bool): Restart video files and image directories at the end.
+    realtime (bool): Pace video files and image directories to fps instead of reading as fast as possible.
+    """
+    def __init__(self, source=0, width=640, height=480, fps=30, fourcc="MJPG", bufferSize=1, backend="any",
+                 loop=False, realtime=False):
+        if isinstance(source, str) and source.isdigit():
+            source = int(source)
+        self.source = source
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.fourcc = fourcc
+        self.bufferSize = bufferSize
+        self.backend = backend
+        self.loop = loop
+        self.realtime = realtime
+        self.isCamera = isinstance(source, int)
+        self.cap = None
+        self.latency = StageStats("read")
+        self.frames = 0
+        self._start = None
+        self._nextFrame = 0.0
+
+    def open(self):
+        """
+        Opens the source, applies the camera settings and returns self.
+        """
+        if isinstance(self.source, str) and os.path.isdir(self.source):
+            self.cap = ImageFolder(self.source, self.loop)
+        elif self.isCamera:
+            self.cap = cv2.VideoCapture(self.source, BACKENDS[self.backend])
+            # The format has to be set before the resolution for most V4L2 and DirectShow drivers
+            if self.fourcc:
+                self.cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*self.fourcc))
+            if self.width:
+                self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.width)
+            if self.height:
+                self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.height)
+            if self.fps:
+                self.cap.set(cv2.CAP_PROP_FPS, self.fps)
+            if self.bufferSize:
+                self.cap.set(cv2.CAP_PROP_BUFFERSIZE, self.bufferSize)
+        else:
+            self.cap = cv2.VideoCapture(self.source, BACKENDS[self.backend])
+        if not self.cap.isOpened():
+            raise IOError(f"Cannot open capture source {self.source!r}")
+        return self
+
+    def read(self):
+        """
+        Returns (success, img) like cv2.VideoCapture.read and records the read latency.
+        """
+        if self.cap is None:
+            self.open()
+        if self.realtime and not self.isCamera and self.fps:
+            now = time.perf_counter()
+            if now < self._nextFrame:
+                time.sleep(self._nextFrame - now)
+            self._nextFrame = max(now, self._nextFrame) + 1.0 / self.fps
+
+        start = time.perf_counter()
+        success, img = self.cap.read()
+        if not success and self.loop and not self.isCamera and isinstance(self.cap, cv2.VideoCapture):
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            success, img = self.cap.read()
+        end = time.perf_counter()
+        if success:
+            self.latency.add(end - start)
+            self.frames += 1
+            if self._start is None:
+                self._start = end
+        return success, img
+
+    def settings(self):
+        """
+        Returns the settings the source actually runs with, as a dictionary.
+        """
+        if self.cap is None:
+            self.open()
+        if isinstance(self.cap, ImageFolder):
+            img = cv2.imread(self.cap.files[0])
+            h, w = img.shape[:2] if img is not None else (0, 0)
+            return {"source": self.source, "backend": "images", "width": w, "height": h,
+                    "frames": len(self.cap.files)}
+        settings = {
+            "source": self.source,
+            "backend": self.cap.getBackendName(),
+            "width": int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+            "height": int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+            "fps": self.cap.get(cv2.CAP_PROP_FPS),
+            "fourcc": fourcc_name(self.cap.get(cv2.CAP_PROP_FOURCC)),
+        }
+        if self.isCamera:
+            settings["bufferSize"] = int(self.cap.get(cv2.CAP_PROP_BUFFERSIZE))
+        else:
+            settings["frames"] = int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        return settings
+
+    def describe(self):
+        """
+        Returns a one-line summary of the negotiated settings, with the requested ones where they differ.
+        """
+        settings = self.settings()
+        text = ", ".join(f"{key}={value}" for key, value in settings.items())
+        if self.isCamera:
+            requested = {"width": self.width, "height": self.height, "fps": self.fps, "fourcc": self.fourcc,
+                         "bufferSize": self.bufferSize}
+            ignored = [f"{key}={value}" for key, value in requested.items()
+                       if value and key in settings and settings[key] != value]
+            if ignored:
+                text += f" (requested {', '.join(ignored)})"
+        return text
+
+    def report(self):
+        """
+        Returns the measured read latency and frame rate as a dictionary.
+        """
+        elapsed = time.perf_counter() - self._start if self._start is not None else 0.0
+        return {
+            "frames": self.frames,
+            "read": self.latency.as_dict(),
+            "measuredFps": (self.frames - 1) / elapsed if elapsed > 0 else 0.0,
+        }
+
+    def release(self):
+        if self.cap is not None:
+            self.cap.release()
+            self.cap = None
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+def add_capture_arguments(parser):
+    """
+    Adds the capture options shared by the command line entry points to an argparse parser.
+    """
+    parser.add_argument("--source", default="0", help="Camera index, video file or image directory")
+    parser.add_argument("--width", type=int, default=640)
+    parser.add_argument("--height", type=int, default=480)
+    parser.add_argument("--fps", type=float, default=30)
+    parser.add_argument("--fourcc", default="MJPG", help="Camera pixel format, e.g. MJPG or YUYV")
+    parser.add_argument("--buffer-size", type=int, default=1)
+    parser.add_argument("--backend", default="any", choices=sorted(BACKENDS))
+    parser.add_argument("--inference-width", type=int,
+                        help="Run hand detection on frames downscaled to this width")
+    parser.add_argument("--loop", action="store_true", help="Loop video files and image directories")
+    parser.add_argument("--realtime", action="store_true", help="Pace video files and image directories to --fps")
+    return parser
+
+
+def capture_from_args(args):
+    """
+    Builds a Capture from options added by add_capture_arguments.
+    """
+    return Capture(args.source, args.width, args.height, args.fps, args.fourcc, args.buffer_size, args.backend,
+                   args.loop, args.realtime)
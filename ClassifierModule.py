@@ -0,0 +1,343 @@
+import argparse
+import time
+import numpy as np
+
+# Label of the "no gesture" class
+NONE_LABEL = "none"
+FEATURE_SIZE = 42   # x, y of the 21 landmarks
+
+
+def landmark_features(landmarks, isRight):
+    """
+    Turns (N, 21, 3) landmark arrays into (N, 42) pose features that do not
+    depend on where the hand is, how large it appears, which hand it is or
+    how it is rotated in the image plane: the wrist is moved to the origin,
+    left hands are mirrored onto right ones, the wrist to middle finger MCP
+    axis is rotated to point up and its length becomes the unit.
+
+    Only x and y are used: after findHands they are pixels while z stays in
+    normalized image units, and z is also the noisiest coordinate.
+    """
+    xy = landmarks[:, :, :2] - landmarks[:, :1, :2]
+    ax, ay = xy[:, 9].T
+    sign = np.where(isRight, 1.0, -1.0)
+    norm = ax * ax + ay * ay
+    norm[norm == 0] = 1.0
+    # Mirroring, rotating (ax, ay) to point up, i.e. to (0, -1) in image coordinates, and scaling
+    # by 1 / |(ax, ay)| folded into one 2x2 matrix per hand, applied in a single batched product
+    transform = np.empty((len(xy), 2, 2), np.float32)
+    transform[:, 0, 0] = -sign * ay
+    transform[:, 0, 1] = sign * ax
+    transform[:, 1, 0] = -ax
+    transform[:, 1, 1] = -ay
+    transform /= norm[:, None, None]
+    return (xy @ transform.transpose(0, 2, 1)).reshape(len(xy), FEATURE_SIZE)
+
+
+def _softmax(z):
+    z = z - z.max(axis=1, keepdims=True)
+    np.exp(z, out=z)
+    z /= z.sum(axis=1, keepdims=True)
+    return z
+
+
+class PoseClassifier:
+    """
+    Base class of the landmark pose classifiers: maps the landmarks of every
+    hand in a frame to class probabilities in one vectorized call.
+
+    Parameters:
+    labels (list): Class names, gesture names plus NONE_LABEL.
+    """
+    kind = None
+
+    def __init__(self, labels):
+        self.labels = [str(label) for label in labels]
+
+    def predict_proba(self, landmarks, isRight):
+        """
+        Returns (N, classes) probabilities for (N, 21, 3) landmarks and (N,) handedness.
+        """
+        return self._proba(landmark_features(landmarks, isRight))
+
+    def predict(self, landmarks, isRight):
+        """
+        Returns (classes, confidences): the most likely class index of every hand and its probability.
+        """
+        proba = self.predict_proba(landmarks, isRight)
+        classes = proba.argmax(axis=1)
+        return classes, proba[np.arange(len(proba)), classes]
+
+    def _proba(self, features):
+        raise NotImplementedError
+
+    def _arrays(self):
+        raise NotImplementedError
+
+    def save(self, path):
+        """
+        Exports the model to a NumPy .npz file that load_classifier reads back.
+        """
+        np.savez(path, kind=self.kind, labels=np.array(self.labels), **self._arrays())
+
+
+class MLPClassifier(PoseClassifier):
+    """
+    A small multilayer perceptron with ReLU hidden layers and a softmax output.
+
+    Parameters:
+    labels (list): Class names.
+    weights (list): Weight matrix of every layer, input first.
+    biases (list): Bias vector of every layer.
+    """
+    kind = "mlp"
+
+    def __init__(self, labels, weights, biases):
+        super().__init__(labels)
+        self.weights = [np.ascontiguousarray(w, np.float32) for w in weights]
+        self.biases = [np.asarray(b, np.float32) for b in biases]
+
+    def _proba(self, features):
+        h = features
+        for w, b in zip(self.weights[:-1], self.biases[:-1]):
+            h = np.maximum(h @ w + b, 0)
+        return _softmax(h @ self.weights[-1] + self.biases[-1])
+
+    def _arrays(self):
+        arrays = {f"w{i}": w for i, w in enumerate(self.weights)}
+        arrays.update({f"b{i}": b for i, b in enumerate(self.biases)})
+        return arrays
+
+    @classmethod
+    def from_arrays(cls, labels, arrays):
+        layers = sum(1 for key in arrays if key.startswith("w"))
+        return cls(labels, [arrays[f"w{i}"] for i in range(layers)], [arrays[f"b{i}"] for i in range(layers)])
+
+    @classmethod
+    def train(cls, features, targets, labels, hidden=(32,), epochs=500, rate=0.01, l2=1e-4, seed=0):
+        """
+        Fits an MLP with full-batch Adam on the cross-entropy loss.
+
+        Parameters:
+        features (ndarray): (N, 42) landmark_features.
+        targets (ndarray): (N,) class indices into labels.
+        labels (list): Class names.
+        hidden (tuple): Hidden layer sizes.
+        epochs (int): Gradient steps.
+        rate (float): Adam learning rate.
+        l2 (float): Weight decay.
+        seed (int): Initialization seed.
+        """
+        rng = np.random.default_rng(seed)
+        sizes = [features.shape[1], *hidden, len(labels)]
+        weights = [rng.normal(0, np.sqrt(2 / n), (n, m)) for n, m in zip(sizes, sizes[1:])]
+        biases = [np.zeros(m) for m in sizes[1:]]
+        params = weights + biases
+        moments = [np.zeros_like(p) for p in params]
+        squares = [np.zeros_like(p) for p in params]
+        onehot = np.eye(len(labels))[targets]
+        x = features.astype(float)
+
+        for step in range(1, epochs + 1):
+            activations = [x]
+            for w, b in zip(weights[:-1], biases[:-1]):
+                activations.append(np.maximum(activations[-1] @ w + b, 0))
+            delta = (_softmax(activations[-1] @ weights[-1] + biases[-1]) - onehot) / len(x)
+
+            gradWeights, gradBiases = [], []
+            for layer in reversed(range(len(weights))):
+                gradWeights.insert(0, activations[layer].T @ delta + l2 * weights[layer])
+                gradBiases.insert(0, delta.sum(axis=0))
+                if layer:
+                    delta = (delta @ weights[layer].T) * (activations[layer] > 0)
+
+            for p, g, m, v in zip(params, gradWeights + gradBiases, moments, squares):
+                m *= 0.9
+                m += 0.1 * g
+                v *= 0.999
+                v += 0.001 * g * g
+                p -= rate * (m / (1 - 0.9 ** step)) / (np.sqrt(v / (1 - 0.999 ** step)) + 1e-8)
+        return cls(labels, weights, biases)
+
+
+class KNNClassifier(PoseClassifier):
+    """
+    k-nearest-neighbour vote over stored example poses. The index is the
+    example matrix with its squared norms precomputed, so a query is one
+    matrix product and a partial sort.
+
+    Parameters:
+    labels (list): Class names.
+    examples (ndarray): (M, 42) example features.
+    targets (ndarray): (M,) class index of every example.
+    k (int): Neighbours that vote.
+    """
+    kind = "knn"
+
+    def __init__(self, labels, examples, targets, k=5):
+        super().__init__(labels)
+        self.examples = np.ascontiguousarray(examples, np.float32)
+        self.targets = np.asarray(targets, np.intp)
+        self.k = min(int(k), len(self.examples))
+        self._norms = (self.examples ** 2).sum(axis=1)
+        self._examplesT = np.ascontiguousarray(self.examples.T)
+
+    def _proba(self, features):
+        # |a - b|^2 without the |a|^2 term, which is the same for every example of a query
+        distances = self._norms - 2 * (features @ self._examplesT)
+        nearest = np.argpartition(distances, self.k - 1, axis=1)[:, :self.k]
+        votes = self.targets[nearest]
+        proba = np.zeros((len(features), len(self.labels)), np.float32)
+        np.add.at(proba, (np.arange(len(features))[:, None], votes), 1.0 / self.k)
+        return proba
+
+    def _arrays(self):
+        return {"examples": self.examples, "targets": self.targets, "k": self.k}
+
+    @classmethod
+    def from_arrays(cls, labels, arrays):
+        return cls(labels, arrays["examples"], arrays["targets"], int(arrays["k"]))
+
+    @classmethod
+    def train(cls, features, targets, labels, k=5, maxPerClass=300, seed=0):
+        """
+        Builds the index from at most maxPerClass random examples of every class,
+        which bounds the query cost however long the training traces are.
+        """
+        rng = np.random.default_rng(seed)
+        keep = []
+        for label in range(len(labels)):
+            members = np.flatnonzero(targets == label)
+            if len(members) > maxPerClass:
+                members = rng.choice(members, maxPerClass, replace=False)
+            keep.append(members)
+        keep = np.sort(np.concatenate(keep))
+        return cls(labels, features[keep], targets[keep], k)
+
+
+CLASSIFIERS = {cls.kind: cls for cls in (MLPClassifier, KNNClassifier)}
+
+
+def load_classifier(path):
+    """
+    Loads a classifier exported with PoseClassifier.save.
+    """
+    with np.load(path) as data:
+        arrays = {key: data[key] for key in data.files}
+    kind = str(arrays.pop("kind"))
+    if kind not in CLASSIFIERS:
+        raise ValueError(f"{path}: unknown classifier kind {kind!r}")
+    return CLASSIFIERS[kind].from_arrays(arrays.pop("labels").tolist(), arrays)
+
+
+def trace_dataset(path, label=None, gestures="gestures.json"):
+    """
+    Collects (landmarks, rightHand, names) for every hand in a recorded trace.
+
+    With a label every hand is that class, for traces recorded while holding
+    one pose. Without one, the hand-coded gesture definitions label the
+    frames, which bootstraps a classifier from the existing predicates.
+    """
+    from TraceModule import read_trace, TraceReplay, ReplayDetector
+    records = [record for record in read_trace(path) if len(record.landmarks)]
+    if not records:
+        return np.zeros((0, 21, 3), np.float32), np.zeros(0, bool), []
+    landmarks = np.concatenate([record.landmarks for record in records])
+    rightHand = np.concatenate([record.rightHand for record in records])
+    if label is not None:
+        return landmarks, rightHand, [label] * len(landmarks)
+
+    from GestureModule import GestureEngine
+    engine = GestureEngine.load(gestures)
+    replay = TraceReplay(records=records)
+    detector = ReplayDetector(replay, maxHands=max(len(record.landmarks) for record in records))
+    names = []
+    while True:
+        success, img = replay.read()
+        if not success:
+            break
+        detector.findHands(img)
+        detector.evaluateHands()
+        for handNo in range(detector.handCount):
+            gesture = engine.match(detector, handNo)
+            names.append(gesture.name if gesture is not None else NONE_LABEL)
+    return landmarks, rightHand, names
+
+
+def load_dataset(traces, gestures="gestures.json"):
+    """
+    Builds (features, names) from "path" or "path=label" trace arguments.
+    """
+    features, names = [], []
+    for trace in traces:
+        path, _, label = trace.partition("=")
+        landmarks, rightHand, traceNames = trace_dataset(path, label or None, gestures)
+        features.append(landmark_features(landmarks, rightHand))
+        names.extend(traceNames)
+    return np.concatenate(features), np.array(names)
+
+
+def time_inference(classifier, hands=1, repeat=2000):
+    """
+    Returns the median predict() time in microseconds for a batch of hands.
+    """
+    rng = np.random.default_rng(0)
+    landmarks = rng.random((hands, 21, 3), np.float32) * 400
+    isRight = np.ones(hands, bool)
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        classifier.predict(landmarks, isRight)
+        samples.append(time.perf_counter() - start)
+    return float(np.median(samples)) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train, export and evaluate landmark pose classifiers")
+    commands = parser.add_subparsers(dest="command", required=True)
+    train = commands.add_parser("train", help="Train a classifier on recorded traces and export it")
+    train.add_argument("output", help="Model file (.npz)")
+    train.add_argument("traces", nargs="+", help="trace.hgt, labelled by gestures.json, or trace.hgt=label")
+    train.add_argument("--kind", choices=sorted(CLASSIFIERS), default="mlp")
+    train.add_argument("--gestures", default="gestures.json", help="Definitions that label unlabelled traces")
+    train.add_argument("--hidden", type=int, nargs="*", default=[32])
+    train.add_argument("--epochs", type=int, default=500)
+    train.add_argument("--k", type=int, default=5)
+    train.add_argument("--holdout", type=float, default=0.2, help="Fraction of hands kept for validation")
+    evaluate = commands.add_parser("eval", help="Evaluate an exported classifier on traces")
+    evaluate.add_argument("model")
+    evaluate.add_argument("traces", nargs="+")
+    evaluate.add_argument("--gestures", default="gestures.json")
+    args = parser.parse_args()
+
+    features, names = load_dataset(args.traces, args.gestures)
+    if args.command == "train":
+        labels = sorted(set(names) | {NONE_LABEL})
+        targets = np.searchsorted(labels, names)
+        order = np.random.default_rng(0).permutation(len(features))
+        split = int(len(order) * (1 - args.holdout))
+        fit, held = order[:split], order[split:]
+        if args.kind == "mlp":
+            classifier = MLPClassifier.train(features[fit], targets[fit], labels, tuple(args.hidden), args.epochs)
+        else:
+            classifier = KNNClassifier.train(features[fit], targets[fit], labels, args.k)
+        classifier.save(args.output)
+        print(f"{len(fit)} training hands: " + ", ".join(f"{label} {np.sum(targets[fit] == i)}"
+                                                          for i, label in enumerate(labels)))
+    else:
+        classifier = load_classifier(args.model)
+        unknown = set(names) - set(classifier.labels)
+        if unknown:
+            raise SystemExit(f"Labels not known to the model: {sorted(unknown)}")
+        targets = np.array([classifier.labels.index(name) for name in names], np.intp)
+        held = np.arange(len(features))
+
+    if len(held):
+        predicted = classifier._proba(features[held]).argmax(axis=1)
+        print(f"accuracy {np.mean(predicted == targets[held]):.3f} on {len(held)} hands")
+    for hands in (1, 2):
+        print(f"predict, {hands} hand(s): {time_inference(classifier, hands):.1f}us")
+
+
+if __name__ == "__main__":
+    main()
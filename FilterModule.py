@@ -0,0 +1,223 @@
+import argparse
+import math
+import time
+import numpy as np
+
+
+class EMAFilter:
+    """
+    Fixed exponential smoothing, the original ploc + (x - ploc) / smoothening.
+
+    Parameters:
+    smoothening (float): Smoothening divisor.
+    rate (float): Reference frame rate in Hz. When set, the smoothing factor is
+                  rescaled by the real frame interval so it stays the same per
+                  second at any FPS; when None every sample counts as one step.
+    """
+    def __init__(self, smoothening=7, rate=None):
+        self.smoothening = smoothening
+        self.rate = rate
+        self.reset()
+
+    def reset(self):
+        self._x = None
+        self._t = None
+
+    def __call__(self, x, t=None):
+        t = time.perf_counter() if t is None else t
+        x = np.asarray(x, float)
+        if self._x is None:
+            self._x, self._t = x.copy(), t
+            return self._x.copy()
+        alpha = 1.0 / self.smoothening
+        if self.rate is not None:
+            alpha = 1.0 - (1.0 - alpha) ** (max(t - self._t, 0.0) * self.rate)
+        self._x += alpha * (x - self._x)
+        self._t = t
+        return self._x.copy()
+
+
+def _smoothing_factor(dt, cutoff):
+    tau = 1.0 / (2 * math.pi * cutoff)
+    return 1.0 / (1.0 + tau / dt)
+
+
+class OneEuroFilter:
+    """
+    One Euro filter: a low-pass filter whose cutoff rises with speed, so the
+    cursor is steady when the hand is still and has little lag when it moves fast.
+
+    Parameters:
+    minCutoff (float): Cutoff frequency in Hz at rest; lower means less jitter.
+    beta (float): How fast the cutoff grows with speed; higher means less lag.
+    dCutoff (float): Cutoff frequency in Hz for the speed estimate.
+    """
+    def __init__(self, minCutoff=1.0, beta=0.007, dCutoff=1.0):
+        self.minCutoff = minCutoff
+        self.beta = beta
+        self.dCutoff = dCutoff
+        self.reset()
+
+    def reset(self):
+        self._x = None
+        self._dx = None
+        self._t = None
+
+    def __call__(self, x, t=None):
+        t = time.perf_counter() if t is None else t
+        x = np.asarray(x, float)
+        if self._x is None:
+            self._x, self._dx, self._t = x.copy(), np.zeros_like(x), t
+            return self._x.copy()
+        dt = max(t - self._t, 1e-6)
+        self._t = t
+
+        dx = (x - self._x) / dt
+        self._dx += _smoothing_factor(dt, self.dCutoff) * (dx - self._dx)
+        cutoff = self.minCutoff + self.beta * np.abs(self._dx)
+        self._x += _smoothing_factor(dt, cutoff) * (x - self._x)
+        return self._x.copy()
+
+
+class KalmanFilter:
+    """
+    Constant-velocity Kalman filter, run independently on every element.
+
+    Parameters:
+    processNoise (float): Acceleration noise spectral density, in units^2 / s^3.
+    measurementNoise (float): Measurement noise variance, in units^2.
+    """
+    def __init__(self, processNoise=5e3, measurementNoise=16.0):
+        self.processNoise = processNoise
+        self.measurementNoise = measurementNoise
+        self.reset()
+
+    def reset(self):
+        self._x = None
+        self._t = None
+
+    def __call__(self, x, t=None):
+        t = time.perf_counter() if t is None else t
+        z = np.asarray(x, float)
+        if self._x is None:
+            self._x, self._v, self._t = z.copy(), np.zeros_like(z), t
+            self._p00 = np.full_like(z, self.measurementNoise)
+            self._p01 = np.zeros_like(z)
+            self._p11 = np.full_like(z, self.processNoise)
+            return self._x.copy()
+        dt = max(t - self._t, 1e-6)
+        self._t = t
+        q = self.processNoise
+
+        # Predict
+        self._x += self._v * dt
+        self._p00 += dt * (2 * self._p01 + dt * self._p11) + q * dt ** 3 / 3
+        self._p01 += dt * self._p11 + q * dt ** 2 / 2
+        self._p11 += q * dt
+
+        # Update
+        s = self._p00 + self.measurementNoise
+        k0, k1 = self._p00 / s, self._p01 / s
+        residual = z - self._x
+        self._x += k0 * residual
+        self._v += k1 * residual
+        self._p11 -= k1 * self._p01
+        self._p00 *= 1 - k0
+        self._p01 *= 1 - k0
+        return self._x.copy()
+
+
+FILTERS = {
+    "ema": EMAFilter,
+    "oneeuro": OneEuroFilter,
+    "kalman": KalmanFilter,
+}
+
+
+def make_filter(name, **kwargs):
+    """
+    Builds a filter by name ("ema", "oneeuro" or "kalman").
+    """
+    try:
+        return FILTERS[name](**kwargs)
+    except KeyError:
+        raise ValueError(f"Unknown filter {name!r}, expected one of {sorted(FILTERS)}") from None
+
+
+def synthetic_trace(seconds=10, fps=30, noise=1.5, seed=0):
+    """
+    Builds a (t, points) cursor trace with still and moving phases, jittered
+    frame times and Gaussian landmark noise, for when no recording is at hand.
+    """
+    rng = np.random.default_rng(seed)
+    t = np.cumsum(rng.uniform(0.6, 1.4, int(seconds * fps)) / fps)
+    phase = np.clip(np.sin(2 * np.pi * t / 4) * 1.5, -1, 1)
+    points = np.stack((320 + 200 * phase, 240 + 120 * np.sin(2 * np.pi * t / 3)), axis=1)
+    return t, points + rng.normal(0, noise, points.shape)
+
+
+def evaluate_filter(filt, t, points, maxShift=15):
+    """
+    Replays a trace through a filter and measures it against the raw input.
+
+    Returns:
+    dict: lag_ms, the time shift that best aligns the output with the input;
+          jitter, the RMS second difference of the output (units per frame^2);
+          us_per_sample, the filter cost.
+    """
+    filt.reset()
+    start = time.perf_counter()
+    out = np.array([filt(p, ts) for ts, p in zip(t, points)])
+    cost = (time.perf_counter() - start) / len(t)
+
+    maxShift = min(maxShift, len(points) // 2)
+    errors = [np.abs(out[shift:] - points[:len(points) - shift]).mean() for shift in range(maxShift + 1)]
+    lagFrames = int(np.argmin(errors))
+    jitter = float(np.sqrt((np.diff(out, n=2, axis=0) ** 2).sum(axis=-1).mean()))
+    return {
+        "lag_ms": lagFrames * float(np.median(np.diff(t))) * 1000,
+        "jitter": jitter,
+        "us_per_sample": cost * 1e6,
+    }
+
+
+def benchmark(t, points, filters=None):
+    """
+    Evaluates every filter on the same trace. filters maps names to instances
+    and defaults to each filter type with its default settings.
+    """
+    if filters is None:
+        filters = {name: cls() for name, cls in FILTERS.items()}
+    report = {"raw": {"lag_ms": 0.0,
+                      "jitter": float(np.sqrt((np.diff(points, n=2, axis=0) ** 2).sum(axis=-1).mean())),
+                      "us_per_sample": 0.0}}
+    for name, filt in filters.items():
+        report[name] = evaluate_filter(filt, t, points)
+    return report
+
+
+def load_trace(path):
+    """
+    Loads a (t, points) trace from an .npz file with "t" and "points" arrays,
+    or the index fingertip track of a TraceModule recording.
+    """
+    if not path.endswith(".npz"):
+        from TraceModule import load_points
+        return load_points(path)
+    data = np.load(path)
+    return data["t"], data["points"].reshape(len(data["t"]), -1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare cursor filters on a landmark trace")
+    parser.add_argument("trace", nargs="?", help="Trace file; a synthetic trace is used when omitted")
+    args = parser.parse_args()
+
+    t, points = load_trace(args.trace) if args.trace else synthetic_trace()
+    for name, result in benchmark(t, points).items():
+        print(f"{name:8s} lag {result['lag_ms']:6.1f} ms  jitter {result['jitter']:6.2f}  "
+              f"{result['us_per_sample']:6.1f} us/sample")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,315 @@
+import json
+import os
+import time
+import numpy as np
+from ClassifierModule import NONE_LABEL, load_classifier
+
+# Bit weight of each finger (thumb first) in a finger-state bitmask
+FINGER_BITS = np.array([1, 2, 4, 8, 16])
+TABLE_SIZE = 1 << 10   # 5 raised-finger bits + 5 half-closed bits
+
+# Gesture event kinds
+ENTER = "enter"
+EXIT = "exit"
+
+
+class GestureConfigError(ValueError):
+    """
+    Raised when gesture definitions are malformed or ambiguous.
+    """
+
+
+def _pattern(values, name, field):
+    # [1, 0, None, ...] -> (mask, bits); None (or a missing entry) matches either state
+    if values is None:
+        return 0, 0
+    if isinstance(values, dict):
+        values = [values.get(str(i)) for i in range(5)]
+    if len(values) != 5 or any(v not in (0, 1, None) for v in values):
+        raise GestureConfigError(f"{name}: {field} must list five 0, 1 or null entries")
+    mask = sum(1 << i for i, v in enumerate(values) if v is not None)
+    bits = sum(1 << i for i, v in enumerate(values) if v == 1)
+    return mask, bits
+
+
+class Gesture:
+    """
+    One gesture definition.
+
+    Parameters:
+    name (str): Gesture name.
+    action (str): Action the dispatcher runs for it, defaults to name.
+    fingers (list): Raised-finger pattern, thumb first, 0/1/None per finger.
+    halfClosed (list or dict): Half-closed pattern, as a list or {finger index: state}.
+    distances (list): [{"points": [p1, p2], "max": d}] or "min" constraints between landmarks.
+    units (str): Unit of the distance limits, "scale" for hand scales (wrist to middle
+                 finger MCP, independent of the capture resolution) or "px" for pixels.
+    turned (bool): Required is_hand_turned state, or None for either.
+    flipped (bool): Required is_hand_flipped state, or None for either.
+    minDepth (dict): {"point": id, "value": v}, requires -z of that landmark above v. MediaPipe z
+                     is in normalized image units, so it does not depend on the resolution.
+    hold (float): Seconds the gesture must be seen without a break before it is entered.
+    priority (int): Wins over overlapping gestures with a lower priority.
+    repeat (bool): Run the action on every frame while active instead of once on entry.
+    hysteresis (float): Fraction the distance limits are relaxed by while the gesture is active.
+    debounce (float): Seconds the gesture may drop out while active before it is exited.
+    refractory (float): Seconds after an exit before the gesture can be entered again.
+    """
+    def __init__(self, name, action=None, fingers=None, halfClosed=None, distances=(), turned=None,
+                 flipped=None, minDepth=None, hold=0.0, priority=0, repeat=False, hysteresis=0.0,
+                 debounce=0.0, refractory=0.0, units="px"):
+        if units not in ("px", "scale"):
+            raise GestureConfigError(f"{name}: units must be 'px' or 'scale'")
+        self.name = name
+        self.action = action or name
+        self.fingersMask, self.fingersBits = _pattern(fingers, name, "fingers")
+        self.halfMask, self.halfBits = _pattern(halfClosed, name, "halfClosed")
+        self.distances = [(int(d["points"][0]), int(d["points"][1]), d.get("min"), d.get("max"))
+                          for d in distances]
+        # Limits checked while the gesture is active: a pinch enters below max and exits above max * (1 + h)
+        self.releaseDistances = [(p1, p2, low * (1 - hysteresis) if low is not None else None,
+                                  high * (1 + hysteresis) if high is not None else None)
+                                 for p1, p2, low, high in self.distances]
+        self.turned = turned
+        self.flipped = flipped
+        self.minDepth = (int(minDepth["point"]), float(minDepth["value"])) if minDepth else None
+        self.hold = hold
+        self.priority = priority
+        self.repeat = repeat
+        self.hysteresis = hysteresis
+        self.debounce = debounce
+        self.refractory = refractory
+        self.normalized = units == "scale"
+
+    def matchesKey(self, key):
+        fingers, half = key & 31, key >> 5
+        return (fingers & self.fingersMask) == self.fingersBits and (half & self.halfMask) == self.halfBits
+
+    def accepts(self, state, pixels, landmarks, active=False):
+        """
+        Checks the constraints that are not part of the bitmask key. An active
+        gesture is checked against its relaxed release distances.
+        """
+        if self.turned is not None and bool(state["turned"]) != self.turned:
+            return False
+        if self.flipped is not None and bool(state["flipped"]) != self.flipped:
+            return False
+        if self.minDepth is not None and not -landmarks[self.minDepth[0], 2] > self.minDepth[1]:
+            return False
+        for p1, p2, low, high in (self.releaseDistances if active else self.distances):
+            dx, dy = pixels[p2] - pixels[p1]
+            length = (dx * dx + dy * dy) ** 0.5
+            if self.normalized:
+                length /= state["scale"]
+            if (low is not None and length < low) or (high is not None and length >= high):
+                return False
+        return True
+
+    def __repr__(self):
+        return f"Gesture({self.name!r})"
+
+
+class GestureEvent:
+    """
+    An edge-triggered gesture transition: ENTER when a gesture becomes active, EXIT when it ends.
+    """
+    __slots__ = ("kind", "gesture", "t")
+
+    def __init__(self, kind, gesture, t):
+        self.kind = kind
+        self.gesture = gesture
+        self.t = t
+
+    def __repr__(self):
+        return f"GestureEvent({self.kind!r}, {self.gesture.name!r}, {self.t:.3f})"
+
+
+class GestureEngine:
+    """
+    Recognizes gestures through a dispatch table compiled from declarative definitions.
+
+    Every combination of raised and half-closed fingers indexes a precompiled
+    tuple of candidate gestures in priority order, so recognition is a single
+    table lookup plus the few per-gesture constraint checks. Definitions that
+    can match the same finger states with the same priority are rejected at
+    load time.
+
+    On top of the per-frame match, one state machine tracks the active gesture
+    (idle -> pending -> active -> releasing -> idle), timed by each gesture's
+    own settings: a gesture is entered once it has been seen for its hold time
+    and is not in its refractory window, stays active through dropouts shorter
+    than its debounce time and with its distance limits relaxed by its
+    hysteresis, and update() reports only the ENTER and EXIT edges. A held
+    click pose is one click, not one per frame.
+
+    match() reads the active gesture for its hysteresis and advance() changes
+    it, so both belong on the same thread: match on the inference thread and
+    hand its result to advance there, rather than calling update() elsewhere.
+
+    With a classifier, the per-frame match comes from a learned landmark pose
+    classifier (ClassifierModule) instead of the finger predicates and
+    constraints; the definitions still supply the timing of every gesture.
+
+    Parameters:
+    gestures (iterable): Gesture definitions.
+    classifier (PoseClassifier): Classifier whose labels are gesture names or NONE_LABEL.
+    minConfidence (float): Probability a classified gesture needs to match; an active
+                           gesture keeps matching down to minConfidence * (1 - hysteresis).
+    """
+    def __init__(self, gestures, classifier=None, minConfidence=0.6):
+        self.gestures = list(gestures)
+        self.table = self._compile(self.gestures)
+        self.classifier = classifier
+        self.minConfidence = minConfidence
+        if classifier is not None:
+            byName = {gesture.name: gesture for gesture in self.gestures}
+            unknown = set(classifier.labels) - byName.keys() - {NONE_LABEL}
+            if unknown:
+                raise GestureConfigError(f"Classifier labels without a gesture definition: {sorted(unknown)}")
+            # Gesture of every classifier output, None for the NONE_LABEL class
+            self.classes = [byName.get(label) for label in classifier.labels]
+        self.current = None
+        self.matched = None
+        self._candidate = None
+        self._since = 0.0
+        self._lastSeen = 0.0
+        self._lastExit = {}
+
+    @staticmethod
+    def _compile(gestures):
+        names = set()
+        for gesture in gestures:
+            if gesture.name in names:
+                raise GestureConfigError(f"Gesture {gesture.name!r} is defined twice")
+            names.add(gesture.name)
+
+        table = []
+        for key in range(TABLE_SIZE):
+            candidates = sorted((g for g in gestures if g.matchesKey(key)), key=lambda g: -g.priority)
+            for a, b in zip(candidates, candidates[1:]):
+                if a.priority == b.priority:
+                    raise GestureConfigError(
+                        f"Gestures {a.name!r} and {b.name!r} both match fingers={key & 31:05b}, "
+                        f"halfClosed={key >> 5:05b} with the same priority")
+            table.append(tuple(candidates))
+        return table
+
+    @classmethod
+    def from_config(cls, config, base=""):
+        """
+        Builds an engine from a config dict: {"defaults": {...}, "gestures": [{...}, ...]}.
+        Defaults apply to every gesture that does not set the same field. An optional
+        "classifier": {"path": "model.npz", "minConfidence": 0.6} entry loads a pose
+        classifier, relative to base.
+        """
+        defaults = config.get("defaults", {})
+        try:
+            gestures = [Gesture(**{**defaults, **definition}) for definition in config["gestures"]]
+        except (KeyError, TypeError) as e:
+            raise GestureConfigError(f"Invalid gesture definition: {e}") from None
+        options = config.get("classifier")
+        if not options:
+            return cls(gestures)
+        try:
+            classifier = load_classifier(os.path.join(base, options["path"]))
+        except (KeyError, OSError, ValueError) as e:
+            raise GestureConfigError(f"Invalid classifier: {e}") from None
+        return cls(gestures, classifier, options.get("minConfidence", 0.6))
+
+    @classmethod
+    def load(cls, path):
+        """
+        Loads gesture definitions from a JSON file. Relative paths are looked up next to this module.
+        """
+        if not os.path.isabs(path) and not os.path.exists(path):
+            path = os.path.join(os.path.dirname(os.path.abspath(__file__)), path)
+        with open(path) as f:
+            return cls.from_config(json.load(f), os.path.dirname(path))
+
+    @staticmethod
+    def key(state):
+        return int(state["fingers"] @ FINGER_BITS) | int(state["halfClosed"] @ FINGER_BITS) << 5
+
+    def match(self, detector, handNo=0):
+        """
+        Returns the gesture the hand shows in this frame alone, or None.
+        Call evaluateHands on the detector first.
+        """
+        if handNo >= detector.handCount:
+            return None
+        if self.classifier is not None:
+            hand = slice(handNo, handNo + 1)
+            classes, confidences = self.classifier.predict(detector.landmarks[hand], detector.rightHand[hand])
+            return self._classified(int(classes[0]), float(confidences[0]))
+        state = detector.handStates[handNo]
+        pixels, landmarks = detector.pixels[handNo], detector.landmarks[handNo]
+        for candidate in self.table[self.key(state)]:
+            if candidate.accepts(state, pixels, landmarks, candidate is self.current):
+                return candidate
+        return None
+
+    def matchAll(self, detector):
+        """
+        Returns the per-frame match of every detected hand; a classifier runs once for all of them.
+        """
+        if self.classifier is None:
+            return [self.match(detector, handNo) for handNo in range(detector.handCount)]
+        n = detector.handCount
+        classes, confidences = self.classifier.predict(detector.landmarks[:n], detector.rightHand[:n])
+        return [self._classified(c, p) for c, p in zip(classes.tolist(), confidences.tolist())]
+
+    def _classified(self, index, confidence):
+        gesture = self.classes[index]
+        if gesture is None:
+            return None
+        threshold = self.minConfidence
+        if gesture is self.current:
+            threshold *= 1 - gesture.hysteresis
+        return gesture if confidence >= threshold else None
+
+    def update(self, detector, handNo=0, t=None):
+        """
+        Matches the hand and advances the state machine by one frame, see advance().
+        """
+        return self.advance(self.match(detector, handNo), t)
+
+    def advance(self, gesture, t=None):
+        """
+        Advances the state machine by one frame with that frame's match and returns
+        the GestureEvents it produced, at most an EXIT followed by an ENTER.
+        self.current holds the active gesture afterwards and self.matched the frame's
+        match; while they differ the active gesture is riding out a dropout.
+
+        Parameters:
+        gesture (Gesture): The frame's match from match(), or None.
+        t (float): Capture time of the frame, which hold, debounce and refractory
+                   times are measured in; defaults to now.
+        """
+        t = time.perf_counter() if t is None else t
+        self.matched = gesture
+        if gesture is not self._candidate:
+            self._candidate, self._since = gesture, t
+
+        events = []
+        current = self.current
+        if current is not None:
+            if gesture is current:
+                self._lastSeen = t
+            elif t - self._lastSeen >= current.debounce:
+                events.append(GestureEvent(EXIT, current, t))
+                self._lastExit[current.name] = t
+                self.current = current = None
+
+        if current is None and gesture is not None and t - self._since >= gesture.hold:
+            lastExit = self._lastExit.get(gesture.name)
+            if lastExit is None or t - lastExit >= gesture.refractory:
+                events.append(GestureEvent(ENTER, gesture, t))
+                self.current, self._lastSeen = gesture, t
+        return events
+
+    def recognize(self, detector, handNo=0, t=None):
+        """
+        Advances the state machine like update() and returns the active gesture, or None.
+        """
+        self.update(detector, handNo, t)
+        return self.current
@@ -1,8 +1,10 @@
 import cv2
 import mediapipe as mp
 import time
+from CaptureModule import Capture
 
-cap = cv2.VideoCapture(0)
+cap = Capture(0).open()
+imgRGB = None  # reused every frame instead of allocating a converted copy
 
 mpHands = mp.solutions.hands
 hands = mpHands.Hands()
@@ -13,8 +15,10 @@ cTime = 0
 
 while True:
     success, img = cap.read()
-    img = cv2.flip(img, 1)
-    imgRGB = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+    if not success:
+        break
+    img = cv2.flip(img, 1, dst=img)
+    imgRGB = cv2.cvtColor(img, cv2.COLOR_BGR2RGB, dst=imgRGB)
     results = hands.process(imgRGB)
     # print(results.multi_hand_landmarks)
 
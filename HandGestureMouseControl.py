@@ -1,29 +1,22 @@
 import cv2
 import mediapipe as mp
 import time
-from pynput.mouse import Button, Controller
 import numpy as np
+from ActuatorModule import CursorActuator, create_backend
+from CaptureModule import Capture
 
-mouse = Controller()
+# The mouse is driven from its own thread so the frame loop never sleeps
+actuator = CursorActuator(create_backend(), rate=200).start()
 
 # Function to move mouse to a position smoothly
 def move_mouse_smoothly(target_x, target_y, duration=0.01):
-    start_x, start_y = mouse.position
-    steps = 50  # Number of steps to divide the movement
-    dx = (target_x - start_x) / steps
-    dy = (target_y - start_y) / steps
-    delay = duration / steps
+    actuator.moveTo(target_x, target_y, duration)
 
-    for _ in range(steps):
-        mouse.move(dx, dy)
-        time.sleep(delay)
+def click_mouse(button="left"):
+    actuator.click(button)
 
-def click_mouse(button=Button.left):
-    mouse.click(button)
-
-cap = cv2.VideoCapture(0)
-cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
-cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
+cap = Capture(0, 640, 480).open()
+print(cap.describe())
 
 mpHands = mp.solutions.hands
 hands = mpHands.Hands(max_num_hands=2)
@@ -31,6 +24,7 @@ mpDraw = mp.solutions.drawing_utils
 
 pTime = 0
 cTime = 0
+frameRGB = None  # reused every frame instead of allocating a converted copy
 
 def get_palm_center(hand_landmarks):
     # Select key landmarks on the palm: wrist, index MCP, pinky MCP, middle PIP
@@ -45,9 +39,17 @@ def get_palm_center(hand_landmarks):
     cy = int(np.mean([lm.y for lm in palm_landmarks]) * h)
     return cx, cy
 
+def hand_scale(hand_landmarks):
+    # Wrist to middle finger MCP length in pixels, the unit of the fist threshold
+    wrist = hand_landmarks.landmark[mpHands.HandLandmark.WRIST]
+    mcp = hand_landmarks.landmark[mpHands.HandLandmark.MIDDLE_FINGER_MCP]
+    return max(np.hypot((mcp.x - wrist.x) * w, (mcp.y - wrist.y) * h), 1e-6)
+
 def is_fist(hand_landmarks):
-    # A simple fist detection by checking the distance between the tip and the MCP of each finger
+    # A simple fist detection by checking the distance between the tip and the MCP of each finger,
+    # relative to the hand scale so it holds at any resolution and distance from the camera
     fist = True
+    scale = hand_scale(hand_landmarks)
     for finger_tip, finger_mcp in [
         (mpHands.HandLandmark.THUMB_TIP, mpHands.HandLandmark.THUMB_MCP),
         (mpHands.HandLandmark.INDEX_FINGER_TIP, mpHands.HandLandmark.INDEX_FINGER_MCP),
@@ -56,10 +58,10 @@ def is_fist(hand_landmarks):
         (mpHands.HandLandmark.PINKY_TIP, mpHands.HandLandmark.PINKY_MCP)
     ]:
         dist = np.linalg.norm([
-            hand_landmarks.landmark[finger_tip].x - hand_landmarks.landmark[finger_mcp].x,
-            hand_landmarks.landmark[finger_tip].y - hand_landmarks.landmark[finger_mcp].y
-        ])
-        if dist > 0.1:  # Adjust this threshold as needed
+            (hand_landmarks.landmark[finger_tip].x - hand_landmarks.landmark[finger_mcp].x) * w,
+            (hand_landmarks.landmark[finger_tip].y - hand_landmarks.landmark[finger_mcp].y) * h
+        ]) / scale
+        if dist > 0.5:  # Adjust this threshold as needed
             fist = False
             break
     return fist
@@ -69,8 +71,8 @@ while True:
     if not success:
         break
 
-    frameFlipped = cv2.flip(frame, 1)
-    frameRGB = cv2.cvtColor(frameFlipped, cv2.COLOR_BGR2RGB)
+    frameFlipped = cv2.flip(frame, 1, dst=frame)
+    frameRGB = cv2.cvtColor(frameFlipped, cv2.COLOR_BGR2RGB, dst=frameRGB)
     h, w, _ = frameFlipped.shape
     results = hands.process(frameRGB)
 
@@ -80,7 +82,7 @@ while True:
             move_mouse_smoothly(cx, cy)
 
             if is_fist(handLms):
-                click_mouse(Button.left)
+                click_mouse("left")
 
             mpDraw.draw_landmarks(frameFlipped, handLms, mpHands.HAND_CONNECTIONS)
 
@@ -94,5 +96,7 @@ while True:
     if cv2.waitKey(1) & 0xFF == ord('q'):
         break
 
+actuator.stop()
+print(cap.report())
 cap.release()
 cv2.destroyAllWindows()
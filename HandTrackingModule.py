@@ -1,208 +1,718 @@
+import argparse
+import threading
 import cv2
-import mediapipe as mp
 import time
-import math
-# import numpy as np
+import copy
+import numpy as np
+from PipelineModule import Pipeline, StartupTimer
+from CaptureModule import Capture, add_capture_arguments, capture_from_args
+from OverlayModule import Canvas, Overlay
+from ProfilerModule import NULL_PROFILER
+
+NUM_LANDMARKS = 21
+TIP_IDS = np.array([4, 8, 12, 16, 20])
+# Landmarks whose distance is the hand scale: wrist to middle finger MCP
+SCALE_POINTS = (0, 9)
+# A graph configure() switches back to after this many frames is reset rather than left
+# to track the hands where it last saw them
+STALE_GRAPH_FRAMES = 3
+
+# Per-hand result record returned by handDetector.evaluateHands
+HAND_STATE_DTYPE = np.dtype([
+    ("right", bool),
+    ("fingers", np.uint8, 5),
+    ("halfClosed", np.uint8, 5),
+    ("flipped", bool),
+    ("turned", bool),
+    ("bbox", np.int32, 4),
+    ("scale", np.float32),
+])
+
+
+def fingers_up(landmarks, isRight):
+    """
+    Vectorized finger-up test for a batch of hands.
+
+    Parameters:
+    landmarks (ndarray): (N, 21, 2+) landmark array in pixel coordinates.
+    isRight (ndarray): (N,) boolean handedness array.
+
+    Returns:
+    ndarray: (N, 5) uint8 array, 1 for every raised finger.
+    """
+    tipX = landmarks[:, 4, 0]
+    ipX = landmarks[:, 3, 0]
+    fingers = np.empty((landmarks.shape[0], 5), np.uint8)
+    # Thumb
+    fingers[:, 0] = np.where(isRight, tipX < ipX, tipX > ipX)
+    # Fingers
+    fingers[:, 1:] = landmarks[:, TIP_IDS[1:], 1] < landmarks[:, TIP_IDS[1:] - 2, 1]
+    return fingers
+
+
+def fingers_half_closed(landmarks, isRight):
+    """
+    Vectorized half-closed test for a batch of hands.
+
+    Parameters:
+    landmarks (ndarray): (N, 21, 2+) landmark array in pixel coordinates.
+    isRight (ndarray): (N,) boolean handedness array.
+
+    Returns:
+    ndarray: (N, 5) uint8 array, 1 for every half-closed finger.
+    """
+    tipX = landmarks[:, 4, 0]
+    ipX = landmarks[:, 3, 0]
+    mcpX = landmarks[:, 2, 0]
+    fingers = np.empty((landmarks.shape[0], 5), np.uint8)
+    # Thumb
+    fingers[:, 0] = np.where(isRight, (tipX > ipX) & (tipX < mcpX), (tipX < ipX) & (tipX > mcpX))
+    # Fingers: the fingertip lies between the DIP and PIP heights
+    tipY = landmarks[:, TIP_IDS[1:], 1]
+    dipY = landmarks[:, TIP_IDS[1:] - 3, 1]
+    pipY = landmarks[:, TIP_IDS[1:] - 1, 1]
+    fingers[:, 1:] = ((dipY <= tipY) & (tipY <= pipY)) | ((pipY <= tipY) & (tipY <= dipY))
+    return fingers
+
+
+def hands_flipped(landmarks):
+    """
+    Returns an (N,) boolean array, True where the middle fingertip is below the wrist (palm up).
+    """
+    return landmarks[:, 12, 1] > landmarks[:, 0, 1]
+
+
+def hands_turned(landmarks, isRight):
+    """
+    Returns an (N,) boolean array, True where the back of the hand faces the camera.
+    """
+    indexX = landmarks[:, 5, 0]
+    pinkyX = landmarks[:, 17, 0]
+    return np.where(isRight, indexX > pinkyX, indexX < pinkyX)
+
+
+def landmark_distances(landmarks, p1, p2):
+    """
+    Vectorized 2D distance between landmarks p1 and p2 for every hand.
+    p1 and p2 may be ints or equally sized index arrays.
+    """
+    delta = landmarks[:, p2, :2] - landmarks[:, p1, :2]
+    return np.sqrt((delta * delta).sum(axis=-1))
+
+
+def hand_scales(landmarks):
+    """
+    Returns an (N,) array with the wrist to middle finger MCP length of every hand.
+    Landmark distances divided by it hold at any capture resolution and hand distance.
+    """
+    return np.maximum(landmark_distances(landmarks, *SCALE_POINTS), 1e-6)
+
+
+def hand_bboxes(pixels):
+    """
+    Returns an (N, 4) array of xmin, ymin, xmax, ymax for every hand.
+    """
+    return np.concatenate((pixels.min(axis=1), pixels.max(axis=1)), axis=1)
+
 
 class handDetector():
-    def __init__(self, mode=False, maxHands=2, detectionCon=0.5, trackCon=0.5):
+    # Stage timing spans; detectors built without a profiler share the disabled one
+    profiler = NULL_PROFILER
+
+    def __init__(self, mode=False, maxHands=2, detectionCon=0.5, trackCon=0.5,
+                 roiTracking=False, roiScale=2.0, roiRefresh=30, roiMargin=0.1, overlay=None,
+                 inferenceWidth=None, mirror=False, profiler=None):
+        """
+        Parameters:
+        mode (bool): Treat every frame as an unrelated static image.
+        maxHands (int): Maximum number of hands to detect.
+        detectionCon (float): Minimum palm detection confidence.
+        trackCon (float): Minimum landmark tracking confidence.
+        roiTracking (bool): Run inference on a crop around the previous frame's hands. The crop
+                            stays put while the hands are inside it, so MediaPipe keeps tracking
+                            them in the crop's coordinates; moving it restarts the graph.
+        roiScale (float): Size of the crop relative to the hand bbox it is placed around.
+        roiRefresh (int): Run a full-frame pass at least every this many frames to pick up new hands.
+        roiMargin (float): Move the crop once a hand comes this close to its edge, as a
+                           fraction of the crop size.
+        overlay (Overlay): Queue drawing here instead of drawing on the frame; an
+                           Overlay(enabled=False) turns all detector drawing off.
+        inferenceWidth (int): Downscale the frame (or ROI crop) to at most this width for
+                              inference. Landmarks are still mapped to full-resolution pixels.
+        mirror (bool): Report landmarks and handedness as if img had been flipped horizontally,
+                       so callers can skip cv2.flip on every frame. Drawing is then in mirrored
+                       coordinates: draw through an overlay and render it on the flipped preview.
+        profiler (Profiler): Time the preprocessing, inference and landmark stages as named spans.
+        """
         self.mode = mode
         self.maxHands = maxHands
         self.detectionCon = detectionCon
         self.trackCon = trackCon
 
-        self.mpHands = mp.solutions.hands
-        self.hands = self.mpHands.Hands(static_image_mode=self.mode, 
-                                        max_num_hands=self.maxHands,
-                                        min_detection_confidence=self.detectionCon, 
-                                        min_tracking_confidence=self.trackCon)
-        self.mpDraw = mp.solutions.drawing_utils
+        # MediaPipe graphs are built on first use or by warmup(), one per configuration
+        # (max hands, detection and tracking threshold); configure() switches between them
+        self.config = (maxHands, detectionCon, trackCon)
+        self._graphs = {}
+        self._graphState = {}  # configuration -> (hands it tracks into its next frame, frame it last ran)
+        self._graphViews = {}  # configuration -> crop its graph last ran on, None for the full frame
+        self._graphLock = threading.Lock()
+        self.switches = 0
         self.tipIds = [4, 8, 12, 16, 20]
+        self.overlay = overlay
+        self.inferenceWidth = inferenceWidth
+        self.mirror = mirror
+        if profiler is not None:
+            self.profiler = profiler
+        self._initBuffers()
+
+        # ROI tracking state: crop (x0, y0, x1, y1) for the next frame, or None for full frame
+        self.roiTracking = roiTracking
+        self.roiScale = roiScale
+        self.roiRefresh = roiRefresh
+        self.roiMargin = roiMargin
+        self.roi = None
+        self.roiFrames = 0
+        self.fullFrames = 0
+        self._roiAge = 0
+        self._roiCenter = None
+
+    @property
+    def hands(self):
+        """
+        The MediaPipe Hands graph of the active configuration, built on first access.
+        """
+        hands = self._graphs.get(self.config)
+        if hands is None:
+            hands = self._buildGraph(self.config)
+        return hands
+
+    @hands.setter
+    def hands(self, hands):
+        self._graphs[self.config] = hands
+
+    def _buildGraph(self, config):
+        with self._graphLock:
+            hands = self._graphs.get(config)
+            if hands is None:
+                # Imported here rather than at module load: mediapipe takes most of the start-up
+                # time, and modules that only need the landmark layouts never run it
+                import mediapipe as mp
+                self.mpHands = mp.solutions.hands
+                self.mpDraw = mp.solutions.drawing_utils
+                maxHands, detectionCon, trackCon = config
+                hands = self._graphs[config] = self.mpHands.Hands(static_image_mode=self.mode,
+                                                                  max_num_hands=maxHands,
+                                                                  min_detection_confidence=detectionCon,
+                                                                  min_tracking_confidence=trackCon)
+            return hands
+
+    def configure(self, maxHands=None, detectionCon=None, trackCon=None):
+        """
+        Switches the MediaPipe configuration used from the next frame on; None
+        picks the constructor value. The Hands solution fixes these options per
+        graph, so every configuration gets its own graph, built once and kept:
+        switching costs no rebuild, but the graph switched to has to find the
+        hands with its palm detector again.
+
+        Parameters:
+        maxHands (int): Maximum number of hands, at most the constructor's maxHands.
+        detectionCon (float): Minimum palm detection confidence.
+        trackCon (float): Minimum landmark tracking confidence; below it the palm detector runs again.
+
+        Returns:
+        bool: The configuration changed.
+        """
+        config = self._resolveConfig(maxHands, detectionCon, trackCon)
+        if config == self.config:
+            return False
+        self.config = config
+        self.switches += 1
+        return True
+
+    def _resolveConfig(self, maxHands=None, detectionCon=None, trackCon=None):
+        return (self.maxHands if maxHands is None else min(max(maxHands, 1), self.maxHands),
+                self.detectionCon if detectionCon is None else detectionCon,
+                self.trackCon if trackCon is None else trackCon)
+
+    def _predictDetection(self, config=None):
+        # Whether the graph of config runs its palm detector on its next frame, and whether it
+        # is stale. An estimate: the legacy Hands solution does not report it, so it is inferred
+        # from its gating rule, palm detection whenever it tracks fewer hands than max_num_hands.
+        # A tracked hand whose landmark presence drops below trackCon inside the graph is missed
+        config = self.config if config is None else config
+        frames = self.detectionFrames + self.trackingFrames
+        tracked, lastFrame = self._graphState.get(config, (0, frames))
+        stale = bool(tracked) and frames - lastFrame > STALE_GRAPH_FRAMES
+        return self.mode or stale or tracked < config[0], stale
+
+    def warmup(self, shape=(480, 640), startup=None, configs=()):
+        """
+        Imports MediaPipe, builds the graph and runs it once on a blank frame, so the
+        first real frame does not pay for them. Safe to run on a thread while the
+        camera opens, as long as it finishes before the first findHands.
+
+        Parameters:
+        shape (tuple): Frame height and width, ideally the capture size so the
+                       preprocessing buffers are allocated up front as well.
+        startup (StartupTimer): Records the import, graph and inference phases here.
+        configs (list): Further (maxHands, detectionCon, trackCon) configurations to build
+                        and warm up, so configure() never builds a graph mid-run.
+
+        Returns:
+        StartupTimer: The timer holding the phases.
+        """
+        startup = startup or StartupTimer()
+        with startup.phase("mediapipe import"):
+            import mediapipe
+        blank = np.zeros((shape[0], shape[1], 3), np.uint8)
+        with startup.phase("graph build"):
+            graphs = [self._buildGraph(config) for config in dict.fromkeys([self.config, *configs])]
+        with startup.phase("warm-up inference"):
+            for hands in graphs:
+                hands.process(self._rgb(blank))
+        return startup
+
+    def _initBuffers(self):
+        # Per-frame landmark buffers, reused across frames: pixel x, pixel y, z
+        self.landmarks = np.zeros((self.maxHands, NUM_LANDMARKS, 3), np.float32)
+        self.pixels = np.zeros((self.maxHands, NUM_LANDMARKS, 2), np.int32)
+        self.rightHand = np.zeros(self.maxHands, bool)
+        self.scores = np.zeros(self.maxHands, np.float32)
+        self.handStates = np.zeros(self.maxHands, HAND_STATE_DTYPE)
+        self.handCount = 0
+        # Per-frame detection state: lowest handedness score of the frame's hands, and whether
+        # MediaPipe is estimated to have run its palm detector rather than only tracking the
+        # previous hands (see _predictDetection)
+        self.confidence = 0.0
+        self.detected = False
+        self.detectionFrames = 0
+        self.trackingFrames = 0
+        self._detecting = False
+        self.handNo = 0
+        self.lmList = []
+        # Preprocessing scratch buffers, grown to the largest frame seen
+        self._scratch = {}
 
     def findHands(self, img, draw=True):
-        imgRGB = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-        self.results = self.hands.process(imgRGB)
+        """
+        Runs hand detection on img and fills the landmark buffers in full-frame pixel coordinates.
+        With roiTracking, inference runs on a crop around the previous hands and self.results
+        is relative to self.roi; a full-frame pass is used whenever tracking is lost.
+        """
+        frameWidth = img.shape[1]
+        self._detecting = False
+        roi = self.roi if self.roiTracking else None
+        if roi is not None:
+            x0, y0, x1, y1 = roi
+            if self.mirror:
+                # self.roi is in mirrored coordinates, img is not
+                x0, x1 = frameWidth - x1, frameWidth - x0
+            view = img[y0:y1, x0:x1]
+            self.results = self._process(view, (x0, y0, x1, y1))
+            if not self._tracked():
+                roi = self.roi = None
+            else:
+                self.roiFrames += 1
+                self._roiAge += 1
+        if roi is None:
+            x0, y0 = 0, 0
+            view = img
+            self.results = self._process(img)
+            self.fullFrames += 1
+            self._roiAge = 0
 
-        if self.results.multi_hand_landmarks:
-            for handLms in self.results.multi_hand_landmarks:
-                if draw:
-                    self.mpDraw.draw_landmarks(img, handLms,
-                                               self.mpHands.HAND_CONNECTIONS)
+        self.detected = self._detecting
+        if self.detected:
+            self.detectionFrames += 1
+        else:
+            self.trackingFrames += 1
+
+        with self.profiler.span("detector.landmarks"):
+            self.handCount = 0
+            self.confidence = 0.0
+            if self.results.multi_hand_landmarks:
+                h, w, c = view.shape
+                for handNo, handLms in enumerate(self.results.multi_hand_landmarks[:self.maxHands]):
+                    self.landmarks[handNo] = [(lm.x, lm.y, lm.z) for lm in handLms.landmark]
+                    handedness = self.results.multi_handedness[handNo].classification[0]
+                    # MediaPipe labels assume a mirrored image, so they swap when the frame is not flipped
+                    self.rightHand[handNo] = (handedness.label == 'Right') != self.mirror
+                    self.scores[handNo] = handedness.score
+                    if draw and self.overlay is None and not self.mirror:
+                        # view is a slice of img, so this draws at full-frame positions
+                        self.mpDraw.draw_landmarks(view, handLms,
+                                                   self.mpHands.HAND_CONNECTIONS)
+                self.handCount = handNo + 1
+                self.confidence = float(self.scores[:self.handCount].min())
+                pixels = self.landmarks[:self.handCount, :, :2]
+                pixels *= (w, h)
+                if roi is not None:
+                    pixels += (x0, y0)
+                    # MediaPipe z is scaled like x, so in crop widths; rescale it to frame widths
+                    self.landmarks[:self.handCount, :, 2] *= w / frameWidth
+                if self.mirror:
+                    np.subtract(frameWidth, pixels[..., 0], out=pixels[..., 0])
+                # Whole-pixel view, matching the int() pixel grid the finger predicates were tuned on
+                np.copyto(self.pixels[:self.handCount], pixels, casting='unsafe')
+                if draw and (self.overlay is not None or self.mirror):
+                    canvas = self._canvas(img)
+                    for hand in self.pixels[:self.handCount]:
+                        canvas.hand(hand)
+
+        if self.roiTracking:
+            self._updateRoi(img.shape)
 
         return img
 
+    def _buffer(self, name, h, w):
+        # A contiguous (h, w, 3) view of a flat scratch buffer; ROI crops change size every
+        # frame, so the buffer only grows and smaller frames reuse its head
+        size = h * w * 3
+        buffer = self._scratch.get(name)
+        if buffer is None or buffer.size < size:
+            buffer = self._scratch[name] = np.empty(size, np.uint8)
+        return buffer[:size].reshape(h, w, 3)
+
+    def _process(self, view, crop=None):
+        with self.profiler.span("detector.preprocess"):
+            rgb = self._rgb(view)
+        hands = self.hands
+        frames = self.detectionFrames + self.trackingFrames
+        if self._graphViews.get(self.config, crop) != crop:
+            # The graph tracks hands in the coordinates of the view it last ran on; in another
+            # crop those positions are wrong, so it starts over with its palm detector
+            if hasattr(hands, "reset"):
+                hands.reset()
+            self._graphState.pop(self.config, None)
+        self._graphViews[self.config] = crop
+        detecting, stale = self._predictDetection()
+        if stale and hasattr(hands, "reset"):
+            # Tracking from long-gone positions would drop the hands for a frame first
+            hands.reset()
+        with self.profiler.span("detector.inference"):
+            start = time.perf_counter()
+            results = hands.process(rgb)
+            self.profiler.record("detector.palmDetection" if detecting else "detector.tracking",
+                                 time.perf_counter() - start)
+        self._graphState[self.config] = (len(results.multi_hand_landmarks or ()), frames)
+        self._detecting = self._detecting or detecting
+        return results
+
+    def detectionStats(self):
+        """
+        Returns the detection vs tracking frame counters and the active configuration.
+        The counters are estimates: MediaPipe does not report when its palm detector
+        runs, so it is inferred from the hands each graph tracked into the frame.
+        """
+        frames = self.detectionFrames + self.trackingFrames
+        maxHands, detectionCon, trackCon = self.config
+        return {"estimatedDetectionFrames": self.detectionFrames, "estimatedTrackingFrames": self.trackingFrames,
+                "estimatedDetectionRatio": self.detectionFrames / frames if frames else 0.0,
+                "switches": self.switches, "maxHands": maxHands, "detectionCon": detectionCon, "trackCon": trackCon}
+
+    def _rgb(self, view):
+        # Downscaling and colour conversion write into reused buffers instead of allocating
+        # two frames per call; MediaPipe copies its input, so they are free again after process()
+        h, w = view.shape[:2]
+        if self.inferenceWidth is not None and w > self.inferenceWidth:
+            # MediaPipe landmarks are normalized, so scaling them by the full-size view
+            # keeps full pixel precision whatever resolution inference ran at
+            size = (self.inferenceWidth, max(round(h * self.inferenceWidth / w), 1))
+            view = cv2.resize(view, size, dst=self._buffer("small", size[1], size[0]), interpolation=cv2.INTER_AREA)
+            h, w = size[1], size[0]
+        return cv2.cvtColor(view, cv2.COLOR_BGR2RGB, dst=self._buffer("rgb", h, w))
+
+    def _tracked(self):
+        # The crop still holds every hand: the graph kept all the hands of the last frame, which
+        # it drops once their landmark presence falls below trackCon, and none left the crop
+        hands = self.results.multi_hand_landmarks
+        if not hands or len(hands) < self.handCount:
+            return False
+        return all(0.0 <= lm.x <= 1.0 and 0.0 <= lm.y <= 1.0 for hand in hands for lm in hand.landmark)
+
+    def _updateRoi(self, shape):
+        # Crop for the next frame: the current one while the hands stay clear of its edges,
+        # otherwise the hands' bbox scaled by roiScale, widened by the last frame-to-frame
+        # motion and squared, or None to run full frame
+        h, w = shape[:2]
+        if self.handCount == 0 or self._roiAge >= self.roiRefresh:
+            self.roi = None
+            self._roiCenter = None
+            return
+        pixels = self.pixels[:self.handCount].reshape(-1, 2)
+        (xmin, ymin), (xmax, ymax) = pixels.min(axis=0), pixels.max(axis=0)
+        center = np.array(((xmin + xmax) / 2, (ymin + ymax) / 2))
+        motion = 0.0 if self._roiCenter is None else float(np.abs(center - self._roiCenter).max())
+        self._roiCenter = center
+        if self.roi is not None:
+            x0, y0, x1, y1 = self.roi
+            mx, my = (x1 - x0) * self.roiMargin, (y1 - y0) * self.roiMargin
+            if x0 + mx <= xmin and xmax <= x1 - mx and y0 + my <= ymin and ymax <= y1 - my:
+                return
+
+        half = (max(xmax - xmin, ymax - ymin) * self.roiScale) / 2 + motion
+        x0, x1 = int(max(center[0] - half, 0)), int(min(center[0] + half, w))
+        y0, y1 = int(max(center[1] - half, 0)), int(min(center[1] + half, h))
+        if x1 <= x0 or y1 <= y0 or (x1 - x0) * (y1 - y0) > 0.6 * w * h:
+            # Hardly smaller than the frame, not worth cropping
+            self.roi = None
+        else:
+            self.roi = x0, y0, x1, y1
+
     def findPosition(self, img, handNo=0, draw=True):
-        xList = []
-        yList = []
-        # zList = []
-        bbox = []
-        self.lmList = []
-        if self.results.multi_hand_landmarks:
-            myHand = self.results.multi_hand_landmarks[handNo]
-            for id, lm in enumerate(myHand.landmark):
-                h, w, c = img.shape
-                cx, cy, cz = int(lm.x * w), int(lm.y * h), lm.z
-                xList.append(cx)
-                yList.append(cy)
-                # zList.append(cz)
-                self.lmList.append([id, cx, cy, cz])
+        with self.profiler.span("detector.findPosition"):
+            bbox = []
+            self.lmList = []
+            self.handNo = handNo
+            if handNo < self.handCount:
+                xy = self.pixels[handNo]
+                self.lmList = [[id, cx, cy, cz] for id, (cx, cy), cz in
+                               zip(range(NUM_LANDMARKS), xy.tolist(), self.landmarks[handNo, :, 2].tolist())]
+
+                xmin, ymin = xy.min(axis=0).tolist()
+                xmax, ymax = xy.max(axis=0).tolist()
+                bbox = xmin, ymin, xmax, ymax
+
                 if draw:
-                    cv2.circle(img, (cx, cy), 5, (255, 0, 255), cv2.FILLED)
+                    canvas = self._canvas(img)
+                    for cx, cy in xy.tolist():
+                        canvas.circle((cx, cy), 5, (255, 0, 255), cv2.FILLED)
+                    canvas.rectangle((xmin - 20, ymin - 20), (xmax + 20, ymax + 20),
+                                     (0, 255, 0), 2)
+
+            return self.lmList, bbox
+
+    def _canvas(self, img):
+        # Queue into the overlay when there is one, otherwise draw on the frame right away
+        return self.overlay if self.overlay is not None else Canvas(img)
 
-            xmin, xmax = min(xList), max(xList)
-            ymin, ymax = min(yList), max(yList)
-            bbox = xmin, ymin, xmax, ymax
+    def evaluateHands(self):
+        """
+        Evaluates finger states, orientation and bbox for every detected hand in one pass.
 
-            if draw:
-                cv2.rectangle(img, (xmin - 20, ymin - 20), (xmax + 20, ymax + 20),
-                              (0, 255, 0), 2)
+        Returns:
+        ndarray: (handCount,) array of HAND_STATE_DTYPE records. It is a view
+        of a buffer reused every frame; copy it to keep it past the next frame.
+        """
+        with self.profiler.span("detector.evaluateHands"):
+            n = self.handCount
+            states = self.handStates[:n]
+            if n == 0:
+                return states
+            landmarks, pixels, isRight = self.landmarks[:n], self.pixels[:n], self.rightHand[:n]
+            states["right"] = isRight
+            states["fingers"] = fingers_up(pixels, isRight)
+            states["halfClosed"] = fingers_half_closed(pixels, isRight)
+            states["flipped"] = hands_flipped(landmarks)
+            states["turned"] = hands_turned(landmarks, isRight)
+            states["bbox"] = hand_bboxes(pixels)
+            states["scale"] = hand_scales(landmarks)
+            return states
 
-        return self.lmList, bbox
+    def _hand(self, pixels=False):
+        # One-hand batch views of the hand selected in findPosition
+        hand = slice(self.handNo, self.handNo + 1)
+        return (self.pixels[hand] if pixels else self.landmarks[hand]), self.rightHand[hand]
 
     def fingersUp(self):
-        fingers = []
-        # Thumb
         if len(self.lmList) == 0:
             return []
-        # print(self.lmList[self.tipIds[0]])
-        
-        handType = self.results.multi_handedness[0].classification[0].label
-        
-        if self.lmList[self.tipIds[0]][1]  > self.lmList[self.tipIds[0] - 1][1] and handType == 'Left':
-            fingers.append(1)
-
-        elif self.lmList[self.tipIds[0]][1]  < self.lmList[self.tipIds[0] - 1][1] and handType == 'Right':
-            fingers.append(1)
-            
-        else:
-            fingers.append(0)
-
-        # Fingers
-        for id in range(1, 5):
-            if self.lmList[self.tipIds[id]][2] < self.lmList[self.tipIds[id] - 2][2]:
-                fingers.append(1)
-            else:
-                fingers.append(0)
-
-        return fingers
+        return fingers_up(*self._hand(pixels=True))[0].tolist()
     
     def fingersHalfClosed(self):
-        fingers = []
         if len(self.lmList) == 0:
             return []
-
-        handType = self.results.multi_handedness[0].classification[0].label
-
-        # Thumb
-        if self.lmList[self.tipIds[0]][1] < self.lmList[self.tipIds[0] - 1][1] and \
-            self.lmList[self.tipIds[0]][1] > self.lmList[self.tipIds[0] - 2][1] and handType == 'Left':
-                
-            fingers.append(1)
-        elif self.lmList[self.tipIds[0]][1] > self.lmList[self.tipIds[0] - 1][1] and \
-            self.lmList[self.tipIds[0]][1] < self.lmList[self.tipIds[0] - 2][1] and handType == 'Right':
-            fingers.append(1)
-        else:
-            fingers.append(0)
-
-        # Fingers
-        for id in range(1, 5):
-            tipY = self.lmList[self.tipIds[id]][2]
-            dipY = self.lmList[self.tipIds[id] - 3][2]
-            pipY = self.lmList[self.tipIds[id] - 1][2]
-
-            # Check if the fingertip is roughly in the middle position between DIP and PIP
-            if (dipY <= tipY <= pipY) or (pipY <= tipY <= dipY):
-            # if tipY - pipY <= 0 :
-                fingers.append(1)
-            else:
-                fingers.append(0)
-
-        return fingers
+        return fingers_half_closed(*self._hand(pixels=True))[0].tolist()
     
     def is_hand_flipped(self):
-        # Assuming a right hand, check if the palm is facing up or down
-        # Compare the Z coordinates of the middle finger tip and wrist
-        landmarks = self.results.multi_hand_landmarks[0].landmark
-        wrist = landmarks[0]
-        middle_finger_tip = landmarks[12]
-
-        if middle_finger_tip.y > wrist.y:
-            return True  # Palm up
-        else:
-            return False  # Palm down
+        # Palm up when the middle finger tip is below the wrist
+        return bool(hands_flipped(self._hand()[0])[0])
         
     def is_hand_turned(self):
-        
-        landmarks = self.results.multi_hand_landmarks[0].landmark
-        
-        index_bottom = landmarks[5]
-        pinky_bottom = landmarks[17]
-        
-        
-        # flipped = self.is_hand_flipped()
-        turned = False
-        
-        handType = self.results.multi_handedness[0].classification[0].label
-        
-        # print(f"index: {index_bottom}")
-        # print(f"pinky: {pinky_bottom}")
-        # print(f"Hand: {handType}")
-        # print(f"Condition 1: {(index_bottom.x > pinky_bottom.x) and handType == 'Right'}")
-        # print(f"Condition 2: {(index_bottom.x < pinky_bottom.x) and handType == 'Left'}")
-        
-        if (index_bottom.x > pinky_bottom.x) and handType == 'Right':
-            turned = True
-            
-        elif (index_bottom.x < pinky_bottom.x) and handType == 'Left':
-            turned = True
-            
-        # print(turned, flipped, turned ^ flipped)
-        
-        # return turned ^ flipped
-        return turned 
+        return bool(hands_turned(*self._hand())[0])
+
+    def handScale(self):
+        """
+        Returns the pixel length of the hand scale of the hand selected in findPosition.
+        """
+        return float(hand_scales(self._hand()[0])[0])
 
-    def findDistance(self, p1, p2, img, draw=True, r=10, t=3):
-        x1, y1, z1 = self.lmList[p1][1:]
-        x2, y2, z2 = self.lmList[p2][1:]
+    def findDistance(self, p1, p2, img, draw=True, r=10, t=3, normalized=False):
+        """
+        Returns the distance between landmarks p1 and p2, the image and the line
+        endpoints and midpoint. With normalized, the distance is in hand scales
+        instead of pixels, so thresholds on it do not depend on the resolution.
+        """
+        x1, y1 = self.lmList[p1][1:3]
+        x2, y2 = self.lmList[p2][1:3]
         cx, cy = (x1 + x2) // 2, (y1 + y2) // 2
 
         if draw:
-            cv2.line(img, (x1, y1), (x2, y2), (255, 0, 255), t)
-            cv2.circle(img, (x1, y1), r, (255, 0, 255), cv2.FILLED)
-            cv2.circle(img, (x2, y2), r, (255, 0, 255), cv2.FILLED)
-            cv2.circle(img, (cx, cy), r, (0, 0, 255), cv2.FILLED)
-        length = math.hypot(x2 - x1, y2 - y1)
+            canvas = self._canvas(img)
+            canvas.line((x1, y1), (x2, y2), (255, 0, 255), t)
+            canvas.circle((x1, y1), r, (255, 0, 255), cv2.FILLED)
+            canvas.circle((x2, y2), r, (255, 0, 255), cv2.FILLED)
+            canvas.circle((cx, cy), r, (0, 0, 255), cv2.FILLED)
+        length = float(landmark_distances(self._hand(pixels=True)[0], p1, p2)[0])
+        if normalized:
+            length /= self.handScale()
 
         return length, img, [x1, y1, x2, y2, cx, cy]
 
+    def snapshot(self):
+        # Shallow copy holding the current results/lmList; both are rebuilt
+        # (not mutated) every frame, so the copy stays consistent while this
+        # detector moves on to the next frame in another pipeline stage.
+        # The landmark buffers are reused in place, so those are copied.
+        snap = copy.copy(self)
+        snap.landmarks = self.landmarks[:self.handCount].copy()
+        snap.pixels = self.pixels[:self.handCount].copy()
+        snap.rightHand = self.rightHand[:self.handCount].copy()
+        snap.scores = self.scores[:self.handCount].copy()
+        snap.handStates = self.handStates[:self.handCount].copy()
+        return snap
+
+
+class DetectionPolicy:
+    """
+    Picks the detector's MediaPipe configuration frame by frame so the palm
+    detector, the expensive half of the Hands graph, runs as rarely as possible.
+
+    The graph runs palm detection on every frame where it tracks fewer hands
+    than its max_num_hands, and whenever tracking confidence drops below its
+    threshold. So while a gesture session is active the policy tracks a single
+    hand with a relaxed tracking threshold; outside sessions, when fewer hands
+    are in view than the detector allows, it tracks only those and probes for
+    more with the full configuration every probeInterval seconds.
 
-def main():
+    MediaPipe fixes the thresholds per graph, and a graph switched to has no
+    tracking state, so a switch that only changes thresholds waits for a frame
+    where the active graph runs its palm detector anyway, e.g. after losing the
+    hand. A session therefore never costs a detection at its start or its end;
+    it gets the relaxed threshold from its first re-detection on, and keeps it
+    until the first re-detection after it ended. state is the configuration
+    wanted, detector.config the one in use.
+
+    Parameters:
+    detector (handDetector): Detector to configure; call update after every findHands.
+    sessionHands (int): Hands tracked during a gesture session.
+    sessionTrackCon (float): Tracking threshold during a session.
+    sessionDetectionCon (float): Detection threshold during a session, None for the detector's own.
+    linger (float): Seconds a session lasts after its last active frame.
+    probeInterval (float): Seconds between full-configuration frames looking for more hands.
+    """
+    def __init__(self, detector, sessionHands=1, sessionTrackCon=0.3, sessionDetectionCon=None, linger=1.0,
+                 probeInterval=1.0):
+        self.detector = detector
+        self.sessionHands = sessionHands
+        self.sessionTrackCon = sessionTrackCon
+        self.sessionDetectionCon = sessionDetectionCon
+        self.linger = linger
+        self.probeInterval = probeInterval
+        self.state = "full"
+        self._lastActive = None
+        self._lastProbe = 0.0
+
+    @property
+    def configs(self):
+        """
+        Every configuration the policy may switch to, for handDetector.warmup.
+        """
+        d = self.detector
+        session = (min(self.sessionHands, d.maxHands),
+                   d.detectionCon if self.sessionDetectionCon is None else self.sessionDetectionCon,
+                   self.sessionTrackCon)
+        return [session] + [(n, d.detectionCon, d.trackCon) for n in range(1, d.maxHands)]
+
+    def update(self, active, t=None):
+        """
+        Configures the detector for the next frame.
+
+        Parameters:
+        active (bool): A gesture session is active, e.g. a gesture was matched this frame.
+        t (float): Timestamp in seconds, defaults to time.perf_counter().
+
+        Returns:
+        str: "session", "reduced" or "full".
+        """
+        t = time.perf_counter() if t is None else t
+        d = self.detector
+        if active:
+            self._lastActive = t
+        if self._lastActive is not None and t - self._lastActive <= self.linger:
+            config = d._resolveConfig(self.sessionHands, self.sessionDetectionCon, self.sessionTrackCon)
+            self.state = "session"
+        elif 0 < d.handCount < d.maxHands and t - self._lastProbe < self.probeInterval:
+            config = d._resolveConfig(d.handCount)
+            self.state = "reduced"
+        else:
+            config = d._resolveConfig()
+            self._lastProbe = t
+            self.state = "full"
+        if config[0] != d.config[0] or d._predictDetection()[0]:
+            d.configure(*config)
+        return self.state
+
+
+def main(previewFps=30, capture=None, inferenceWidth=None):
+    startup = StartupTimer()
+    startup.add("imports", startup.start)
+    cap = capture or Capture()
+    # Detection queues its drawing per frame, the preview draws it at most previewFps times a second
+    detectionOverlay = Overlay()
+    overlay = Overlay(previewFps=previewFps)
+    # Landmarks come out mirrored, so only previewed frames are ever flipped
+    detector = handDetector(overlay=detectionOverlay, inferenceWidth=inferenceWidth, mirror=True)
+    # Tracks only the hands in view and probes for more once a second
+    policy = DetectionPolicy(detector)
+    # The graphs warm up while the camera opens, both take the better part of a second
+    warmup = threading.Thread(target=detector.warmup,
+                              args=((cap.height or 480, cap.width or 640), startup, policy.configs),
+                              name="warmup", daemon=True)
+    warmup.start()
+    with startup.phase("camera open"):
+        cap.open()
+    print(cap.describe())
+    with startup.phase("warm-up wait"):
+        warmup.join()
     pTime = 0
-    cTime = 0
-    cap = cv2.VideoCapture(0)
-    detector = handDetector()
-    while True:
-        success, img = cap.read()
-        img = cv2.flip(img, 1)
+
+    def process(img):
         img = detector.findHands(img)
+        policy.update(False)
         lmList, bbox = detector.findPosition(img)
         detector.fingersUp()
+        return img, lmList, detectionOverlay.take()
+
+    def output(_, result):
+        nonlocal pTime
+        img, lmList, layer = result
         if len(lmList) != 0:
             print(lmList[4])
 
         cTime = time.time()
-        fps = 1 / (cTime - pTime)
+        fps = 1 / (cTime - pTime) if pTime else 0
         pTime = cTime
 
-        cv2.putText(img, str(int(fps)), (10, 70), cv2.FONT_HERSHEY_PLAIN, 3,
-                    (255, 0, 255), 3)
+        if not overlay.due():
+            return True
+        overlay.text(str(int(fps)), (10, 70), 3, (255, 0, 255), 3)
+        overlay.text(pipeline.summary(), (10, 110), 1, (255, 0, 255), 1)
+        overlay.render(cv2.flip(img, 1, dst=img), layer)
 
         cv2.imshow("Image", img)
-        if cv2.waitKey(1) & 0xff == ord('q'):
-            break
+        return not (cv2.waitKey(1) & 0xff == ord('q'))
+
+    pipeline = Pipeline(cap.read, process, output, startup)
+    pipeline.run()
+    print(startup.report())
+    print(pipeline.report())
+    print(detector.detectionStats())
+    print(cap.report())
     cap.release()
     cv2.destroyAllWindows()
 
 
 if __name__ == "__main__":
-    main()
+    args = add_capture_arguments(argparse.ArgumentParser(description="Hand tracking preview")).parse_args()
+    main(capture=capture_from_args(args), inferenceWidth=args.inference_width)
@@ -0,0 +1,266 @@
+import argparse
+import time
+import numpy as np
+from ActuatorModule import Monitor, parse_monitors
+
+
+class _Transform:
+    # Everything map() needs, rebuilt as a whole and swapped in with one assignment
+    __slots__ = ("scale", "bias", "center", "half", "acceleration", "bounds", "scaleArray", "biasArray",
+                 "centerArray", "halfArray", "lowArray", "highArray")
+
+    def __init__(self, region, target, bounds, acceleration):
+        x0, y0, x1, y1 = region
+        left, top, right, bottom = target
+        sx, sy = (right - left) / (x1 - x0), (bottom - top) / (y1 - y0)
+        self.scale = (sx, sy)
+        self.bias = (left - x0 * sx, top - y0 * sy)
+        self.center = ((x0 + x1) / 2, (y0 + y1) / 2)
+        self.half = ((x1 - x0) / 2, (y1 - y0) / 2)
+        self.acceleration = acceleration
+        self.bounds = bounds
+        self.scaleArray, self.biasArray = np.array(self.scale), np.array(self.bias)
+        self.centerArray, self.halfArray = np.array(self.center), np.array(self.half)
+        boundsArray = np.array(bounds, float)
+        self.lowArray, self.highArray = boundsArray[:, :2], boundsArray[:, 2:]
+
+
+class CursorMapping:
+    """
+    Maps camera pixels to desktop pixels with a transform precomputed from the
+    active camera region, the monitor layout and an acceleration curve, so a
+    point costs a few float operations instead of two np.interp calls.
+
+    The region maps onto the bounding box of the target monitors and points
+    are clamped to the nearest monitor, which keeps the cursor off the dead
+    areas of non-rectangular multi-monitor desktops. Recalibrating (region,
+    frame size, monitors, curve) rebuilds the transform and swaps it in at
+    once, so a running controller picks it up on its next point.
+
+    Parameters:
+    monitors (list): Monitors of the desktop, e.g. from ActuatorModule.monitors().
+    frameSize (tuple): Camera (width, height); can also be set later with setFrameSize.
+    margin (int): Camera pixels ignored at every edge when no region is set (frameR).
+    region (tuple): Active camera region (x0, y0, x1, y1) in pixels, overrides margin.
+    monitor (int): Map onto this monitor only instead of the whole desktop.
+    acceleration (float): Exponent of the curve applied around the region center;
+                          1 is linear, above 1 gives finer control near the center.
+    """
+    def __init__(self, monitors, frameSize=None, margin=100, region=None, monitor=None, acceleration=1.0):
+        self.monitors = [Monitor(*m) for m in monitors]
+        self.frameSize = tuple(frameSize) if frameSize is not None else None
+        self.margin = margin
+        self.monitor = monitor
+        self.acceleration = acceleration
+        self._region = tuple(region) if region is not None else None
+        self._transform = None
+        if self.region is not None:
+            self._compile()
+
+    @property
+    def region(self):
+        """
+        Active camera region (x0, y0, x1, y1): the calibrated one, or the frame less its margin.
+        """
+        if self._region is not None:
+            return self._region
+        if self.frameSize is None:
+            return None
+        w, h = self.frameSize
+        return self.margin, self.margin, w - self.margin, h - self.margin
+
+    @property
+    def targets(self):
+        """
+        Monitors the region maps onto.
+        """
+        return self.monitors if self.monitor is None else [self.monitors[self.monitor]]
+
+    @property
+    def ready(self):
+        return self._transform is not None
+
+    def _compile(self):
+        region = self.region
+        if not self.monitors or region is None:
+            return  # completed later by setMonitors or setFrameSize
+        x0, y0, x1, y1 = region
+        if x1 <= x0 or y1 <= y0:
+            raise ValueError(f"Empty camera region {region}")
+        targets = self.targets
+        bounds = [(m.x, m.y, m.x + m.width - 1, m.y + m.height - 1) for m in targets]
+        # The region spans the targets' bounding box, as np.interp onto (0, wScr) did for one screen
+        target = (min(m.x for m in targets), min(m.y for m in targets),
+                  max(m.x + m.width for m in targets), max(m.y + m.height for m in targets))
+        self._transform = _Transform(region, target, bounds, float(self.acceleration))
+
+    def setFrameSize(self, width, height):
+        """
+        Sets the camera frame size; cheap when it did not change, so it can be called every frame.
+        """
+        if self.frameSize != (width, height):
+            self.frameSize = (width, height)
+            self._compile()
+
+    def setRegion(self, region):
+        """
+        Sets the active camera region (x0, y0, x1, y1), or None to go back to the margin.
+        """
+        self._region = tuple(region) if region is not None else None
+        self._compile()
+
+    def setMonitors(self, monitors, monitor=None):
+        """
+        Sets the monitor layout and the monitor to map onto (None for all of them).
+        """
+        self.monitors = [Monitor(*m) for m in monitors]
+        self.monitor = monitor
+        self._compile()
+
+    def setAcceleration(self, acceleration):
+        self.acceleration = acceleration
+        self._compile()
+
+    def calibrate(self, points, padding=0.05, minSize=0.2):
+        """
+        Sets the active region to the bounding box of camera points, e.g. the
+        fingertip positions recorded while the user sweeps their comfortable reach.
+
+        Parameters:
+        points (array): (N, 2) camera pixel coordinates.
+        padding (float): Extra room on every side, as a fraction of the box size.
+        minSize (float): Smallest region side, as a fraction of the frame size.
+
+        Returns:
+        tuple: The new region (x0, y0, x1, y1).
+        """
+        points = np.asarray(points, float).reshape(-1, 2)
+        if not len(points) or self.frameSize is None:
+            raise ValueError("Calibration needs points and a frame size")
+        frame = np.array(self.frameSize, float)
+        low, high = points.min(0), points.max(0)
+        center = (low + high) / 2
+        half = np.maximum((high - low) * (1 + 2 * padding), frame * minSize) / 2
+        low, high = np.maximum(center - half, 0), np.minimum(center + half, frame)
+        self.setRegion((int(low[0]), int(low[1]), int(high[0]), int(high[1])))
+        return self._region
+
+    def map(self, x, y):
+        """
+        Maps one camera point to desktop pixels. Returns (x, y) as floats.
+        """
+        t = self._transform
+        if t.acceleration != 1.0:
+            x, y = (c + _curve((v - c) / h, t.acceleration) * h for v, c, h in zip((x, y), t.center, t.half))
+        x = x * t.scale[0] + t.bias[0]
+        y = y * t.scale[1] + t.bias[1]
+        best = None
+        for left, top, right, bottom in t.bounds:
+            cx = left if x < left else right if x > right else x
+            cy = top if y < top else bottom if y > bottom else y
+            if cx == x and cy == y:
+                return x, y
+            distance = (cx - x) ** 2 + (cy - y) ** 2
+            if best is None or distance < best[0]:
+                best = (distance, cx, cy)
+        return best[1], best[2]
+
+    def map_points(self, points):
+        """
+        Maps a batch of camera points to desktop pixels in one vectorized pass.
+
+        Parameters:
+        points (array): (..., 2) camera pixel coordinates.
+
+        Returns:
+        ndarray: Desktop coordinates of the same shape, as floats.
+        """
+        t = self._transform
+        points = np.asarray(points, float)
+        flat = points.reshape(-1, 2)
+        if t.acceleration != 1.0:
+            u = np.clip((flat - t.centerArray) / t.halfArray, -1.0, 1.0)
+            flat = t.centerArray + np.sign(u) * np.abs(u) ** t.acceleration * t.halfArray
+        flat = flat * t.scaleArray + t.biasArray
+        if len(t.bounds) == 1:
+            return np.clip(flat, t.lowArray[0], t.highArray[0]).reshape(points.shape)
+        # Clamp onto every monitor and keep the nearest one
+        clamped = np.clip(flat[:, None, :], t.lowArray, t.highArray)
+        nearest = ((clamped - flat[:, None, :]) ** 2).sum(-1).argmin(1)
+        return clamped[np.arange(len(flat)), nearest].reshape(points.shape)
+
+    def draw(self, canvas, color=(255, 0, 255), thickness=2):
+        """
+        Draws the active region onto a Canvas or Overlay.
+        """
+        x0, y0, x1, y1 = (int(v) for v in self.region)
+        canvas.rectangle((x0, y0), (x1, y1), color, thickness)
+
+
+def _curve(u, exponent):
+    # Odd power curve on [-1, 1]; outside the region the clamp decides anyway
+    u = -1.0 if u < -1.0 else 1.0 if u > 1.0 else u
+    return u ** exponent if u >= 0 else -((-u) ** exponent)
+
+
+def add_mapping_arguments(parser):
+    """
+    Adds the cursor mapping options shared by the command line entry points to an argparse parser.
+    """
+    parser.add_argument("--frame-margin", type=int, default=100,
+                        help="Camera pixels ignored at every edge of the active region")
+    parser.add_argument("--region", type=lambda text: tuple(int(v) for v in text.split(",")),
+                        help="Active camera region x0,y0,x1,y1, overrides --frame-margin")
+    parser.add_argument("--monitors", type=parse_monitors,
+                        help="Monitor layout WxH+X+Y,... instead of querying the desktop")
+    parser.add_argument("--monitor", type=int, help="Map onto this monitor only (index into the layout)")
+    parser.add_argument("--acceleration", type=float, default=1.0,
+                        help="Cursor curve exponent around the region center, 1 is linear")
+    return parser
+
+
+def mapping_from_args(args, layout):
+    """
+    Builds a CursorMapping from options added by add_mapping_arguments; layout is
+    used unless --monitors was given.
+    """
+    return CursorMapping(args.monitors or layout, margin=args.frame_margin, region=args.region,
+                         monitor=args.monitor, acceleration=args.acceleration)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the precomputed cursor mapping with np.interp")
+    add_mapping_arguments(parser)
+    parser.add_argument("--frame", default="640x480", help="Camera frame size WxH")
+    parser.add_argument("--points", type=int, default=10000)
+    args = parser.parse_args()
+
+    wCam, hCam = (int(v) for v in args.frame.split("x"))
+    mapping = mapping_from_args(args, parse_monitors("1920x1080"))
+    mapping.setFrameSize(wCam, hCam)
+    x0, y0, x1, y1 = mapping.region
+    left, top = min(m.x for m in mapping.targets), min(m.y for m in mapping.targets)
+    right = max(m.x + m.width for m in mapping.targets)
+    bottom = max(m.y + m.height for m in mapping.targets)
+    points = np.random.default_rng(0).uniform((0, 0), (wCam, hCam), (args.points, 2))
+
+    start = time.perf_counter()
+    for x, y in points.tolist():
+        np.interp(x, (x0, x1), (left, right)), np.interp(y, (y0, y1), (top, bottom))
+    interp = (time.perf_counter() - start) / len(points)
+    start = time.perf_counter()
+    for x, y in points.tolist():
+        mapping.map(x, y)
+    scalar = (time.perf_counter() - start) / len(points)
+    start = time.perf_counter()
+    mapped = mapping.map_points(points)
+    batch = (time.perf_counter() - start) / len(points)
+
+    print(f"region {mapping.region} -> {mapping.targets}")
+    print(f"np.interp x2: {interp * 1e6:.2f} us/point, map: {scalar * 1e6:.2f} us/point, "
+          f"map_points: {batch * 1e6:.3f} us/point")
+    print(f"mapped range {mapped.min(0).tolist()} .. {mapped.max(0).tolist()}")
+
+
+if __name__ == "__main__":
+    main()
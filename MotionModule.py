@@ -0,0 +1,195 @@
+import argparse
+import collections
+import time
+from ActuatorModule import CursorActuator, RecordingBackend
+
+
+class VelocityEstimator:
+    """
+    Velocity of a moving point from timestamped samples: the least-squares
+    slope over the samples of the last window seconds, which averages out
+    landmark jitter without lagging like smoothing the positions would.
+
+    Parameters:
+    window (float): Seconds of samples the slope is fitted to; the two newest
+                    are always kept, so low frame rates still get a velocity.
+    maxGap (float): A pause longer than this, in seconds, starts a new estimate.
+    """
+    def __init__(self, window=0.12, maxGap=0.5):
+        self.window = window
+        self.maxGap = maxGap
+        self.samples = collections.deque()
+
+    def reset(self):
+        self.samples.clear()
+
+    def add(self, x, y, t=None):
+        t = time.perf_counter() if t is None else t
+        if self.samples and t - self.samples[-1][0] > self.maxGap:
+            self.samples.clear()
+        self.samples.append((t, x, y))
+        while len(self.samples) > 2 and t - self.samples[0][0] > self.window:
+            self.samples.popleft()
+
+    @property
+    def interval(self):
+        """
+        Seconds between the two newest samples, or None.
+        """
+        return self.samples[-1][0] - self.samples[-2][0] if len(self.samples) > 1 else None
+
+    def velocity(self):
+        """
+        Returns (vx, vy) in units per second, (0, 0) before there are two samples.
+        """
+        n = len(self.samples)
+        if n < 2:
+            return 0.0, 0.0
+        tMean = sum(s[0] for s in self.samples) / n
+        xMean = sum(s[1] for s in self.samples) / n
+        yMean = sum(s[2] for s in self.samples) / n
+        stt = sxt = syt = 0.0
+        for t, x, y in self.samples:
+            dt = t - tMean
+            stt += dt * dt
+            sxt += dt * (x - xMean)
+            syt += dt * (y - yMean)
+        if stt <= 0:
+            return 0.0, 0.0
+        return sxt / stt, syt / stt
+
+
+def _clip(value, limit):
+    return max(-limit, min(limit, value))
+
+
+class ScrollDragEngine:
+    """
+    Continuous-time scroll and drag on top of a CursorActuator. Each detected
+    fingertip position updates a velocity estimate; the actuator integrates
+    that velocity on its own ticks, so scrolling is fractional and smooth and
+    drags move between camera frames, at the actuator rate whatever the FPS.
+
+    Scrolling follows the hand's speed rather than its offset, and when the
+    gesture ends the scroll keeps a share of its speed and coasts to a stop.
+
+    Parameters:
+    actuator (CursorActuator): Actuator to drive; can be set after construction.
+    pixelsPerDetent (float): Desktop pixels of hand travel per scroll detent.
+    maxRate (float): Scroll rate limit, in detents per second.
+    minRate (float): Scroll rates below this, in detents per second, count as a still hand.
+    inertia (float): Share of the scroll rate kept when the gesture ends, 0 stops at once.
+    decay (float): Time constant, in seconds, a released scroll slows down with.
+    horizon (float): Longest time, in seconds, a drag is extrapolated past the last frame.
+    window (float): Seconds of samples the hand velocity is estimated from.
+    """
+    def __init__(self, actuator=None, pixelsPerDetent=60.0, maxRate=40.0, minRate=1.0, inertia=0.8, decay=0.35,
+                 horizon=0.05, window=0.12):
+        self.actuator = actuator
+        self.pixelsPerDetent = pixelsPerDetent
+        self.maxRate = maxRate
+        self.minRate = minRate
+        self.inertia = inertia
+        self.decay = decay
+        self.horizon = horizon
+        self.estimator = VelocityEstimator(window)
+        self.rate = 0.0
+        self._last = None
+
+    def scroll(self, x, y, t=None):
+        """
+        Feeds a fingertip position, in desktop pixels, while the scroll gesture is held.
+        Returns the scroll rate in detents per second.
+        """
+        self.estimator.add(x, y, t)
+        vy = self.estimator.velocity()[1]
+        rate = _clip(vy / self.pixelsPerDetent, self.maxRate)
+        self.rate = rate if abs(rate) >= self.minRate else 0.0
+        self.actuator.scrollVelocity(0, self.rate)
+        return self.rate
+
+    def endScroll(self):
+        """
+        Ends the scroll gesture; the scroll coasts on with its inertia.
+        """
+        self.estimator.reset()
+        rate = self.rate * self.inertia
+        self.actuator.scrollVelocity(0, rate, self.decay if rate else None)
+        self.rate = 0.0
+
+    def drag(self, x, y, t=None):
+        """
+        Feeds a cursor position, in desktop pixels, while dragging; the actuator moves
+        along the estimated velocity until the next frame.
+        """
+        self.estimator.add(x, y, t)
+        vx, vy = self.estimator.velocity()
+        interval = self.estimator.interval
+        # Extrapolate for about a frame, so a missed frame does not send the cursor far off
+        horizon = min(self.horizon, 1.5 * interval) if interval else 0.0
+        self.actuator.track(x, y, vx, vy, horizon)
+        self._last = (x, y)
+
+    def endDrag(self):
+        """
+        Ends the drag at the last measured position, not an extrapolated one.
+        """
+        self.estimator.reset()
+        if self._last is not None:
+            self.actuator.moveTo(*self._last, duration=0)
+            self._last = None
+
+
+def add_motion_arguments(parser):
+    """
+    Adds the scroll/drag engine options shared by the command line entry points to an argparse parser.
+    """
+    parser.add_argument("--scroll-inertia", type=float, default=0.8,
+                        help="Share of the scroll speed kept after the gesture ends, 0 stops at once")
+    parser.add_argument("--scroll-decay", type=float, default=0.35,
+                        help="Time constant, in seconds, a released scroll slows down with")
+    parser.add_argument("--pixels-per-detent", type=float, default=60.0,
+                        help="Hand travel, in desktop pixels, per scroll detent")
+    parser.add_argument("--drag-horizon", type=float, default=0.05,
+                        help="Longest time, in seconds, a drag is extrapolated past the last frame")
+    return parser
+
+
+def motion_from_args(args):
+    return ScrollDragEngine(pixelsPerDetent=args.pixels_per_detent, inertia=args.scroll_inertia,
+                            decay=args.scroll_decay, horizon=args.drag_horizon)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate a scroll gesture and print what reaches the backend")
+    add_motion_arguments(parser)
+    parser.add_argument("--fps", type=float, default=30)
+    parser.add_argument("--speed", type=float, default=600, help="Hand speed in desktop pixels per second")
+    parser.add_argument("--seconds", type=float, default=1.0)
+    args = parser.parse_args()
+
+    backend = RecordingBackend()
+    actuator = CursorActuator(backend).start()
+    engine = motion_from_args(args)
+    engine.actuator = actuator
+    start = time.perf_counter()
+    for frame in range(int(args.seconds * args.fps)):
+        t = start + frame / args.fps
+        time.sleep(max(t - time.perf_counter(), 0))
+        engine.scroll(500, 300 + args.speed * frame / args.fps, t)
+    engine.endScroll()
+    released = time.perf_counter()
+    while actuator.scrolling:
+        time.sleep(0.01)
+    stopped = time.perf_counter()
+    actuator.stop()
+
+    scrolls = [(t, amounts[1]) for t, name, amounts in backend.events if name == "scroll"]
+    held = sum(dy for t, dy in scrolls if t < released)
+    coasted = sum(dy for t, dy in scrolls if t >= released)
+    print(f"{len(scrolls)} scroll events from {int(args.seconds * args.fps)} frames, "
+          f"{held:.2f} detents while held, {coasted:.2f} coasting for {stopped - released:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,125 +1,166 @@
+import threading
 import cv2
-import numpy as np
 import HandTrackingModule as htm
+from PipelineModule import Pipeline, StartupTimer
+from CaptureModule import Capture
 import time
-import pyautogui
-from pynput.mouse import Button, Controller
+from ActuatorModule import CursorActuator, create_backend, monitors
+from MappingModule import CursorMapping
+from MotionModule import ScrollDragEngine
+from FilterModule import EMAFilter
+from GestureModule import GestureEngine, ENTER
 
-mouse = Controller()
-pyautogui.FAILSAFE = False
+startup = StartupTimer()
+startup.add("imports", startup.start)
+wCam, hCam = 640, 480
+
+# MediaPipe loads and warms up on its own thread while the camera and mouse initialise
+detector = htm.handDetector(maxHands=1)
+warmup = threading.Thread(target=detector.warmup, args=((hCam, wCam), startup), name="warmup", daemon=True)
+warmup.start()
+
+# Mouse output runs on its own thread, clicks and scrolls are fire-and-forget
+with startup.phase("mouse backend"):
+    backend = create_backend()
+    mouse = CursorActuator(backend, rate=200).start()
+# Scroll and drag follow the hand's velocity on the actuator thread, between camera frames
+motion = ScrollDragEngine(mouse)
 
 def start_drag():
-    mouse.press(Button.left)
+    mouse.press("left")
 
 def stop_drag():
-    mouse.release(Button.left)
+    motion.endDrag()
+    mouse.release("left")
 
-wCam, hCam = 640, 480
 frameR = 100  # Frame Reduction
 smoothening = 7
 
+cursorFilter = EMAFilter(smoothening)  # or FilterModule.OneEuroFilter() / KalmanFilter()
+
 pTime = 0
+frameTime = None  # when the frame whose landmarks are being output was captured
 plocX, plocY = 0, 0
 clocX, clocY = 0, 0
 
-cap = cv2.VideoCapture(0)
-cap.set(3, wCam)
-cap.set(4, hCam)
-detector = htm.handDetector(maxHands=1)
-wScr, hScr = pyautogui.size()
+with startup.phase("camera open"):
+    cap = Capture(0, wCam, hCam).open()
+print(cap.describe())
+with startup.phase("screen geometry"):
+    # Camera to desktop transform, precomputed once for the frame-reduced box
+    mapping = CursorMapping(monitors(backend), (wCam, hCam), margin=frameR)
 
 
-fingerConfig = {
-    "allUp": [1, 1, 1, 1, 1],
-    "allDown": [0, 0, 0, 0, 0],
-    "move": [0, 1, 0, 0, 0],
-    "rightClick": [1, 1, 1, 1],
-    "leftClick": [0, 1, 1, 0, 0],
-    "drag": [1, 0, 0, 0, 0],
-    "scroll": [0, 1, 1, 1, 0]  # Assuming this configuration for scroll gesture
-}
+# Gesture definitions that reproduce this script's original finger patterns
+engine = GestureEngine.load("gestures_legacy.json")
 
 dragging = False
+scrolling = False
 # previous_z = 0
 
-while True:
-    success, img = cap.read()
-    img = cv2.flip(img, 1)
+
+def move(img, frameDetector, lmList):
+    global plocX, plocY, clocX, clocY
+    x1, y1 = lmList[8][1:3]
+    x3, y3 = mapping.map(x1, y1)
+    clocX, clocY = cursorFilter((x3, y3), frameTime)
+    mouse.moveTo(clocX, clocY)
+    cv2.circle(img, (x1, y1), 15, (0, 255, 0), cv2.FILLED)
+    plocX, plocY = clocX, clocY
+
+
+def left_click(img, frameDetector, lmList):
+    # Left click when index finger moves significantly in the Z-axis
+    # if abs(z1 - previous_z) > 0.015:  # Threshold value for Z-axis movement
+    x1, y1 = lmList[8][1:3]
+    cv2.circle(img, (x1, y1), 15, (0, 255, 0), cv2.FILLED)
+    mouse.click("left")
+
+
+def right_click(img, frameDetector, lmList):
+    # The thumb to pinky base distance is checked by the gesture definition
+    length, img, lineInfo = frameDetector.findDistance(4, 17, img)
+    cv2.circle(img, (lineInfo[4], lineInfo[5]), 15, (0, 255, 0), cv2.FILLED)
+    mouse.click("right")
+
+
+def drag(img, frameDetector, lmList):
+    global plocX, plocY, clocX, clocY, dragging
+    if not dragging:
+        start_drag()
+        dragging = True
+
+    x2, y2 = lmList[4][1:3]
+    x4, y4 = mapping.map(x2, y2)
+    clocX, clocY = cursorFilter((x4, y4), frameTime)
+    motion.drag(clocX, clocY, frameTime)
+    cv2.circle(img, (x2, y2), 15, (0, 255, 0), cv2.FILLED)
+    plocX, plocY = clocX, clocY
+
+
+def scroll(img, frameDetector, lmList):
+    global scrolling
+    x1, y1 = lmList[8][1:3]
+    motion.scroll(*mapping.map(x1, y1), frameTime)
+    scrolling = True
+
+
+actions = {"move": move, "left_click": left_click, "right_click": right_click, "drag": drag, "scroll": scroll}
+
+
+def process(img, t):
+    img = cv2.flip(img, 1, dst=img)  # in place, the captured frame is not used unflipped
     img = detector.findHands(img)
     lmList, bbox = detector.findPosition(img)
+    detector.evaluateHands()
+    return img, detector.snapshot(), lmList, t
+
+
+def output(_, result):
+    global dragging, scrolling, pTime, frameTime
+    img, frameDetector, lmList, frameTime = result
     # print(img.shape, wScr, hScr)
-    
+
+    # Clicks fire once when their gesture is entered, not on every frame it is held;
+    # hold and debounce times run on the frames' capture times
+    events = engine.update(frameDetector, t=frameTime)
+    entered = any(event.kind == ENTER for event in events)
+    gesture = engine.current
+
+    if (gesture is None or gesture.action != "drag") and dragging:
+        stop_drag()
+        dragging = False
+    if (gesture is None or gesture.action != "scroll") and scrolling:
+        motion.endScroll()  # coasts to a stop
+        scrolling = False
+
     if len(lmList) != 0:
-        x1, y1, z1 = lmList[8][1:]
-        x2, y2, z2 = lmList[4][1:]
-
-    fingers = detector.fingersUp() 
-    # f2 = detector.fingersHalfClosed()
-    # print(f2)
-    if len(fingers) != 0:
-        cv2.rectangle(img, (frameR, frameR), (wCam - frameR, hCam - frameR),
-                      (255, 0, 255), 2)
-        
-        if not fingers == fingerConfig["allUp"]:  # If all fingers are up, do not move the mouse
-            if fingers == fingerConfig["move"]:
-                x3 = np.interp(x1, (frameR, wCam - frameR), (0, wScr))
-                y3 = np.interp(y1, (frameR, hCam - frameR), (0, hScr))
-                clocX = plocX + (x3 - plocX) / smoothening
-                clocY = plocY + (y3 - plocY) / smoothening
-                mouse.position = (clocX, clocY)
-                cv2.circle(img, (x1, y1), 15, (0, 255, 0), cv2.FILLED)
-                plocX, plocY = clocX, clocY
-            
-        # Left click when index finger moves significantly in the Z-axis
-        # if abs(z1 - previous_z) > 0.015:  # Threshold value for Z-axis movement
-        # if fingers[0] == 1 and fingers[2:] == [0,0,0] and f2[1] == 1:
-        if fingers == fingerConfig["leftClick"]:
-            cv2.circle(img, (x1, y1), 15, (0, 255, 0), cv2.FILLED)
-            # print("Left Click")
-            pyautogui.click(duration=0.17)
-        
-        # previous_z = z1
-
-        if fingers[1:] == fingerConfig["rightClick"]:
-            length, img, lineInfo = detector.findDistance(4, 17, img)
-            if length < 30:
-                cv2.circle(img, (lineInfo[4], lineInfo[5]), 15, (0, 255, 0), cv2.FILLED)
-                pyautogui.rightClick(duration=0.1)
-        
-        if fingers == fingerConfig["drag"] :
-            if not dragging:
-                start_drag()
-                dragging = True
-            
-            x4 = np.interp(x2, (frameR, wCam - frameR), (0, wScr))
-            y4 = np.interp(y2, (frameR, hCam - frameR), (0, hScr))
-            clocX = plocX + (x4 - plocX) / smoothening
-            clocY = plocY + (y4 - plocY) / smoothening
-            mouse.position = (clocX, clocY)
-            cv2.circle(img, (x2, y2), 15, (0, 255, 0), cv2.FILLED)
-            plocX, plocY = clocX, clocY
-        else:
-            if dragging:
-                stop_drag()
-                dragging = False
-
-        if fingers == fingerConfig["scroll"]:
-            y3 = np.interp(y1, (frameR, hCam - frameR), (0, hScr))
-            clocY = plocY + (y3 - plocY) / smoothening
-            scrollY = int((clocY - plocY) / 50)  # Adjust divisor to reduce scroll amount
-            
-            if scrollY != 0:  # Only scroll if there's a noticeable movement
-                mouse.scroll(0, scrollY)
-        
+        x0, y0, x1, y1 = mapping.region
+        cv2.rectangle(img, (x0, y0), (x1, y1), (255, 0, 255), 2)
+        # During a debounce dropout the gesture stays active but only acts once it matches again
+        if gesture is not None and engine.matched is gesture and (gesture.repeat or entered):
+            actions[gesture.action](img, frameDetector, lmList)
+
     cTime = time.time()
-    fps = 1 / (cTime - pTime)
+    fps = 1 / (cTime - pTime) if pTime else 0
     pTime = cTime
     cv2.putText(img, str(int(fps)), (20, 50), cv2.FONT_HERSHEY_PLAIN, 3,
                 (255, 0, 0), 3)
+    cv2.putText(img, pipeline.summary(), (20, 80), cv2.FONT_HERSHEY_PLAIN, 1,
+                (255, 0, 0), 1)
     
     cv2.imshow("Image", img)
-    if cv2.waitKey(1) & 0xff == ord('q'):
-        break
+    return not (cv2.waitKey(1) & 0xff == ord('q'))
+
+
+with startup.phase("warm-up wait"):
+    warmup.join()
+pipeline = Pipeline(cap.read, process, output, startup, timestamps=True)
+pipeline.run()
+print(startup.report())
+print(pipeline.report())
+print(cap.report())
+mouse.stop()
     
 cap.release()
 cv2.destroyAllWindows()
@@ -1,36 +1,98 @@
-import ctypes
+import argparse
+import collections
+import threading
 import cv2
-import numpy as np
 import HandTrackingModule as htm
+from PipelineModule import Pipeline, StartupTimer
+from CaptureModule import Capture, add_capture_arguments, capture_from_args
+from SharedLandmarksModule import LandmarkPublisher
+from SchedulerModule import AdaptiveScheduler
+from FilterModule import EMAFilter
+from ActuatorModule import BACKEND_METHODS, BACKENDS, CursorActuator, create_backend, monitors
+from MappingModule import CursorMapping, add_mapping_arguments, mapping_from_args
+from MotionModule import ScrollDragEngine, add_motion_arguments, motion_from_args
+from OverlayModule import Canvas, Overlay
+from GestureModule import GestureEngine, GestureConfigError, ENTER
+from ProfilerModule import NULL_PROFILER, add_profiler_arguments, profiler_from_args
 import time
-from pymouse import PyMouse
-from pykeyboard import PyKeyboard
+
+# Gesture action -> controller call, so a new gesture is a table entry rather than another branch.
+# Every entry takes (controller, img, detector, lmList, t), t being the frame's timestamp; the
+# controller's CursorMapping holds the geometry.
+# Pinch distances are checked, with hysteresis, by the gesture definitions rather than the controller,
+# so actions only run on frames where their gesture matched (see dispatch_gesture).
+ACTIONS = {
+    "move": lambda c, img, det, lmList, t: c.move(img, lmList[8][1], lmList[8][2], t=t),
+    "left_click": lambda c, img, det, lmList, t: c.left_click(img, lmList[8][1], lmList[8][2]),
+    "right_click": lambda c, img, det, lmList, t: c.right_click(img, det, threshold=None),
+    "drag": lambda c, img, det, lmList, t: c.drag(img, det, lmList[4][1], lmList[4][2], threshold=None, t=t),
+    "scroll": lambda c, img, det, lmList, t: c.scroll(img, det, lmList[12][1], lmList[12][2], threshold=None,
+                                                      t=t),
+}
 
 class MouseController:
     """
     A class to control the mouse using hand gestures.
     """
-    def __init__(self, smoothening=7):
+    def __init__(self, smoothening=7, cursorFilter=None, actuator=None, overlay=None, profiler=None, mapping=None,
+                 motion=None):
+        """
+        Parameters:
+        smoothening (float): Smoothening divisor of the default EMA cursor filter.
+        cursorFilter (object): Filter from FilterModule applied to the cursor position,
+                               e.g. OneEuroFilter() or KalmanFilter().
+        actuator (CursorActuator): Runs the mouse events, defaults to a started actuator on the
+                                   first backend create_backend finds.
+        overlay (Overlay): Queue drawing here instead of drawing on the frame.
+        profiler (Profiler): Time the default actuator's backend calls as mouse.<method> spans.
+        mapping (CursorMapping): Camera to desktop mapping, defaults to the actuator backend's
+                                 monitor layout with a 100 pixel frame margin; recalibrate it
+                                 at any time through its set* and calibrate methods.
+        motion (ScrollDragEngine): Turns scroll and drag hand motion into continuous actuator
+                                   output, defaults to one with the default inertia.
+        """
+        self.profiler = profiler if profiler is not None else NULL_PROFILER
         self.smoothening = smoothening
+        self.cursorFilter = cursorFilter if cursorFilter is not None else EMAFilter(smoothening)
         self.plocX, self.plocY = 0, 0  # Previous location
         self.clocX, self.clocY = 0, 0  # Current location
         self.dragging = False
-        self.mouse = PyMouse()
-        self.keyboard = PyKeyboard()
+        self.scrolling = False
+        if actuator is None:
+            backend = self.profiler.instrument(create_backend(), "mouse", BACKEND_METHODS)
+            actuator = CursorActuator(backend, duration=0).start()
+        self.actuator = actuator
+        self.overlay = overlay
+        self.mapping = mapping if mapping is not None else CursorMapping(monitors(actuator.backend))
+        self.motion = motion if motion is not None else ScrollDragEngine()
+        if self.motion.actuator is None:
+            self.motion.actuator = actuator
+
+    def _canvas(self, img):
+        # Queue into the overlay when there is one, otherwise draw on the frame right away
+        return self.overlay if self.overlay is not None else Canvas(img)
 
     def start_drag(self):
         """
         Starts a drag action by pressing the left mouse button.
         """
-        self.mouse.press(self.clocX, self.clocY, 1)
+        self.actuator.press("left")
 
     def stop_drag(self):
         """
-        Stops a drag action by releasing the left mouse button.
+        Stops a drag action by releasing the left mouse button at the last measured position.
+        """
+        self.motion.endDrag()
+        self.actuator.release("left")
+
+    def stop_scroll(self):
+        """
+        Ends a scroll action; the scroll coasts on with the motion engine's inertia.
         """
-        self.mouse.release(self.clocX, self.clocY, 1)
+        self.motion.endScroll()
+        self.scrolling = False
 
-    def move(self, img, x1, y1, frameR, wCam, hCam, wScr, hScr):
+    def move(self, img, x1, y1, t=None):
         """
         Moves the mouse cursor on the screen based on hand movements.
         
@@ -38,26 +100,17 @@ class MouseController:
         img (ndarray): Image frame.
         x1 (int): X-coordinate of the fingertip.
         y1 (int): Y-coordinate of the fingertip.
-        frameR (int): Frame reduction.
-        wCam (int): Width of the camera frame.
-        hCam (int): Height of the camera frame.
-        wScr (int): Width of the screen.
-        hScr (int): Height of the screen. 
-        """
-        x3 = np.interp(x1, (frameR, wCam - frameR), (0, wScr))
-        y3 = np.interp(y1, (frameR, hCam - frameR), (0, hScr))
-        self.clocX = self.plocX + (x3 - self.plocX) / self.smoothening
-        self.clocY = self.plocY + (y3 - self.plocY) / self.smoothening
-        
-        try:
-            self.mouse.move(int(self.clocX), int(self.clocY))
-        except Exception as e:
-            print(f"Error setting cursor position ({x1}, {y1}), ({self.clocX}, {self.clocY}): {e}")
-            
+        t (float): Timestamp of the frame the fingertip was detected in, for the cursor filter;
+                   defaults to now.
+        """
+        x3, y3 = self.mapping.map(x1, y1)
+        self.clocX, self.clocY = self.cursorFilter((x3, y3), t)
+        self.actuator.moveTo(self.clocX, self.clocY)
+
         self.plocX, self.plocY = self.clocX, self.clocY   
-        cv2.circle(img, (x1, y1), 15, (0, 255, 0), cv2.FILLED)
+        self._canvas(img).circle((x1, y1), 15, (0, 255, 0), cv2.FILLED)
 
-    def left_click(self, img, x, y, frameR, wCam, hCam, wScr, hScr):
+    def left_click(self, img, x, y):
         """
         Simulates a left mouse click.
         
@@ -66,18 +119,10 @@ class MouseController:
         x (int): X-coordinate of the fingertip.
         y (int): Y-coordinate of the fingertip.
         """
-        print(x,y,90)
-        x3 = np.interp(x, (frameR, wCam - frameR), (0, wScr))
-        y3 = np.interp(y, (frameR, hCam - frameR), (0, hScr))
-        self.clocX = self.plocX + (x3 - self.plocX) / self.smoothening
-        self.clocY = self.plocY + (y3 - self.plocY) / self.smoothening
-        
-        cv2.circle(img, (x, y), 15, (0, 255, 0), cv2.FILLED)
-        
-        self.mouse.click(1)
-        
+        self._canvas(img).circle((x, y), 15, (0, 255, 0), cv2.FILLED)
+        self.actuator.click("left")
 
-    def right_click(self, img, detector, finger1=8, finger2=12):
+    def right_click(self, img, detector, finger1=8, finger2=12, threshold=0.27):
         """
         Simulates a right mouse click.
         
@@ -86,13 +131,14 @@ class MouseController:
         detector (object): Hand detector object.
         finger1 (int): Index of the first finger.
         finger2 (int): Index of the second finger.
+        threshold (float): Maximum finger distance in hand scales, or None when the gesture definition checked it.
         """
-        length, img, lineInfo = detector.findDistance(finger1, finger2, img)
-        if length < 30:
-            cv2.circle(img, (lineInfo[4], lineInfo[5]), 15, (0, 255, 0), cv2.FILLED)
-            self.mouse.click(2)
+        length, img, lineInfo = detector.findDistance(finger1, finger2, img, normalized=True)
+        if threshold is None or length < threshold:
+            self._canvas(img).circle((lineInfo[4], lineInfo[5]), 15, (0, 255, 0), cv2.FILLED)
+            self.actuator.click("right")
 
-    def drag(self, img, detector, x1, y1, frameR, wCam, hCam, wScr, hScr, finger1=4, finger2=12, finger3=16):
+    def drag(self, img, detector, x1, y1, finger1=4, finger2=12, finger3=16, threshold=0.27, t=None):
         """
         Simulates a drag action by holding the left mouse button down and moving the cursor.
         
@@ -101,145 +147,306 @@ class MouseController:
         detector (object): Hand detector object.
         x1 (int): X-coordinate of the fingertip.
         y1 (int): Y-coordinate of the fingertip.
-        frameR (int): Frame reduction.
-        wCam (int): Width of the camera frame.
-        hCam (int): Height of the camera frame.
-        wScr (int): Width of the screen.
-        hScr (int): Height of the screen.
         finger1 (int): Index of the first finger.
         finger2 (int): Index of the second finger.
         finger3 (int): Index of the third finger.
+        threshold (float): Maximum finger distance in hand scales, or None when the gesture definition checked it.
+        t (float): Timestamp of the frame the fingertip was detected in, defaults to now.
         """
-        length1, img, lineInfo1 = detector.findDistance(finger1, finger2, img)
-        length2, img, lineInfo2 = detector.findDistance(finger1, finger3, img)
-        if length1 < 30 and length2 < 30:
+        length1, img, lineInfo1 = detector.findDistance(finger1, finger2, img, normalized=True)
+        length2, img, lineInfo2 = detector.findDistance(finger1, finger3, img, normalized=True)
+        if threshold is None or (length1 < threshold and length2 < threshold):
             if not self.dragging:
                 self.start_drag()
                 self.dragging = True
 
-            x3 = np.interp(x1, (frameR, wCam - frameR), (0, wScr))
-            y3 = np.interp(y1, (frameR, hCam - frameR), (0, hScr))
-            self.clocX = self.plocX + (x3 - self.plocX) / self.smoothening
-            self.clocY = self.plocY + (y3 - self.plocY) / self.smoothening
-            self.mouse.move(int(self.clocX), int(self.clocY))
+            x3, y3 = self.mapping.map(x1, y1)
+            self.clocX, self.clocY = self.cursorFilter((x3, y3), t)
+            # The actuator carries the drag along its velocity between frames
+            self.motion.drag(self.clocX, self.clocY, t)
             self.plocX, self.plocY = self.clocX, self.clocY
-            cv2.circle(img, (lineInfo1[4], lineInfo1[5]), 15, (0, 255, 0), cv2.FILLED)
-            cv2.circle(img, (lineInfo2[4], lineInfo2[5]), 15, (0, 255, 0), cv2.FILLED)
+            self._canvas(img).circle((lineInfo1[4], lineInfo1[5]), 15, (0, 255, 0), cv2.FILLED)
+            self._canvas(img).circle((lineInfo2[4], lineInfo2[5]), 15, (0, 255, 0), cv2.FILLED)
         else:
             if self.dragging:
                 self.stop_drag()
             self.dragging = False
 
-    def scroll(self, img, detector, y1, frameR, hCam, hScr, finger1=8, finger2=12, finger3=16):
+    def scroll(self, img, detector, x1, y1, finger1=8, finger2=12, finger3=16, threshold=0.27, t=None):
         """
-        Simulates a scroll action.
+        Simulates a scroll action: the page scrolls with the fingertip's vertical speed,
+        continuously and in fractional steps where the backend supports them.
         
         Parameters:
         img (ndarray): Image frame.
         detector (object): Hand detector object.
+        x1 (int): X-coordinate of the fingertip, which picks the monitor on multi-monitor desktops.
         y1 (int): Y-coordinate of the fingertip.
-        frameR (int): Frame reduction.
-        hCam (int): Height of the camera frame.
-        hScr (int): Height of the screen.
         finger1 (int): Index of the first finger.
         finger2 (int): Index of the second finger.
         finger3 (int): Index of the third finger.
-        
+        threshold (float): Maximum finger distance in hand scales, or None when the gesture definition checked it.
+        t (float): Timestamp of the frame the fingertip was detected in, defaults to now.
         """
-        length1, img, lineInfo1 = detector.findDistance(finger1, finger2, img)
-        length2, img, lineInfo2 = detector.findDistance(finger2, finger3, img)
+        length1, img, lineInfo1 = detector.findDistance(finger1, finger2, img, normalized=True)
+        length2, img, lineInfo2 = detector.findDistance(finger2, finger3, img, normalized=True)
+
+        if threshold is None or (length1 < threshold and length2 < threshold):
+            self.motion.scroll(*self.mapping.map(x1, y1), t)
+            self.scrolling = True
+            self._canvas(img).circle((lineInfo1[4], lineInfo1[5]), 15, (0, 255, 0), cv2.FILLED)
+            self._canvas(img).circle((lineInfo2[4], lineInfo2[5]), 15, (0, 255, 0), cv2.FILLED)
+        elif self.scrolling:
+            self.stop_scroll()
 
-        if length1 < 30 and length2 < 30:
-            y3 = np.interp(y1, (frameR, hCam - frameR), (0, hScr))
-            scrollY = int(np.clip((y3 - self.plocY) / 5, -3, 3))  # Adjust the divisor and clip values as needed
+def dispatch_gesture(img, detector, controller, gesture, lmList, entered=True, t=None, seen=True):
+    """
+    Runs the controller action of the active gesture. Repeating gestures act on
+    every frame, others such as clicks only on the frame they are entered.
+    During a debounce dropout the gesture stays active, so a drag keeps its
+    button held, but its action waits for a frame where it matches again.
+
+    Parameters:
+    img (ndarray): Image frame.
+    detector (object): Hand detector (or snapshot) the gesture was recognized with.
+    controller (MouseController): Controller that performs the action.
+    gesture (Gesture): Active gesture from GestureEngine, or None.
+    lmList (list): Landmark list from findPosition.
+    entered (bool): The gesture was entered on this frame.
+    t (float): Timestamp of the frame, for the cursor filter and the scroll and drag velocity;
+               defaults to now.
+    seen (bool): The gesture matched this frame, constraints included, rather than riding out a dropout.
+    """
+    hCam, wCam, _ = img.shape
+    controller.mapping.setFrameSize(wCam, hCam)
 
-            if scrollY != 0:  # Only scroll if there's a noticeable movement
-                self.mouse.scroll(vertical=scrollY)
-            
-            cv2.circle(img, (lineInfo1[4], lineInfo1[5]), 15, (0, 255, 0), cv2.FILLED)
-            cv2.circle(img, (lineInfo2[4], lineInfo2[5]), 15, (0, 255, 0), cv2.FILLED)
+    if controller.dragging and (gesture is None or gesture.action != "drag"):
+        controller.stop_drag()
+        controller.dragging = False
+    if controller.scrolling and (gesture is None or gesture.action != "scroll"):
+        controller.stop_scroll()
 
-def get_screen_resolution():
-    user32 = ctypes.windll.user32
-    user32.SetProcessDPIAware()
-    return user32.GetSystemMetrics(0), user32.GetSystemMetrics(1)
+    if gesture is not None:
+        controller.mapping.draw(controller._canvas(img))
+        # An active gesture can outlast its pose, or the hand, by its debounce time
+        if lmList and seen and (gesture.repeat or entered):
+            with controller.profiler.span(f"action.{gesture.action}"):
+                ACTIONS[gesture.action](controller, img, detector, lmList, t)
 
-def main():
+def main(preview=True, previewFps=15, gestures="gestures.json", capture=None, inferenceWidth=None, publish=None,
+         detector=None, profiler=None, backend="auto", mapping=None, calibrationTime=3.0,
+         motion=None, adaptiveDetection=True):
     """
     The main function to run the hand tracking and mouse control.
+
+    Parameters:
+    preview (bool): Show the camera preview window; False runs headless with no drawing at all.
+    previewFps (float): Maximum preview rate, independent of the detection rate.
+    gestures (str): Gesture definition file.
+    capture (Capture): Frame source, defaults to a low-latency Capture of camera 0.
+    inferenceWidth (int): Run detection on frames downscaled to this width; the cursor
+                          mapping still uses full-resolution landmarks.
+    publish (str): Publish every frame's landmarks and gesture to shared memory under this
+                   name, for SharedLandmarksModule.LandmarkSubscriber consumers.
+    detector (handDetector): Detector to use instead of local MediaPipe detection, e.g. a
+                             TraceModule.ReplayDetector over a StreamModule.StreamClient.
+    profiler (Profiler): Time capture, detection, gesture logic, actuation and preview as named
+                         spans, and show them in a debug panel on the preview.
+    backend (str): Mouse backend name from ActuatorModule.BACKENDS, or "auto".
+    mapping (CursorMapping): Camera to desktop mapping, defaults to the whole desktop with a
+                             100 pixel frame margin. Press c in the preview to recalibrate its
+                             region from the index fingertip's reach, r to reset it.
+    calibrationTime (float): Seconds the fingertip is recorded for after pressing c.
+    motion (ScrollDragEngine): Scroll inertia and drag extrapolation settings, see MotionModule.
+    adaptiveDetection (bool): Relax the tracking threshold during gesture sessions, see
+                              HandTrackingModule.DetectionPolicy, so MediaPipe keeps tracking the
+                              hand instead of re-running its palm detector; the relaxed graph takes
+                              over at the first re-detection, never by dropping a tracked hand.
     """
-    frameR = 100  # Frame reduction for gesture detection area
+    profiler = profiler if profiler is not None else NULL_PROFILER
+    startup = StartupTimer()
+    startup.add("imports", startup.start)
+    engine = GestureEngine.load(gestures)
+    unknown = {gesture.action for gesture in engine.gestures} - ACTIONS.keys()
+    if unknown:
+        raise GestureConfigError(f"Unknown gesture actions: {sorted(unknown)}")
+
     smoothening = 6  # Smoothening factor for cursor movement
 
+    cap = capture or Capture()
+    # Detection and output each queue their drawing; it is only rendered on preview frames
+    detectionOverlay = Overlay(enabled=preview)
+    overlay = Overlay(enabled=preview, previewFps=previewFps)
+    remote = detector is not None
+    warmup = None
+    policy = None
+    if remote:
+        detector.overlay = detectionOverlay
+        detector.profiler = profiler
+    else:
+        # Landmarks come out mirrored, so only previewed frames are ever flipped
+        detector = htm.handDetector(maxHands=1, overlay=detectionOverlay, inferenceWidth=inferenceWidth,
+                                    mirror=True, profiler=profiler)
+        policy = htm.DetectionPolicy(detector) if adaptiveDetection else None
+        # MediaPipe loads and warms up while the camera, screen and mouse backends initialise
+        warmup = threading.Thread(target=detector.warmup,
+                                  args=((cap.height or 480, cap.width or 640), startup,
+                                        policy.configs if policy is not None else ()),
+                                  name="warmup", daemon=True)
+        warmup.start()
+    with startup.phase("camera open"):
+        cap.open()
+    print(cap.describe())
+    with startup.phase("mouse backend"):
+        mouseBackend = create_backend(backend)
+    # The monitor layout is read once into the precomputed cursor mapping
+    with startup.phase("screen geometry"):
+        layout = monitors(mouseBackend)
+    if mapping is None:
+        mapping = CursorMapping(layout)
+    elif not mapping.monitors:
+        mapping.setMonitors(layout, mapping.monitor)
+    actuator = CursorActuator(profiler.instrument(mouseBackend, "mouse", BACKEND_METHODS), duration=0).start()
+    mouse_controller = MouseController(smoothening, actuator=actuator, overlay=overlay, profiler=profiler,
+                                       mapping=mapping, motion=motion)
+    publisher = LandmarkPublisher(publish, maxHands=1) if publish else None
+    if warmup is not None:
+        with startup.phase("warm-up wait"):
+            warmup.join()
     pTime = 0  # Previous time for FPS calculation
 
-    cap = cv2.VideoCapture(0)
-    detector = htm.handDetector(maxHands=1)
-    wScr, hScr = get_screen_resolution()
-
-    # Configuration for finger gestures
-    fingerConfig = {
-        "allUp": [1, 1, 1, 1, 1],
-        "allDown": [0, 0, 0, 0, 0],
-        "move": [0, 1, 0, 0, 0],
-        "leftClick":  [0, 1, 0, 0, 0],   #this config is for half - folded fingers
-        "rightClick":  [0, 1, 1, 0, 0],
-        "drag": [0, 1, 0, 0, 1],
-        "scroll": [0, 1, 1, 1, 0]
-    }
-
-    mouse_controller = MouseController(smoothening)
-
-    while True:
-        success, img = cap.read()
-        hCam, wCam, _ = img.shape
-        img = cv2.flip(img, 1)
-        img = detector.findHands(img)
+    # Skip inference on slow, steady cursor movement and extrapolate landmarks in between;
+    # received landmarks cost nothing, so a remote detector runs on every frame
+    scheduler = AdaptiveScheduler(detector, maxInterval=1 if remote else 3, skipGestures={"move"})
+    lastGesture = None
+    # Gesture edges from the inference thread, drained in frame order by the output stage, so
+    # a click entered on a frame the output dropped still fires
+    pending = collections.deque()
+    calibration = None  # (end time, fingertip points) while recording a new region
+
+    def process(img, t):
+        """
+        Inference stage: detection and per-frame hand state, run on the worker thread.
+        t is the frame's capture time, the timestamp the cursor filter and motion engine work on.
+        """
+        nonlocal lastGesture
+        img = scheduler.findHands(img, lastGesture, t=t)
         lmList, bbox = detector.findPosition(img)
-        
-        handInCorrectOrientation = False
 
-        if lmList:
-            x1, y1, z1 = lmList[8][1:]
-            handInCorrectOrientation = not (detector.is_hand_turned() or detector.is_hand_flipped())
+        # Finger states for every detected hand in a single pass, then one table lookup
+        detector.evaluateHands()
+        with profiler.span("gesture.match"):
+            gesture = engine.match(detector)
+        # The state machine runs on the frame's match here, on the thread that matches, in capture time
+        with profiler.span("gesture.update"):
+            pending.extend(engine.advance(gesture, t))
+        lastGesture = gesture.name if gesture is not None else None
+        if policy is not None:
+            policy.update(gesture is not None, t)
+        current = engine.current
+        return (img, detector.snapshot(), detectionOverlay.take(), lmList, t, current,
+                current is not None and gesture is current)
 
-        fingers = detector.fingersUp()
-        foldedFingers = detector.fingersHalfClosed()
-        
-        if fingers and -z1 > 0.03 and handInCorrectOrientation:
-            cv2.rectangle(img, (frameR, frameR), (wCam - frameR, hCam - frameR), (255, 0, 255), 2)
+    def output(_, result):
+        """
+        Output stage: gesture dispatch, mouse actuation and preview, run on the main thread.
+        """
+        nonlocal pTime, calibration
+        img, frameDetector, layer, lmList, t, gesture, seen = result
+        frameDetector.overlay = overlay  # distance lines drawn from this stage go to its own overlay
 
-            if fingers == fingerConfig["move"] and not foldedFingers[1]:
-                mouse_controller.move(img, x1, y1, frameR, wCam, hCam, wScr, hScr)
+        # Edges up to this frame, including those of frames dropped before output
+        entered = False
+        while pending and pending[0].t <= t:
+            event = pending.popleft()
+            entered = entered or (event.kind == ENTER and event.gesture is gesture)
+        with profiler.span("dispatch"):
+            dispatch_gesture(img, frameDetector, mouse_controller, gesture, lmList, entered, t, seen)
+        if publisher is not None:
+            with profiler.span("publish"):
+                publisher.publish(frameDetector, gesture)
 
-            elif  foldedFingers == fingerConfig["leftClick"]:
-                # print(x1,y1)
-                mouse_controller.left_click(img, x1, y1, frameR, wCam, hCam, wScr, hScr)
+        cTime = time.time()
+        fps = 1 / (cTime - pTime) if pTime else 0
+        pTime = cTime
 
-            elif fingers == fingerConfig["rightClick"]:
-                mouse_controller.right_click(img, detector)
+        # Recalibration records the index fingertip's reach and swaps in the new region when done
+        if calibration is not None:
+            end, points = calibration
+            if lmList:
+                points.append(lmList[8][1:3])
+            if cTime >= end:
+                calibration = None
+                if points:
+                    print(f"Cursor region calibrated to {mapping.calibrate(points)}")
 
-            elif fingers == fingerConfig["drag"]:
-                thumbTip = lmList[4][1:]
-                mouse_controller.drag(img, detector, thumbTip[0], thumbTip[1], frameR, wCam, hCam, wScr, hScr)
+        if not overlay.due():
+            overlay.take()
+            return True
+        overlay.text(f"FPS: {int(fps)}", (20, 50), 3, (255, 0, 0), 2)
+        overlay.text(pipeline.summary(), (20, 80), 1, (255, 0, 0), 1)
+        if calibration is not None:
+            overlay.text("Calibrating: sweep your index finger over its comfortable reach", (20, 100), 1,
+                         (255, 0, 255), 1)
+        if profiler.enabled:
+            profiler.panel(overlay)
+        with profiler.span("preview.render"):
+            overlay.render(cv2.flip(img, 1, dst=img), layer)
 
-            elif fingers == fingerConfig["scroll"]:
-                middle_finger_tip_Y = lmList[12][2]
-                mouse_controller.scroll(img, detector, middle_finger_tip_Y, frameR, hCam, hScr)
+        with profiler.span("preview.imshow"):
+            cv2.imshow("Image", img)
 
-        cTime = time.time()
-        fps = 1 / (cTime - pTime)
-        pTime = cTime
-        cv2.putText(img, f"FPS: {int(fps)}", (20, 50), cv2.FONT_HERSHEY_PLAIN, 3, (255, 0, 0), 2)
+        with profiler.span("preview.waitKey"):
+            cvWait = cv2.waitKey(1)
+        if cvWait & 0xFF == ord('c'):
+            calibration = (time.time() + calibrationTime, [])
+        elif cvWait & 0xFF == ord('r'):
+            mapping.setRegion(None)
+        return not (cvWait & 0xFF == ord('q') or cvWait == 27)
 
-        cv2.imshow("Image", img)
-                
-        cvWait = cv2.waitKey(1)
-        if cvWait & 0xFF == ord('q') or cvWait == 27 :
-            break
+    pipeline = Pipeline(profiler.wrap("capture", cap.read), profiler.wrap("process", process),
+                        profiler.wrap("output", output), startup, timestamps=True)
+    pipeline.run()
+    print(startup.report())
+    print(pipeline.report())
+    print(scheduler.metrics())
+    print(detector.detectionStats())
+    if profiler.enabled:
+        print(profiler.as_dict())
+    print(cap.report())
+    if mouse_controller.dragging:
+        mouse_controller.stop_drag()
+    actuator.stop()
+    mouseBackend.close()
+    if publisher is not None:
+        publisher.close()
 
     cap.release()
     cv2.destroyAllWindows()
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Hand gesture mouse control")
+    add_capture_arguments(parser)
+    add_profiler_arguments(parser)
+    add_mapping_arguments(parser)
+    add_motion_arguments(parser)
+    parser.add_argument("--gestures", default="gestures.json")
+    parser.add_argument("--mouse-backend", default="auto", choices=["auto", *BACKENDS],
+                        help="How mouse input is injected; record injects nothing")
+    parser.add_argument("--no-preview", dest="preview", action="store_false")
+    parser.add_argument("--no-adaptive-detection", dest="adaptive_detection", action="store_false",
+                        help="Keep the detector's MediaPipe thresholds fixed during gesture sessions")
+    parser.add_argument("--publish", nargs="?", const="hand_landmarks",
+                        help="Publish landmarks to shared memory under this name")
+    args = parser.parse_args()
+    profiler, exporter = profiler_from_args(args)
+    if exporter is not None:
+        exporter.start()
+    try:
+        main(args.preview, gestures=args.gestures, capture=capture_from_args(args),
+             inferenceWidth=args.inference_width, publish=args.publish, profiler=profiler,
+             backend=args.mouse_backend, mapping=mapping_from_args(args, []),
+             motion=motion_from_args(args), adaptiveDetection=args.adaptive_detection)
+    finally:
+        if exporter is not None:
+            exporter.stop()
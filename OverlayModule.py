@@ -0,0 +1,109 @@
+import time
+import cv2
+
+# Landmark pairs joined when drawing a hand, same topology as mp.solutions.hands.HAND_CONNECTIONS
+HAND_CONNECTIONS = [
+    (0, 1), (1, 2), (2, 3), (3, 4),
+    (0, 5), (5, 6), (6, 7), (7, 8),
+    (5, 9), (9, 10), (10, 11), (11, 12),
+    (9, 13), (13, 14), (14, 15), (15, 16),
+    (13, 17), (0, 17), (17, 18), (18, 19), (19, 20),
+]
+
+
+class Canvas:
+    """
+    Draws primitives straight onto an image. This is the legacy immediate
+    drawing path, and what Overlay uses to render its queued primitives.
+    """
+    def __init__(self, img):
+        self.img = img
+
+    def circle(self, center, radius, color, thickness=cv2.FILLED):
+        cv2.circle(self.img, center, radius, color, thickness)
+
+    def line(self, p1, p2, color, thickness=1):
+        cv2.line(self.img, p1, p2, color, thickness)
+
+    def rectangle(self, p1, p2, color, thickness=1):
+        cv2.rectangle(self.img, p1, p2, color, thickness)
+
+    def text(self, text, org, scale, color, thickness=1, font=cv2.FONT_HERSHEY_PLAIN):
+        cv2.putText(self.img, text, org, font, scale, color, thickness)
+
+    def hand(self, pixels, color=(0, 255, 0), pointColor=(0, 0, 255)):
+        points = [tuple(p) for p in pixels.tolist()]
+        for a, b in HAND_CONNECTIONS:
+            cv2.line(self.img, points[a], points[b], color, 2)
+        for point in points:
+            cv2.circle(self.img, point, 3, pointColor, cv2.FILLED)
+
+
+class Overlay:
+    """
+    Collects drawing primitives during a frame and draws them in one batch
+    when the frame is displayed.
+
+    Detection and controller code queue primitives instead of drawing, so a
+    disabled overlay costs nothing and frames that are not previewed are never
+    drawn on. Each pipeline stage should use its own Overlay; take() hands the
+    queued primitives over with the frame.
+
+    Parameters:
+    enabled (bool): Queue primitives at all; False makes every call a no-op.
+    previewFps (float): Maximum preview rate, or None to preview every frame.
+    """
+    def __init__(self, enabled=True, previewFps=None):
+        self.enabled = enabled
+        self.interval = 1.0 / previewFps if previewFps else 0.0
+        self._items = []
+        self._lastRender = 0.0
+
+    def circle(self, center, radius, color, thickness=cv2.FILLED):
+        if self.enabled:
+            self._items.append(("circle", (center, radius, color, thickness)))
+
+    def line(self, p1, p2, color, thickness=1):
+        if self.enabled:
+            self._items.append(("line", (p1, p2, color, thickness)))
+
+    def rectangle(self, p1, p2, color, thickness=1):
+        if self.enabled:
+            self._items.append(("rectangle", (p1, p2, color, thickness)))
+
+    def text(self, text, org, scale, color, thickness=1, font=cv2.FONT_HERSHEY_PLAIN):
+        if self.enabled:
+            self._items.append(("text", (text, org, scale, color, thickness, font)))
+
+    def hand(self, pixels, color=(0, 255, 0), pointColor=(0, 0, 255)):
+        if self.enabled:
+            self._items.append(("hand", (pixels.copy(), color, pointColor)))
+
+    def take(self):
+        """
+        Returns the queued primitives and starts an empty batch.
+        """
+        items, self._items = self._items, []
+        return items
+
+    def due(self, now=None):
+        """
+        Returns True when a frame should be previewed now, throttled to previewFps.
+        """
+        if not self.enabled:
+            return False
+        now = time.perf_counter() if now is None else now
+        if now - self._lastRender < self.interval:
+            return False
+        self._lastRender = now
+        return True
+
+    def render(self, img, *batches):
+        """
+        Draws the given batches, then this overlay's own queued primitives, onto img.
+        """
+        canvas = Canvas(img)
+        for items in batches + (self.take(),):
+            for name, args in items:
+                getattr(canvas, name)(*args)
+        return img
@@ -0,0 +1,313 @@
+import contextlib
+import threading
+import time
+
+# Start-up is measured from when the first module of the app imports this one
+_IMPORTED = time.perf_counter()
+
+# Passed through the queues after the last frame of a source that ran dry
+END = object()
+
+
+class LatestQueue:
+    """
+    A bounded single-slot queue that only ever keeps the newest item.
+
+    Putting a new item while an older one is still waiting replaces the
+    older one, so a slow consumer always works on fresh data instead of a
+    growing backlog of stale frames.
+
+    end() queues the END sentinel behind the pending item instead of over
+    it, so the last item of a finished stream is never dropped.
+    """
+    def __init__(self):
+        self._item = None
+        self._hasItem = False
+        self._ended = False
+        self._closed = False
+        self._cond = threading.Condition()
+        self.dropped = 0
+
+    def put(self, item):
+        """
+        Stores an item, dropping the pending one if it was not consumed yet.
+        """
+        with self._cond:
+            if self._hasItem:
+                self.dropped += 1
+            self._item = item
+            self._hasItem = True
+            self._cond.notify()
+
+    def get(self, timeout=None):
+        """
+        Waits for the newest item. Returns END once the pending item of an ended
+        queue was taken, and None on a timeout or when the queue is closed.
+        """
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._hasItem or self._ended or self._closed, timeout):
+                return None
+            if not self._hasItem:
+                return END if self._ended and not self._closed else None
+            item = self._item
+            self._item = None
+            self._hasItem = False
+            return item
+
+    def end(self):
+        """
+        Marks the end of the stream: gets return END after the pending item.
+        """
+        with self._cond:
+            self._ended = True
+            self._cond.notify_all()
+
+    def close(self):
+        """
+        Wakes up every waiting consumer and makes further gets return None.
+        """
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+
+class StageStats:
+    """
+    Running latency statistics for a single pipeline stage, in seconds.
+    """
+    def __init__(self, name):
+        self.name = name
+        self.count = 0
+        self.total = 0.0
+        self.last = 0.0
+        self.max = 0.0
+        self._lock = threading.Lock()
+
+    def add(self, elapsed):
+        with self._lock:
+            self.count += 1
+            self.total += elapsed
+            self.last = elapsed
+            if elapsed > self.max:
+                self.max = elapsed
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    def as_dict(self):
+        with self._lock:
+            return {
+                "count": self.count,
+                "last_ms": self.last * 1000,
+                "mean_ms": (self.total / self.count if self.count else 0.0) * 1000,
+                "max_ms": self.max * 1000,
+            }
+
+
+class StartupTimer:
+    """
+    Breaks start-up down into timed phases, up to the first processed frame.
+
+    Phases may overlap, e.g. the detector warming up on one thread while the
+    camera opens on another, so each one is reported with its offset from
+    the start as well as its duration.
+
+    Parameters:
+    start (float): time.perf_counter() value to measure from; defaults to when this module was imported.
+    """
+    def __init__(self, start=None):
+        self.start = _IMPORTED if start is None else start
+        self.phases = {}
+        self._lock = threading.Lock()
+
+    def add(self, name, start, end=None):
+        """
+        Records a phase that ran from start to end (now by default), in time.perf_counter() seconds.
+        """
+        end = time.perf_counter() if end is None else end
+        with self._lock:
+            self.phases[name] = (start, end)
+
+    def mark(self, name):
+        """
+        Records a point in time, e.g. the first captured frame, once.
+        """
+        if name not in self.phases:
+            now = time.perf_counter()
+            self.add(name, now, now)
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        """
+        Times the enclosed block as a phase.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, start)
+
+    def report(self):
+        """
+        Returns every phase's start offset and duration in milliseconds, in start order,
+        and the total time to the end of the last phase.
+        """
+        with self._lock:
+            phases = sorted(self.phases.items(), key=lambda item: item[1][0])
+        report = {name: {"start_ms": (start - self.start) * 1000, "duration_ms": (end - start) * 1000}
+                  for name, (start, end) in phases}
+        report["total_ms"] = (max((end for _, (_, end) in phases), default=self.start) - self.start) * 1000
+        return report
+
+
+class Packet:
+    """
+    A frame travelling through the pipeline together with its timestamps.
+    """
+    __slots__ = ("seq", "img", "result", "tCapture", "tInference")
+
+    def __init__(self, seq, img, tCapture):
+        self.seq = seq
+        self.img = img
+        self.result = None
+        self.tCapture = tCapture
+        self.tInference = 0.0
+
+
+class Pipeline:
+    """
+    A staged capture -> inference -> output pipeline.
+
+    Capture and inference each run on their own thread and hand frames over
+    through LatestQueues, so every stage works on the newest available frame
+    and stale ones are dropped instead of queued. The output stage runs on
+    the thread that calls run(), which keeps cv2.imshow/waitKey and the
+    mouse backends on the main thread.
+
+    Parameters:
+    source (callable): Returns (success, img), e.g. cv2.VideoCapture.read.
+    process (callable): Runs inference on an image and returns a result.
+    output (callable): Receives (img, result) and returns False to stop.
+    startup (StartupTimer): Marks the first captured, inferred and output frame here.
+    timestamps (bool): Call process(img, t) with the time.perf_counter() time the frame was
+                       captured, for stages that filter or differentiate over time.
+    """
+    def __init__(self, source, process, output, startup=None, timestamps=False):
+        self.source = source
+        self.process = process
+        self.output = output
+        self.startup = startup
+        self.timestamps = timestamps
+
+        self.captureQueue = LatestQueue()
+        self.outputQueue = LatestQueue()
+        self.stats = {name: StageStats(name) for name in ("capture", "inference", "output", "total")}
+        self.running = False
+        self._threads = []
+
+    def _capture_loop(self):
+        seq = 0
+        while self.running:
+            start = time.perf_counter()
+            success, img = self.source()
+            end = time.perf_counter()
+            if not success:
+                # Let the later stages finish the frames they hold before they stop
+                self.captureQueue.end()
+                return
+            self.stats["capture"].add(end - start)
+            if seq == 0 and self.startup is not None:
+                self.startup.mark("first frame")
+            self.captureQueue.put(Packet(seq, img, end))
+            seq += 1
+        self.captureQueue.close()
+
+    def _inference_loop(self):
+        while self.running:
+            packet = self.captureQueue.get(timeout=0.1)
+            if packet is None:
+                continue
+            if packet is END:
+                self.outputQueue.end()
+                return
+            start = time.perf_counter()
+            if self.timestamps:
+                packet.result = self.process(packet.img, packet.tCapture)
+            else:
+                packet.result = self.process(packet.img)
+            packet.tInference = time.perf_counter()
+            self.stats["inference"].add(packet.tInference - start)
+            if self.startup is not None:
+                self.startup.mark("first inference")
+            self.outputQueue.put(packet)
+        self.outputQueue.close()
+
+    def start(self):
+        """
+        Starts the capture and inference threads.
+        """
+        self.running = True
+        self._threads = [
+            threading.Thread(target=self._capture_loop, name="capture", daemon=True),
+            threading.Thread(target=self._inference_loop, name="inference", daemon=True),
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self):
+        """
+        Signals every stage to stop and waits for the worker threads.
+        """
+        self.running = False
+        self.captureQueue.close()
+        self.outputQueue.close()
+        for thread in self._threads:
+            thread.join(timeout=1.0)
+        self._threads = []
+
+    def run(self):
+        """
+        Runs the output stage on the calling thread until it asks to stop
+        or the source runs dry and every stage has handled its last frame.
+        """
+        self.start()
+        try:
+            while self.running:
+                packet = self.outputQueue.get(timeout=0.1)
+                if packet is None:
+                    continue
+                if packet is END:
+                    break
+                start = time.perf_counter()
+                keepGoing = self.output(packet.img, packet.result)
+                end = time.perf_counter()
+                self.stats["output"].add(end - start)
+                self.stats["total"].add(end - packet.tCapture)
+                if self.startup is not None:
+                    self.startup.mark("first output")
+                if keepGoing is False:
+                    break
+        finally:
+            self.stop()
+
+    @property
+    def dropped(self):
+        """
+        Number of frames dropped before inference and before output.
+        """
+        return {"inference": self.captureQueue.dropped, "output": self.outputQueue.dropped}
+
+    def report(self):
+        """
+        Returns the per-stage latency statistics as a dictionary.
+        """
+        report = {name: stats.as_dict() for name, stats in self.stats.items()}
+        report["dropped"] = self.dropped
+        return report
+
+    def summary(self):
+        """
+        Returns a one-line per-stage latency summary suitable for overlays.
+        """
+        return " ".join(f"{name[:3]}:{stats.last * 1000:.0f}ms" for name, stats in self.stats.items())
@@ -0,0 +1,356 @@
+import argparse
+import functools
+import json
+import os
+import threading
+import time
+import numpy as np
+
+# Quantiles reported for every span, over its ring buffer of recent samples
+QUANTILES = (0.5, 0.95, 0.99)
+METRIC_NAME = "hand_gesture_span_seconds"
+
+
+class Histogram:
+    """
+    Durations of one named span: the most recent ones in a fixed ring buffer,
+    for quantiles that follow the current behaviour, and a lifetime count,
+    total and maximum.
+
+    Parameters:
+    name (str): Span name.
+    window (int): Number of recent samples kept.
+    """
+    def __init__(self, name, window=1024):
+        self.name = name
+        self.samples = np.zeros(window)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self._lock = threading.Lock()
+
+    def add(self, elapsed):
+        with self._lock:
+            self.samples[self.count % len(self.samples)] = elapsed
+            self.count += 1
+            self.total += elapsed
+            if elapsed > self.max:
+                self.max = elapsed
+
+    def recent(self):
+        """
+        Returns a copy of the samples in the ring buffer, in no particular order.
+        """
+        with self._lock:
+            return self.samples[:min(self.count, len(self.samples))].copy()
+
+    def quantiles(self, quantiles=QUANTILES):
+        samples = self.recent()
+        if not len(samples):
+            return [0.0] * len(quantiles)
+        return np.quantile(samples, quantiles).tolist()
+
+    def as_dict(self):
+        report = {"count": self.count, "mean_ms": (self.total / self.count if self.count else 0.0) * 1000}
+        for q, value in zip(QUANTILES, self.quantiles()):
+            report[f"p{round(q * 100)}_ms"] = value * 1000
+        report["max_ms"] = self.max * 1000
+        return report
+
+
+class _Span:
+    __slots__ = ("histogram", "start")
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.add(time.perf_counter() - self.start)
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Instrumented:
+    # Proxy that times the listed methods of an object and passes everything else through
+    def __init__(self, target, methods):
+        self._target = target
+        for name, method in methods.items():
+            setattr(self, name, method)
+
+    def __getattr__(self, name):
+        return getattr(self._target, name)
+
+
+class Profiler:
+    """
+    Named timing spans around the stages of detection, gesture logic,
+    actuation and preview, kept as ring-buffer histograms.
+
+    A disabled profiler hands out one shared no-op span and returns wrapped
+    functions and instrumented objects unchanged, so instrumented code costs
+    a method call per span when profiling is off.
+
+    Parameters:
+    enabled (bool): Record spans.
+    window (int): Recent samples kept per span for the quantiles.
+    """
+    def __init__(self, enabled=True, window=1024):
+        self.enabled = enabled
+        self.window = window
+        self.histograms = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, name):
+        """
+        Returns the histogram of a span, creating it on first use.
+        """
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            with self._lock:
+                histogram = self.histograms.setdefault(name, Histogram(name, self.window))
+        return histogram
+
+    def span(self, name):
+        """
+        Returns a context manager that records the time spent in its block under name.
+        """
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self.histogram(name))
+
+    def record(self, name, elapsed):
+        """
+        Records a duration, in seconds, measured elsewhere.
+        """
+        if self.enabled:
+            self.histogram(name).add(elapsed)
+
+    def wrap(self, name, function):
+        """
+        Returns function timed as span name, or function itself when disabled.
+        """
+        if not self.enabled:
+            return function
+        histogram = self.histogram(name)
+
+        @functools.wraps(function)
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                histogram.add(time.perf_counter() - start)
+        return timed
+
+    def instrument(self, target, prefix, methods):
+        """
+        Returns a proxy of target whose listed methods are timed as spans prefix.method,
+        or target itself when disabled.
+        """
+        if not self.enabled:
+            return target
+        return _Instrumented(target, {name: self.wrap(f"{prefix}.{name}", getattr(target, name))
+                                      for name in methods if hasattr(target, name)})
+
+    def _items(self):
+        # Spans are added from several threads, under the lock
+        with self._lock:
+            return sorted(self.histograms.items())
+
+    def as_dict(self):
+        """
+        Returns the statistics of every span, in milliseconds, keyed by span name.
+        """
+        return {name: histogram.as_dict() for name, histogram in self._items()}
+
+    def to_json(self):
+        return json.dumps({"time": time.time(), "spans": self.as_dict()}, indent=2)
+
+    def to_prometheus(self):
+        """
+        Returns every span as a Prometheus summary in the text exposition format.
+        """
+        lines = [f"# HELP {METRIC_NAME} Time spent in each instrumented stage.",
+                 f"# TYPE {METRIC_NAME} summary"]
+        for name, histogram in self._items():
+            for q, value in zip(QUANTILES, histogram.quantiles()):
+                lines.append(f'{METRIC_NAME}{{span="{name}",quantile="{q}"}} {value:.9f}')
+            lines.append(f'{METRIC_NAME}_sum{{span="{name}"}} {histogram.total:.9f}')
+            lines.append(f'{METRIC_NAME}_count{{span="{name}"}} {histogram.count}')
+        return "\n".join(lines) + "\n"
+
+    def panel(self, canvas, org=(20, 110), scale=1, color=(0, 255, 255), lineHeight=16):
+        """
+        Draws a debug panel with the p50/p95/max of every span onto a Canvas or Overlay.
+        """
+        x, y = org
+        canvas.text("span p50 p95 max (ms)", (x, y), scale, color)
+        for name, histogram in self._items():
+            y += lineHeight
+            p50, p95 = histogram.quantiles((0.5, 0.95))
+            canvas.text(f"{name} {p50 * 1000:.1f} {p95 * 1000:.1f} {histogram.max * 1000:.1f}", (x, y), scale, color)
+
+    def reset(self):
+        with self._lock:
+            self.histograms = {}
+
+
+# Default for instrumented classes, so code paths without a profiler stay uninstrumented
+NULL_PROFILER = Profiler(enabled=False)
+
+
+class MetricsExporter:
+    """
+    Publishes a profiler's spans periodically to a local file and on demand
+    over HTTP, as JSON or Prometheus text.
+
+    The file is rewritten every interval seconds through a temporary file, so
+    readers never see a partial dump; its format follows the extension (.json
+    for JSON, Prometheus text otherwise). The HTTP endpoint serves /metrics
+    in Prometheus text and /metrics.json as JSON.
+
+    Parameters:
+    profiler (Profiler): Spans to export.
+    path (str): File to dump to, or None.
+    port (int): Local HTTP port to serve on, or None.
+    interval (float): Seconds between file dumps.
+    host (str): Interface the HTTP endpoint binds to.
+    """
+    def __init__(self, profiler, path=None, port=None, interval=1.0, host="127.0.0.1"):
+        self.profiler = profiler
+        self.path = path
+        self.port = port
+        self.interval = interval
+        self.host = host
+        self.dumps = 0
+        self._stop = threading.Event()
+        self._thread = None
+        self._server = None
+
+    def render(self, jsonFormat):
+        return self.profiler.to_json() if jsonFormat else self.profiler.to_prometheus()
+
+    def dump(self):
+        """
+        Writes the current spans to the file.
+        """
+        temp = f"{self.path}.tmp"
+        with open(temp, "w") as f:
+            f.write(self.render(self.path.endswith(".json")))
+        os.replace(temp, self.path)
+        self.dumps += 1
+
+    def _dump_loop(self):
+        while not self._stop.wait(self.interval):
+            self.dump()
+        self.dump()
+
+    def start(self):
+        """
+        Starts the dump thread and the HTTP endpoint. Returns self.
+        """
+        if self.path:
+            self._thread = threading.Thread(target=self._dump_loop, name="metrics", daemon=True)
+            self._thread.start()
+        if self.port is not None:
+            # Only loaded when serving, it is not needed on the start-up path otherwise
+            from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+            exporter = self
+
+            class Handler(BaseHTTPRequestHandler):
+                def do_GET(self):
+                    if self.path not in ("/metrics", "/metrics.json"):
+                        self.send_error(404)
+                        return
+                    jsonFormat = self.path.endswith(".json")
+                    body = exporter.render(jsonFormat).encode()
+                    self.send_response(200)
+                    self.send_header("Content-Type", "application/json" if jsonFormat
+                                     else "text/plain; version=0.0.4")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+
+                def log_message(self, *args):
+                    pass
+
+            self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+            self.port = self._server.server_address[1]
+            threading.Thread(target=self._server.serve_forever, name="metrics-http", daemon=True).start()
+        return self
+
+    def stop(self):
+        """
+        Stops exporting; the file gets a final dump.
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval + 1.0)
+            self._thread = None
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def add_profiler_arguments(parser):
+    """
+    Adds the profiling options shared by the command line entry points to an argparse parser.
+    """
+    parser.add_argument("--profile", action="store_true", help="Time every stage and show a debug panel")
+    parser.add_argument("--metrics-file", help="Dump stage timings here periodically (.json, else Prometheus text)")
+    parser.add_argument("--metrics-port", type=int, help="Serve stage timings on localhost:PORT/metrics")
+    parser.add_argument("--metrics-interval", type=float, default=1.0, help="Seconds between metrics file dumps")
+    return parser
+
+
+def profiler_from_args(args):
+    """
+    Builds (profiler, exporter) from options added by add_profiler_arguments. Exporting
+    turns profiling on; exporter is None when nothing is exported.
+    """
+    exporting = args.metrics_file is not None or args.metrics_port is not None
+    profiler = Profiler(enabled=args.profile or exporting)
+    exporter = None
+    if exporting:
+        exporter = MetricsExporter(profiler, args.metrics_file, args.metrics_port, args.metrics_interval)
+    return profiler, exporter
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Print stage timings from a metrics file")
+    parser.add_argument("path")
+    args = parser.parse_args()
+
+    with open(args.path) as f:
+        text = f.read()
+    if args.path.endswith(".json"):
+        for name, stats in json.loads(text)["spans"].items():
+            print(f"{name:24} " + " ".join(f"{key}={value:.2f}" for key, value in stats.items()))
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+import time
+import numpy as np
+from HandTrackingModule import hand_scales
+
+
+class AdaptiveScheduler:
+    """
+    Skips hand inference on frames where the hand moves slowly and predictably.
+
+    Wraps a handDetector: on inference frames it calls detector.findHands and
+    fits a constant-velocity model per landmark, on skipped frames it writes
+    the extrapolated landmarks into the detector's buffers so findPosition,
+    fingersUp and the other predicates keep working unchanged. The inference
+    interval grows up to maxInterval while the gesture stays the same and the
+    hand is slow and well predicted, and drops back to every frame as soon as
+    any of that changes.
+
+    Parameters:
+    detector (handDetector): The detector to drive.
+    maxInterval (int): Run inference at least every this many frames.
+    speedThreshold (float): Maximum landmark speed, in hand scales per second, for skipping.
+    errorThreshold (float): Maximum mean prediction error, in hand scales, for skipping.
+    skipGestures (set): Gesture states allowed to skip frames, or None for any steady state.
+    """
+    def __init__(self, detector, maxInterval=3, speedThreshold=3.6, errorThreshold=0.055, skipGestures=None):
+        self.detector = detector
+        self.maxInterval = maxInterval
+        self.speedThreshold = speedThreshold
+        self.errorThreshold = errorThreshold
+        self.skipGestures = skipGestures
+
+        shape = detector.landmarks.shape
+        self._last = np.zeros(shape, np.float32)
+        self._velocity = np.zeros(shape, np.float32)
+        self._lastTime = None
+        self._lastCount = 0
+        self._gesture = None
+        self._sinceInference = 0
+
+        self.interval = 1
+        self.frames = 0
+        self.skipped = 0
+        self.lastError = 0.0
+        self.meanError = 0.0
+
+    def findHands(self, img, gesture=None, draw=True, t=None):
+        """
+        Runs or skips inference for this frame.
+
+        Parameters:
+        img (ndarray): Image frame.
+        gesture (hashable): Gesture state of the previous frame, e.g. tuple(fingers).
+        draw (bool): Passed through to detector.findHands.
+        t (float): Frame timestamp in seconds, defaults to time.perf_counter().
+        """
+        t = time.perf_counter() if t is None else t
+        self.frames += 1
+
+        steady = (gesture is not None and gesture == self._gesture and
+                  (self.skipGestures is None or gesture in self.skipGestures))
+        self._gesture = gesture
+        if not steady:
+            self.interval = 1
+
+        if steady and self._lastCount and self._sinceInference < self.interval - 1:
+            self._sinceInference += 1
+            self.skipped += 1
+            self._predict(t)
+            return img
+
+        self._sinceInference = 0
+        self.detector.findHands(img, draw)
+        self._observe(t)
+        return img
+
+    def _predict(self, t):
+        # Constant-velocity extrapolation from the last inference frame
+        n = self._lastCount
+        predicted = self.detector.landmarks[:n]
+        np.multiply(self._velocity[:n], t - self._lastTime, out=predicted)
+        predicted += self._last[:n]
+        np.copyto(self.detector.pixels[:n], predicted[:, :, :2], casting='unsafe')
+        self.detector.handCount = n
+
+    def _observe(self, t):
+        # Score the model against the new inference and refit it
+        n = self.detector.handCount
+        current = self.detector.landmarks[:n]
+        if n and n == self._lastCount:
+            dt = max(t - self._lastTime, 1e-6)
+            predicted = self._last[:n] + self._velocity[:n] * dt
+            # Errors and speeds relative to each hand's size hold at any capture resolution
+            scales = hand_scales(current)[:, None]
+            error = np.linalg.norm(predicted[:, :, :2] - current[:, :, :2], axis=-1) / scales
+            self.lastError = float(error.mean())
+            self.meanError += 0.1 * (self.lastError - self.meanError)
+
+            np.subtract(current, self._last[:n], out=self._velocity[:n])
+            self._velocity[:n] /= dt
+            speed = float((np.linalg.norm(self._velocity[:n, :, :2], axis=-1) / scales).max())
+
+            if self.lastError < self.errorThreshold and speed < self.speedThreshold:
+                self.interval = min(self.interval + 1, self.maxInterval)
+            else:
+                self.interval = 1
+        else:
+            self._velocity[:] = 0
+            self.interval = 1
+
+        self._last[:n] = current
+        self._lastCount = n
+        self._lastTime = t
+
+    @property
+    def skipRatio(self):
+        return self.skipped / self.frames if self.frames else 0.0
+
+    def metrics(self):
+        """
+        Returns the skip ratio and prediction error metrics as a dictionary.
+        """
+        return {
+            "frames": self.frames,
+            "skipped": self.skipped,
+            "skipRatio": self.skipRatio,
+            "interval": self.interval,
+            "lastPredictionError": self.lastError,
+            "meanPredictionError": self.meanError,
+        }
@@ -0,0 +1,381 @@
+import argparse
+import multiprocessing
+import queue
+import threading
+import time
+from multiprocessing import shared_memory
+import numpy as np
+import HandTrackingModule as htm
+from CaptureModule import Capture
+
+# Header of every frame slot: sequence number of the frame in it (-1 while empty or being written) and its timestamp
+SLOT_DTYPE = np.dtype([("seq", np.int64), ("t", np.float64)])
+
+
+class FrameRing:
+    """
+    A fixed ring of equally sized frames in shared memory, written by one
+    process and read by another without pickling the pixels.
+
+    A slot's sequence number is cleared while it is written and set once the
+    frame is complete, so a reader can tell a finished frame from one that
+    has been overwritten since it was announced.
+
+    Parameters:
+    shape (tuple): Frame shape, e.g. (480, 640, 3).
+    slots (int): Number of frames in the ring.
+    name (str): Attach to an existing ring of this name instead of creating one.
+    """
+    def __init__(self, shape, slots=4, name=None):
+        self.shape = tuple(shape)
+        self.slots = slots
+        self.owner = name is None
+        headerSize = SLOT_DTYPE.itemsize * slots
+        size = headerSize + int(np.prod(self.shape)) * slots
+        self.shm = shared_memory.SharedMemory(name=name, create=self.owner, size=size if self.owner else 0)
+        self.headers = np.ndarray(slots, SLOT_DTYPE, self.shm.buf)
+        self.frames = np.ndarray((slots,) + self.shape, np.uint8, self.shm.buf, offset=headerSize)
+        if self.owner:
+            self.headers["seq"] = -1
+        self.seq = 0
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def write(self, img, t):
+        """
+        Copies img into the next slot and returns its sequence number.
+        """
+        seq = self.seq
+        slot = seq % self.slots
+        self.headers["seq"][slot] = -1
+        np.copyto(self.frames[slot], img)
+        self.headers["t"][slot] = t
+        self.headers["seq"][slot] = seq
+        self.seq += 1
+        return seq
+
+    def read(self, seq):
+        """
+        Returns (frame, t) for frame seq as a view into shared memory, or
+        (None, None) when it has already been overwritten. The view stays
+        valid only while valid(seq) holds.
+        """
+        slot = seq % self.slots
+        if self.headers["seq"][slot] != seq:
+            return None, None
+        return self.frames[slot], float(self.headers["t"][slot])
+
+    def valid(self, seq):
+        return self.headers["seq"][seq % self.slots] == seq
+
+    def close(self):
+        # The numpy views have to go before the mapping can be closed
+        self.headers = self.frames = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+class DetectionResult:
+    """
+    The hands found in one frame of one camera, in that camera's pixel coordinates.
+    """
+    __slots__ = ("cameraId", "seq", "t", "tDetected", "landmarks", "rightHand", "scores", "dropped")
+
+    def __init__(self, cameraId, seq, t, tDetected, landmarks, rightHand, scores, dropped=0):
+        self.cameraId = cameraId
+        self.seq = seq
+        self.t = t
+        self.tDetected = tDetected
+        self.landmarks = landmarks
+        self.rightHand = rightHand
+        self.scores = scores
+        self.dropped = dropped
+
+    @property
+    def handCount(self):
+        return len(self.landmarks)
+
+    @property
+    def latency(self):
+        return self.tDetected - self.t
+
+
+class StreamEnd:
+    """
+    Sent by a worker after the last result of a camera whose source ran dry.
+    """
+    __slots__ = ("cameraId",)
+
+    def __init__(self, cameraId):
+        self.cameraId = cameraId
+
+
+class WorkerError(RuntimeError):
+    """
+    Raised by DetectionService when a worker process exits while the service runs.
+
+    Parameters:
+    exitcode (int): The process's exit code, negative for the signal that killed it.
+    cameras (list): Ids of the cameras the worker served.
+    """
+    def __init__(self, exitcode, cameras):
+        super().__init__(f"Detection worker for cameras {cameras} exited with code {exitcode}")
+        self.exitcode = exitcode
+        self.cameras = cameras
+
+
+def _worker(cameras, tasks, results, detector, options):
+    # Worker process: one detector, and so one MediaPipe graph, per camera it serves,
+    # since a graph tracks hands across the frames of a single stream
+    rings = {cameraId: FrameRing(shape, slots, name) for cameraId, (name, shape, slots) in cameras.items()}
+    detectors = {cameraId: detector(**options) for cameraId in cameras}
+    dropped = dict.fromkeys(cameras, 0)
+    running = True
+    while running:
+        pending = [tasks.get()]
+        while True:
+            try:
+                pending.append(tasks.get_nowait())
+            except queue.Empty:
+                break
+
+        # Only the newest announced frame of every camera is worth running
+        latest = {}
+        ended = []
+        for task in pending:
+            if task is None:
+                running = False
+                continue
+            cameraId, seq = task
+            if seq is None:
+                ended.append(cameraId)
+                continue
+            if cameraId in latest:
+                dropped[cameraId] += 1
+            latest[cameraId] = max(seq, latest.get(cameraId, seq))
+
+        for cameraId, seq in latest.items():
+            ring = rings[cameraId]
+            img, t = ring.read(seq)
+            if img is None:
+                dropped[cameraId] += 1
+                continue
+            hands = detectors[cameraId]
+            hands.findHands(img, draw=False)
+            if not ring.valid(seq):
+                # Overwritten while it was being read
+                dropped[cameraId] += 1
+                continue
+            n = hands.handCount
+            results.put(DetectionResult(cameraId, seq, t, time.time(), hands.landmarks[:n].copy(),
+                                        hands.rightHand[:n].copy(), hands.scores[:n].copy(), dropped[cameraId]))
+            dropped[cameraId] = 0
+        # After the camera's last result, which shares this queue
+        for cameraId in ended:
+            results.put(StreamEnd(cameraId))
+
+    for ring in rings.values():
+        ring.close()
+
+
+class DetectionService:
+    """
+    Runs hand detection for several frame sources on a pool of worker processes.
+
+    Every source is read on its own thread into a shared-memory FrameRing and
+    announced to the worker process that owns it; the worker runs the
+    newest frame of each of its cameras and sends back DetectionResults
+    tagged with camera id and capture timestamp. Cameras are spread over the
+    workers round-robin, so detection scales across cores instead of
+    saturating one, and each worker keeps one detector per camera.
+
+    The result queue holds at most one ring of results per camera; when the
+    consumer falls behind, the workers wait for it and the rings drop the
+    frames they skip, so memory stays bounded.
+
+    Parameters:
+    sources (list or dict): Captures (or sources accepted by Capture), keyed by camera id when a dict.
+    workers (int): Number of worker processes, defaults to one per source up to the CPU count.
+    slots (int): Frames per camera ring.
+    detector (callable): Builds the detector in each worker; must be picklable, e.g. a class.
+    options: Keyword arguments for detector, e.g. maxHands=2, mirror=True.
+    """
+    def __init__(self, sources, workers=None, slots=4, detector=htm.handDetector, **options):
+        if not isinstance(sources, dict):
+            sources = dict(enumerate(sources))
+        self.captures = {cameraId: source if isinstance(source, Capture) else Capture(source)
+                         for cameraId, source in sources.items()}
+        self.workers = workers or min(len(self.captures), multiprocessing.cpu_count())
+        self.slots = slots
+        self.detector = detector
+        self.options = options
+
+        self.captured = dict.fromkeys(self.captures, 0)
+        self.processed = dict.fromkeys(self.captures, 0)
+        self.dropped = dict.fromkeys(self.captures, 0)
+        self.latestResults = {}
+        self.ended = set()
+        self.running = False
+        self._rings = {}
+        self._processes = []
+        self._threads = []
+        self._tasks = []
+        self._owned = []
+
+    def start(self):
+        """
+        Opens the sources, starts the worker processes, then the capture threads. Returns self.
+        """
+        context = multiprocessing.get_context("spawn")
+        self._results = context.Queue(self.slots * len(self.captures))
+        first = {}
+        for cameraId, capture in self.captures.items():
+            capture.open()
+            success, img = capture.read()
+            if not success:
+                raise IOError(f"Camera {cameraId!r} returned no frame")
+            first[cameraId] = img
+            self._rings[cameraId] = FrameRing(img.shape, self.slots)
+
+        owners = {cameraId: i % self.workers for i, cameraId in enumerate(self.captures)}
+        for worker in range(self.workers):
+            cameras = {cameraId: (ring.name, ring.shape, ring.slots) for cameraId, ring in self._rings.items()
+                       if owners[cameraId] == worker}
+            tasks = context.Queue()
+            process = context.Process(target=_worker, args=(cameras, tasks, self._results, self.detector,
+                                                             self.options), daemon=True)
+            process.start()
+            self._tasks.append(tasks)
+            self._processes.append(process)
+            self._owned.append(list(cameras))
+
+        # Workers are started before any thread exists in this process
+        self.running = True
+        for cameraId, capture in self.captures.items():
+            thread = threading.Thread(target=self._capture_loop,
+                                      args=(cameraId, first[cameraId], self._tasks[owners[cameraId]]),
+                                      name=f"capture-{cameraId}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def _capture_loop(self, cameraId, img, tasks):
+        capture, ring = self.captures[cameraId], self._rings[cameraId]
+        success = True
+        while self.running and success:
+            tasks.put((cameraId, ring.write(img, time.time())))
+            self.captured[cameraId] += 1
+            success, img = capture.read()
+        if not success:
+            tasks.put((cameraId, None))  # end of stream
+
+    def get(self, timeout=None):
+        """
+        Returns the next DetectionResult from any camera, or None on timeout or when
+        a camera's source ended; self.ended holds the ids of the cameras that did.
+        Raises WorkerError once a worker process has died and its last results are read.
+        """
+        try:
+            result = self._results.get(timeout=timeout)
+        except queue.Empty:
+            self._check_workers()
+            return None
+        if isinstance(result, StreamEnd):
+            self.ended.add(result.cameraId)
+            return None
+        self.processed[result.cameraId] += 1
+        self.dropped[result.cameraId] += result.dropped
+        self.latestResults[result.cameraId] = result
+        return result
+
+    def _check_workers(self):
+        # Workers only exit on stop(), which clears self._processes; the results a worker
+        # sent before it died have been read by the time the queue runs empty
+        for process, cameras in zip(self._processes, self._owned):
+            if process.exitcode is not None and not self.ended.issuperset(cameras):
+                raise WorkerError(process.exitcode, cameras)
+
+    def _drain(self):
+        # A worker blocked on the full result queue can only exit once it has room
+        try:
+            while True:
+                self._results.get_nowait()
+        except queue.Empty:
+            pass
+
+    @property
+    def finished(self):
+        """
+        Every source ended and all of their results were received.
+        """
+        return len(self.ended) == len(self.captures)
+
+    def __iter__(self):
+        # Ends when every source ran dry, or after stop() once the results are drained
+        while not self.finished and (self.running or not self._results.empty()):
+            result = self.get(timeout=0.1)
+            if result is not None:
+                yield result
+
+    def latest(self):
+        """
+        Returns the most recent result of every camera, keyed by camera id, for fusing views downstream.
+        """
+        return dict(self.latestResults)
+
+    def stats(self):
+        return {cameraId: {"captured": self.captured[cameraId], "processed": self.processed[cameraId],
+                           "dropped": self.dropped[cameraId]} for cameraId in self.captures}
+
+    def stop(self):
+        """
+        Stops the capture threads and worker processes and frees the shared memory.
+        """
+        self.running = False
+        for thread in self._threads:
+            thread.join(timeout=1.0)
+        for tasks in self._tasks:
+            tasks.put(None)
+        for process in self._processes:
+            deadline = time.time() + 5.0
+            while process.is_alive() and time.time() < deadline:
+                self._drain()
+                process.join(timeout=0.05)
+            if process.is_alive():
+                process.terminate()
+        for ring in self._rings.values():
+            ring.close()
+        for capture in self.captures.values():
+            capture.release()
+        self._threads, self._processes, self._tasks, self._owned, self._rings = [], [], [], [], {}
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Multi-camera hand detection service")
+    parser.add_argument("--source", action="append", help="Camera index, video file or image directory; repeatable")
+    parser.add_argument("--workers", type=int)
+    parser.add_argument("--hands", type=int, default=2)
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds to run")
+    args = parser.parse_args()
+
+    with DetectionService(args.source or ["0"], args.workers, maxHands=args.hands, mirror=True) as service:
+        end = time.time() + args.duration
+        for result in service:
+            if time.time() > end:
+                break
+            print(f"camera {result.cameraId} frame {result.seq}: {result.handCount} hands, "
+                  f"{result.latency * 1000:.1f} ms")
+        print(service.stats())
+
+
+if __name__ == "__main__":
+    main()
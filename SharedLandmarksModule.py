@@ -0,0 +1,273 @@
+import argparse
+import time
+from multiprocessing import shared_memory
+import numpy as np
+import HandTrackingModule as htm
+
+MAGIC = b"HGLM"
+VERSION = 1
+DEFAULT_NAME = "hand_landmarks"
+HEADER_DTYPE = np.dtype([
+    ("magic", "S4"),
+    ("version", np.uint16),
+    ("maxHands", np.uint16),
+    ("slots", np.uint32),
+    ("latest", np.int64),     # sequence number of the newest complete frame, -1 before the first
+])
+
+
+def slot_dtype(maxHands):
+    """
+    Record layout of one published frame for up to maxHands hands.
+    """
+    return np.dtype([
+        ("lock", np.uint64),      # odd while the slot is being written
+        ("seq", np.int64),
+        ("t", np.float64),
+        ("handCount", np.uint8),
+        ("gesture", "S32"),       # active gesture name, empty for none
+        ("landmarks", np.float32, (maxHands, htm.NUM_LANDMARKS, 3)),
+        ("rightHand", bool, maxHands),
+        ("scores", np.float32, maxHands),
+        ("states", htm.HAND_STATE_DTYPE, maxHands),
+    ])
+
+
+def _attach(name, create, size=0):
+    if not create:
+        return shared_memory.SharedMemory(name=name)
+    try:
+        return shared_memory.SharedMemory(name=name, create=True, size=size)
+    except FileExistsError:
+        # Left behind by a publisher that did not shut down cleanly
+        stale = shared_memory.SharedMemory(name=name)
+        stale.close()
+        stale.unlink()
+        return shared_memory.SharedMemory(name=name, create=True, size=size)
+
+
+class LandmarkPublisher:
+    """
+    Publishes every frame's landmarks, handedness, hand states, active
+    gesture and timestamp into a named shared-memory ring, so local
+    consumers get the results without opening the camera or running
+    inference themselves.
+
+    Each slot is guarded by a sequence lock: its counter is odd while the
+    slot is written and changes with every write, so readers detect a torn
+    or overwritten read instead of blocking the publisher.
+
+    Parameters:
+    name (str): Shared memory name subscribers attach to.
+    maxHands (int): Maximum number of hands per frame.
+    slots (int): Frames kept in the ring; a zero-copy view stays valid until this many newer frames.
+    """
+    def __init__(self, name=DEFAULT_NAME, maxHands=2, slots=8):
+        self.maxHands = maxHands
+        self.slots = slots
+        dtype = slot_dtype(maxHands)
+        self.shm = _attach(name, True, HEADER_DTYPE.itemsize + dtype.itemsize * slots)
+        self.header = np.ndarray((), HEADER_DTYPE, self.shm.buf)
+        self.records = np.ndarray(slots, dtype, self.shm.buf, offset=HEADER_DTYPE.itemsize)
+        self.records[:] = np.zeros(slots, dtype)
+        self.header[()] = (MAGIC, VERSION, maxHands, slots, -1)
+        self.seq = 0
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def publish(self, detector, gesture=None, t=None):
+        """
+        Writes the detector's current hands as the next frame. Call evaluateHands
+        first for the hand states. gesture is the active Gesture or its name.
+
+        Returns:
+        int: Sequence number of the published frame.
+        """
+        t = time.time() if t is None else t
+        seq = self.seq
+        record = self.records[seq % self.slots]
+        n = min(detector.handCount, self.maxHands)
+
+        record["lock"] += 1
+        record["seq"] = seq
+        record["t"] = t
+        record["handCount"] = n
+        record["gesture"] = (getattr(gesture, "name", gesture) or "").encode()[:32]
+        record["landmarks"][:n] = detector.landmarks[:n]
+        record["rightHand"][:n] = detector.rightHand[:n]
+        record["scores"][:n] = detector.scores[:n]
+        record["states"][:n] = detector.handStates[:n]
+        record["lock"] += 1
+
+        self.header["latest"] = seq
+        self.seq += 1
+        return seq
+
+    def close(self):
+        self.header = self.records = None
+        self.shm.close()
+        self.shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class LandmarkFrame:
+    """
+    One published frame as seen by a subscriber. The arrays are views into
+    shared memory unless the frame was copied; check valid() after using them.
+    """
+    __slots__ = ("seq", "record", "lock")
+
+    def __init__(self, seq, record, lock):
+        self.seq = seq
+        self.record = record
+        self.lock = lock
+
+    @property
+    def t(self):
+        return float(self.record["t"])
+
+    @property
+    def handCount(self):
+        return int(self.record["handCount"])
+
+    @property
+    def gesture(self):
+        return self.record["gesture"].decode() or None
+
+    @property
+    def landmarks(self):
+        return self.record["landmarks"][:self.handCount]
+
+    @property
+    def rightHand(self):
+        return self.record["rightHand"][:self.handCount]
+
+    @property
+    def scores(self):
+        return self.record["scores"][:self.handCount]
+
+    @property
+    def states(self):
+        return self.record["states"][:self.handCount]
+
+    def valid(self):
+        """
+        True while the slot still holds this frame, i.e. the views were not overwritten.
+        """
+        return int(self.record["lock"]) == self.lock
+
+
+class LandmarkSubscriber:
+    """
+    Reads frames published by a LandmarkPublisher, from any local process.
+
+    Parameters:
+    name (str): Shared memory name of the publisher.
+    """
+    def __init__(self, name=DEFAULT_NAME):
+        self.shm = _attach(name, False)
+        self.header = np.ndarray((), HEADER_DTYPE, self.shm.buf)
+        if bytes(self.header["magic"]) != MAGIC or int(self.header["version"]) != VERSION:
+            self.shm.close()
+            raise ValueError(f"{name} is not a version {VERSION} landmark ring")
+        self.maxHands = int(self.header["maxHands"])
+        self.slots = int(self.header["slots"])
+        self.records = np.ndarray(self.slots, slot_dtype(self.maxHands), self.shm.buf,
+                                  offset=HEADER_DTYPE.itemsize)
+        self.lastSeq = -1
+        self.torn = 0
+        self.stalled = 0
+
+    @property
+    def latestSeq(self):
+        return int(self.header["latest"])
+
+    def read(self, seq=None, copy=False, timeout=0.005):
+        """
+        Returns the frame with sequence number seq (the newest by default), or None
+        when nothing has been published yet, it has already been overwritten, or its
+        slot stayed mid-write for longer than timeout.
+
+        Parameters:
+        seq (int): Frame to read.
+        copy (bool): Copy the frame out of shared memory; otherwise its arrays are
+                     zero-copy views, valid until the slot is reused.
+        timeout (float): Seconds to retry a slot caught mid-write. A write takes
+                         microseconds, so a slot that stays locked belongs to a
+                         publisher that died while writing it.
+        """
+        seq = self.latestSeq if seq is None else seq
+        if seq < 0:
+            return None
+        record = self.records[seq % self.slots]
+        deadline = None
+        while True:
+            lock = int(record["lock"])
+            if lock % 2 == 0:
+                if int(record["seq"]) != seq:
+                    return None
+                frame = LandmarkFrame(seq, record.copy() if copy else record, lock)
+                if int(record["lock"]) == lock:
+                    self.lastSeq = seq
+                    return frame
+            # Caught the publisher mid-write
+            self.torn += 1
+            now = time.perf_counter()
+            if deadline is None:
+                deadline = now + timeout
+            elif now >= deadline:
+                self.stalled += 1
+                return None
+
+    def poll(self, copy=False):
+        """
+        Returns the newest frame if it is newer than the last one read, otherwise None.
+        """
+        if self.latestSeq <= self.lastSeq:
+            return None
+        return self.read(copy=copy)
+
+    def frames(self, interval=0.001, copy=False):
+        """
+        Yields every new frame, polling at the given interval; frames published
+        faster than the consumer reads are skipped.
+        """
+        while True:
+            frame = self.poll(copy)
+            if frame is None:
+                time.sleep(interval)
+            else:
+                yield frame
+
+    def close(self):
+        self.header = self.records = None
+        self.shm.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Print landmark frames published by a running controller")
+    parser.add_argument("name", nargs="?", default=DEFAULT_NAME)
+    args = parser.parse_args()
+
+    with LandmarkSubscriber(args.name) as subscriber:
+        for frame in subscriber.frames():
+            tip = frame.landmarks[0, 8, :2].tolist() if frame.handCount else None
+            print(f"frame {frame.seq}: {frame.handCount} hands, gesture {frame.gesture}, index tip {tip}, "
+                  f"{(time.time() - frame.t) * 1000:.1f} ms old")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,576 @@
+import argparse
+import asyncio
+import struct
+import threading
+import time
+from urllib.parse import parse_qs, urlparse
+import numpy as np
+import HandTrackingModule as htm
+from TraceModule import TraceRecord, replay_frame
+
+MAGIC = b"HGLP"
+VERSION = 1
+MAX_HANDS = 2
+# Landmarks are sent normalized to the frame size in int16 steps of 1/COORD_SCALE,
+# covering -2..2 frame sizes (0.04 px at 640 wide)
+COORD_SCALE = 16384
+SUBSCRIBE = struct.Struct("<4sf")   # b"HGSB", requested rate in Hz (0 for the server default)
+SUBSCRIBE_MAGIC = b"HGSB"
+
+# One fixed-size little-endian packet per frame
+PACKET_DTYPE = np.dtype([
+    ("magic", "S4"),
+    ("version", "u1"),
+    ("handCount", "u1"),
+    ("seq", "<u4"),
+    ("t", "<f8"),
+    ("width", "<u2"),
+    ("height", "<u2"),
+    ("gesture", "S16"),
+    ("right", "u1", MAX_HANDS),
+    ("score", "u1", MAX_HANDS),       # handedness score * 255
+    ("fingers", "u1", MAX_HANDS),     # raised fingers bitmask, thumb = bit 0
+    ("halfClosed", "u1", MAX_HANDS),
+    ("flags", "u1", MAX_HANDS),       # bit 0 flipped, bit 1 turned
+    ("landmarks", "<i2", (MAX_HANDS, htm.NUM_LANDMARKS, 3)),
+])
+PACKET_SIZE = PACKET_DTYPE.itemsize
+FINGER_BITS = 1 << np.arange(5)
+
+
+def encode_packet(detector, seq, size, gesture=None, t=None, out=None):
+    """
+    Packs the detector's current hands into a PACKET_SIZE byte packet.
+    Call evaluateHands first for the finger states.
+
+    Parameters:
+    detector (handDetector): Detector holding the frame's hands.
+    seq (int): Packet sequence number.
+    size (tuple): (width, height) of the frame the landmarks are in.
+    gesture (Gesture or str): Active gesture, or None.
+    t (float): Capture timestamp, defaults to time.time().
+    out (ndarray): Packet record to fill, to avoid allocating one per frame.
+    """
+    packet = np.zeros((), PACKET_DTYPE) if out is None else out
+    n = min(detector.handCount, MAX_HANDS)
+    w, h = size
+    packet["magic"] = MAGIC
+    packet["version"] = VERSION
+    packet["handCount"] = n
+    packet["seq"] = seq & 0xFFFFFFFF
+    packet["t"] = time.time() if t is None else t
+    packet["width"], packet["height"] = w, h
+    packet["gesture"] = (getattr(gesture, "name", gesture) or "").encode()[:16]
+    states = detector.handStates[:n]
+    packet["right"][:n] = detector.rightHand[:n]
+    packet["score"][:n] = np.clip(detector.scores[:n] * 255, 0, 255)
+    packet["fingers"][:n] = states["fingers"] @ FINGER_BITS
+    packet["halfClosed"][:n] = states["halfClosed"] @ FINGER_BITS
+    packet["flags"][:n] = states["flipped"] | (states["turned"] << 1)
+    # Pixel x and y back to frame-normalized units, z is already normalized by MediaPipe
+    normalized = detector.landmarks[:n] / (w, h, 1)
+    packet["landmarks"][:n] = np.clip(np.rint(normalized * COORD_SCALE), -32768, 32767)
+    return packet.tobytes()
+
+
+def decode_packet(data):
+    """
+    Returns the packet record of data, or None if it is not a valid packet.
+    """
+    if len(data) != PACKET_SIZE:
+        return None
+    packet = np.frombuffer(data, PACKET_DTYPE)[0]
+    if packet["magic"] != MAGIC or packet["version"] != VERSION:
+        return None
+    return packet
+
+
+def packet_record(packet):
+    """
+    Converts a packet into a TraceRecord in pixel coordinates, for ReplayDetector.
+    """
+    n = int(packet["handCount"])
+    size = int(packet["width"]), int(packet["height"])
+    landmarks = packet["landmarks"][:n].astype(np.float32) / COORD_SCALE
+    landmarks *= (size[0], size[1], 1)
+    return TraceRecord(float(packet["t"]), int(packet["seq"]), size, landmarks,
+                       packet["right"][:n].astype(bool), packet["score"][:n] / np.float32(255))
+
+
+class _Client:
+    # One subscriber: where to send, how often, and whether a newer packet is waiting
+    def __init__(self, address, interval, send):
+        self.address = address
+        self.interval = interval
+        self.send = send
+        self.event = asyncio.Event()
+        self.lastSeen = time.monotonic()
+        self.sent = 0
+        self.coalesced = 0
+        self.pending = 0
+
+
+class StreamServer:
+    """
+    Streams landmark packets to remote clients over UDP and WebSocket from an
+    asyncio loop on a background thread.
+
+    publish() only encodes the packet and hands it to the loop, so the
+    capture and detection loop never waits on the network. Each client has
+    its own sender that forwards only the newest packet, at most at its own
+    rate: packets published while a client is rate limited or still sending
+    replace each other instead of queueing, so a slow client only ever falls
+    behind itself.
+
+    UDP clients subscribe by sending a SUBSCRIBE datagram and must repeat it
+    within clientTimeout; WebSocket clients (needs the websockets package)
+    connect to ws://host:wsPort/?rate=Hz.
+
+    Parameters:
+    host (str): Address to bind, "0.0.0.0" to serve other machines.
+    udpPort (int): UDP port, or None for no UDP.
+    wsPort (int): WebSocket port, or None for no WebSocket.
+    rate (float): Default maximum packets per second per client.
+    clientTimeout (float): Seconds without a SUBSCRIBE before a UDP client is dropped.
+    """
+    def __init__(self, host="127.0.0.1", udpPort=5005, wsPort=None, rate=60.0, clientTimeout=5.0):
+        self.host = host
+        self.udpPort = udpPort
+        self.wsPort = wsPort
+        self.rate = rate
+        self.clientTimeout = clientTimeout
+        self.clients = {}
+        self.latest = None
+        self.published = 0
+        self.loop = None
+        self._packet = np.zeros((), PACKET_DTYPE)
+        self._thread = None
+        self._ready = threading.Event()
+        self._stopping = None
+        self._senders = set()
+        self._udp = None
+        self._error = None
+
+    def start(self):
+        """
+        Starts the server thread and returns self once the sockets are bound.
+        """
+        self._thread = threading.Thread(target=self._run, name="stream-server", daemon=True)
+        self._thread.start()
+        self._ready.wait()
+        if self._error is not None:
+            raise self._error
+        return self
+
+    def _run(self):
+        self.loop = asyncio.new_event_loop()
+        try:
+            self.loop.run_until_complete(self._serve())
+        except Exception as e:
+            self._error = e
+            self._ready.set()
+        finally:
+            self.loop.close()
+
+    async def _serve(self):
+        self._stopping = asyncio.Event()
+        servers = []
+        if self.udpPort is not None:
+            self._udp, _ = await self.loop.create_datagram_endpoint(
+                lambda: _SubscribeProtocol(self), local_addr=(self.host, self.udpPort))
+            self.udpPort = self._udp.get_extra_info("sockname")[1]
+        if self.wsPort is not None:
+            import websockets
+            server = await websockets.serve(self._ws_handler, self.host, self.wsPort)
+            self.wsPort = server.sockets[0].getsockname()[1]
+            servers.append(server)
+        self._ready.set()
+
+        await self._stopping.wait()
+        for client in list(self.clients.values()):
+            client.event.set()
+        # UDP senders may be rate-limited or waiting on their client, so they are cancelled
+        # and awaited here; the loop closes right after and would destroy them pending
+        for task in self._senders:
+            task.cancel()
+        await asyncio.gather(*self._senders, return_exceptions=True)
+        if self._udp is not None:
+            self._udp.close()
+        for server in servers:
+            server.close()
+            await server.wait_closed()
+
+    def _interval(self, rate):
+        rate = rate or self.rate
+        return 1.0 / rate if rate else 0.0
+
+    def _subscribe_udp(self, address, rate):
+        client = self.clients.get(address)
+        if client is None:
+            client = self.clients[address] = _Client(address, self._interval(rate),
+                                                     lambda packet: self._udp.sendto(packet, address))
+            task = self.loop.create_task(self._sender(client))
+            self._senders.add(task)
+            task.add_done_callback(self._senders.discard)
+        client.lastSeen = time.monotonic()
+
+    async def _ws_handler(self, websocket, path=None):
+        request = getattr(websocket, "request", None)
+        path = request.path if request is not None else (path or "/")
+        rate = float(parse_qs(urlparse(path).query).get("rate", ["0"])[0])
+        address = ("ws",) + tuple(websocket.remote_address[:2])
+        client = self.clients[address] = _Client(address, self._interval(rate), websocket.send)
+        client.lastSeen = float("inf")   # lives as long as the connection
+        try:
+            await self._sender(client)
+        finally:
+            self.clients.pop(address, None)
+
+    async def _sender(self, client):
+        while not self._stopping.is_set():
+            if time.monotonic() - client.lastSeen > self.clientTimeout:
+                break
+            try:
+                await asyncio.wait_for(client.event.wait(), self.clientTimeout)
+            except asyncio.TimeoutError:
+                continue
+            client.event.clear()
+            if self._stopping.is_set():
+                break
+            client.coalesced += max(client.pending - 1, 0)
+            client.pending = 0
+            try:
+                result = client.send(self.latest)
+                if asyncio.iscoroutine(result):
+                    await result
+            except Exception:
+                # Closed connection or unreachable peer
+                break
+            client.sent += 1
+            if client.interval:
+                await asyncio.sleep(client.interval)
+        self.clients.pop(client.address, None)
+
+    def _broadcast(self, packet):
+        self.latest = packet
+        for client in self.clients.values():
+            client.pending += 1
+            client.event.set()
+
+    def publish(self, detector, size, gesture=None, t=None):
+        """
+        Encodes the detector's current hands and queues them for every client. Never blocks.
+
+        Parameters:
+        detector (handDetector): Detector after findHands and evaluateHands.
+        size (tuple): (width, height) of the frame.
+        gesture (Gesture or str): Active gesture, or None.
+        t (float): Capture timestamp, defaults to time.time().
+        """
+        packet = encode_packet(detector, self.published, size, gesture, t, self._packet)
+        self.published += 1
+        if self.loop is not None and not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(self._broadcast, packet)
+
+    def stats(self):
+        return {
+            "published": self.published,
+            "clients": {str(address): {"sent": client.sent, "coalesced": client.coalesced}
+                        for address, client in list(self.clients.items())},
+        }
+
+    def stop(self):
+        """
+        Stops the server: cancels and awaits every client sender, closes the sockets and
+        waits for the server thread.
+        """
+        if self.loop is not None and self._stopping is not None and not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(self._stopping.set)
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+
+
+class _SubscribeProtocol(asyncio.DatagramProtocol):
+    def __init__(self, server):
+        self.server = server
+
+    def datagram_received(self, data, address):
+        if len(data) == SUBSCRIBE.size:
+            magic, rate = SUBSCRIBE.unpack(data)
+            if magic == SUBSCRIBE_MAGIC:
+                self.server._subscribe_udp(address, rate)
+
+
+class _ReceiveProtocol(asyncio.DatagramProtocol):
+    def __init__(self, client):
+        self.client = client
+
+    def datagram_received(self, data, address):
+        self.client._received(data)
+
+
+class StreamClient:
+    """
+    Receives a StreamServer's packets and serves them with the read() interface
+    of a frame source, so a ReplayDetector over it replaces local detection:
+
+        client = StreamClient("vision-box", 5005).start()
+        MouseController2.main(capture=client, detector=ReplayDetector(client, maxHands=1))
+
+    read() waits for a packet newer than the last one and returns a blank frame
+    of the streamed size, as a ReplayFrame carrying the packet's hands; self.record
+    holds the latest. When nothing arrives within timeout it reports a frame without hands.
+
+    Parameters:
+    host (str): Server address.
+    port (int): Server UDP or WebSocket port.
+    transport (str): "udp" or "ws".
+    rate (float): Requested packets per second, or None for the server default.
+    timeout (float): Seconds read() waits for a packet.
+    """
+    def __init__(self, host="127.0.0.1", port=5005, transport="udp", rate=None, timeout=0.5):
+        self.host = host
+        self.port = port
+        self.transport = transport
+        self.rate = rate
+        self.timeout = timeout
+        self.record = None
+        self.packet = None
+        self.received = 0
+        self.invalid = 0
+        self.running = False
+        self.loop = None
+        self._latest = None
+        self._lastRead = None
+        self._size = None
+        self._blank = None
+        self._condition = threading.Condition()
+        self._thread = None
+
+    def start(self):
+        if self.running:
+            return self
+        self.running = True
+        self._thread = threading.Thread(target=self._run, name="stream-client", daemon=True)
+        self._thread.start()
+        return self
+
+    open = start
+
+    def _run(self):
+        self.loop = asyncio.new_event_loop()
+        try:
+            self.loop.run_until_complete(self._receive_ws() if self.transport == "ws" else self._receive_udp())
+        finally:
+            self.loop.close()
+
+    async def _receive_udp(self):
+        transport, _ = await self.loop.create_datagram_endpoint(lambda: _ReceiveProtocol(self),
+                                                                remote_addr=(self.host, self.port))
+        subscribe = SUBSCRIBE.pack(SUBSCRIBE_MAGIC, self.rate or 0.0)
+        try:
+            # Resubscribe well within the server's client timeout
+            while self.running:
+                transport.sendto(subscribe)
+                await asyncio.sleep(1.0)
+        finally:
+            transport.close()
+
+    async def _receive_ws(self):
+        import websockets
+        query = f"?rate={self.rate}" if self.rate else ""
+        async with websockets.connect(f"ws://{self.host}:{self.port}/{query}") as websocket:
+            while self.running:
+                try:
+                    data = await asyncio.wait_for(websocket.recv(), 1.0)
+                except asyncio.TimeoutError:
+                    continue
+                self._received(data)
+
+    def _received(self, data):
+        packet = decode_packet(data)
+        if packet is None:
+            self.invalid += 1
+            return
+        with self._condition:
+            self.received += 1
+            self._latest = packet
+            self._condition.notify_all()
+
+    def read(self):
+        with self._condition:
+            self._condition.wait_for(lambda: self._latest is not self._lastRead or not self.running, self.timeout)
+            packet = self._latest
+        if not self.running:
+            return False, None
+        if packet is None:
+            return True, self._frame((640, 480))
+        if packet is self._lastRead:
+            # Silent server: report the hands as gone rather than repeating stale ones
+            self.record = TraceRecord(time.time(), self.record.index, self.record.size,
+                                      np.zeros((0, htm.NUM_LANDMARKS, 3), np.float32), np.zeros(0, bool),
+                                      np.zeros(0, np.float32))
+        else:
+            self._lastRead = self.packet = packet
+            self.record = packet_record(packet)
+        return True, replay_frame(self._frame(self.record.size), self.record)
+
+    def _frame(self, size):
+        w, h = size
+        if self._blank is None or self._blank.shape[:2] != (h, w):
+            self._blank = np.zeros((h, w, 3), np.uint8)
+        return self._blank.copy()
+
+    def describe(self):
+        return f"stream {self.transport}://{self.host}:{self.port}, rate={self.rate or 'server default'}"
+
+    def report(self):
+        return {"received": self.received, "invalid": self.invalid}
+
+    def release(self):
+        self.running = False
+        with self._condition:
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+
+    stop = release
+
+
+def serve(server, capture=None, maxHands=MAX_HANDS, gestures="gestures.json", inferenceWidth=None):
+    """
+    Runs local detection and publishes every frame to the server's clients until interrupted.
+    """
+    from CaptureModule import Capture
+    from GestureModule import GestureEngine
+    from PipelineModule import Pipeline
+
+    cap = (capture or Capture()).open()
+    print(cap.describe())
+    detector = htm.handDetector(maxHands=maxHands, inferenceWidth=inferenceWidth, mirror=True)
+    engine = GestureEngine.load(gestures)
+
+    def process(img, t):
+        detector.findHands(img, draw=False)
+        detector.evaluateHands()
+        server.publish(detector, (img.shape[1], img.shape[0]), engine.recognize(detector, t=t))
+        return None
+
+    pipeline = Pipeline(cap.read, process, lambda img, result: True, timestamps=True)
+    try:
+        pipeline.run()
+    except KeyboardInterrupt:
+        pass
+    print(pipeline.report())
+    print(server.stats())
+    cap.release()
+
+
+def loopback(frames=120, transport="udp", rate=1000.0, timeout=2.0):
+    """
+    Streams a synthetic landmark trace from a StreamServer to a StreamClient over
+    127.0.0.1 in lockstep and checks what arrives against what was sent.
+
+    Returns:
+    dict: sent and received packet counts, the largest landmark error in pixels,
+          the quantization step it is allowed, the largest send-to-read latency in
+          milliseconds, and ok when every packet arrived within the step.
+    """
+    from BenchmarkModule import synthetic_records
+    from TraceModule import TraceReplay, ReplayDetector
+
+    replay = TraceReplay(records=synthetic_records(frames))
+    sender = ReplayDetector(replay, maxHands=MAX_HANDS)
+    server = StreamServer("127.0.0.1", udpPort=0 if transport == "udp" else None,
+                          wsPort=0 if transport == "ws" else None, rate=rate).start()
+    client = StreamClient("127.0.0.1", server.udpPort if transport == "udp" else server.wsPort, transport,
+                          rate, timeout).start()
+    receiver = ReplayDetector(client, maxHands=MAX_HANDS)
+    sent = {}
+    received = 0
+    error = latency = 0.0
+    try:
+        # UDP clients are only known to the server once their first SUBSCRIBE arrived
+        deadline = time.monotonic() + timeout
+        while client.received == 0 and time.monotonic() < deadline:
+            server.publish(sender, (640, 480))
+            time.sleep(0.01)
+        # and the lockstep starts once the last of those was read
+        base = server.published
+        while time.monotonic() < deadline:
+            success, frame = client.read()
+            if not success or (frame.record is not None and frame.record.index == base - 1):
+                break
+        while True:
+            success, img = replay.read()
+            if not success:
+                break
+            sender.findHands(img)
+            sender.evaluateHands()
+            sent[server.published] = (sender.landmarks[:sender.handCount].copy(), time.perf_counter())
+            server.publish(sender, img.record.size, t=img.record.t)
+            success, frame = client.read()
+            if not success or frame.record is None or frame.record.index not in sent:
+                continue
+            receiver.findHands(frame)
+            landmarks, tSent = sent[frame.record.index]
+            received += 1
+            latency = max(latency, time.perf_counter() - tSent)
+            if receiver.handCount != len(landmarks):
+                error = float("inf")
+            elif len(landmarks):
+                error = max(error, float(np.abs(receiver.landmarks[:receiver.handCount, :, :2]
+                                                - landmarks[:, :, :2]).max()))
+    finally:
+        client.release()
+        server.stop()
+    step = max(replay.records[0].size) / COORD_SCALE
+    return {"sent": server.published - base, "received": received, "maxErrorPx": error, "stepPx": step,
+            "maxLatencyMs": latency * 1000, "ok": received == frames and error <= step}
+
+
+def main():
+    from CaptureModule import add_capture_arguments, capture_from_args
+
+    parser = argparse.ArgumentParser(description="Stream hand landmarks to other machines, or control the mouse from a stream")
+    commands = parser.add_subparsers(dest="command", required=True)
+    server = add_capture_arguments(commands.add_parser("serve", help="Detect locally and stream the landmarks"))
+    server.add_argument("--host", default="0.0.0.0")
+    server.add_argument("--udp-port", type=int, default=5005)
+    server.add_argument("--ws-port", type=int, help="Also serve WebSocket clients on this port")
+    server.add_argument("--rate", type=float, default=60.0, help="Default packets per second per client")
+    server.add_argument("--hands", type=int, default=MAX_HANDS, choices=range(1, MAX_HANDS + 1))
+    client = commands.add_parser("client", help="Drive the mouse from a remote stream")
+    client.add_argument("--host", default="127.0.0.1")
+    client.add_argument("--port", type=int, default=5005)
+    client.add_argument("--ws", action="store_true", help="Connect over WebSocket instead of UDP")
+    client.add_argument("--rate", type=float)
+    client.add_argument("--gestures", default="gestures.json")
+    check = commands.add_parser("loopback", help="Stream a synthetic trace over 127.0.0.1 and check it arrives")
+    check.add_argument("--frames", type=int, default=120)
+    check.add_argument("--ws", action="store_true", help="Check the WebSocket transport instead of UDP")
+    args = parser.parse_args()
+
+    if args.command == "loopback":
+        result = loopback(args.frames, "ws" if args.ws else "udp")
+        print(result)
+        raise SystemExit(0 if result["ok"] else 1)
+
+    if args.command == "serve":
+        server = StreamServer(args.host, args.udp_port, args.ws_port, args.rate).start()
+        try:
+            serve(server, capture_from_args(args), args.hands, inferenceWidth=args.inference_width)
+        finally:
+            server.stop()
+    else:
+        import MouseController2
+        from TraceModule import ReplayDetector
+        client = StreamClient(args.host, args.port, "ws" if args.ws else "udp", args.rate)
+        try:
+            MouseController2.main(gestures=args.gestures, capture=client, detector=ReplayDetector(client, maxHands=1))
+        finally:
+            client.release()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,269 @@
+import argparse
+import struct
+import time
+import cv2
+import numpy as np
+import HandTrackingModule as htm
+from CaptureModule import Capture, add_capture_arguments, capture_from_args
+
+MAGIC = b"HGTR"
+VERSION = 1
+FILE_HEADER = struct.Struct("<4sHH")       # magic, version, maxHands
+RECORD_HEADER = struct.Struct("<dIHHBI")   # timestamp, frame index, width, height, hand count, jpeg size
+
+
+class TraceRecord:
+    """
+    One recorded frame: timestamp, frame size, per-hand landmarks and the optional JPEG frame.
+    """
+    __slots__ = ("t", "index", "size", "landmarks", "rightHand", "scores", "jpeg")
+
+    def __init__(self, t, index, size, landmarks, rightHand, scores, jpeg=b""):
+        self.t = t
+        self.index = index
+        self.size = size
+        self.landmarks = landmarks
+        self.rightHand = rightHand
+        self.scores = scores
+        self.jpeg = jpeg
+
+    def image(self):
+        """
+        Decodes the recorded frame, or returns None when frames were not recorded.
+        """
+        if not self.jpeg:
+            return None
+        return cv2.imdecode(np.frombuffer(self.jpeg, np.uint8), cv2.IMREAD_COLOR)
+
+
+class ReplayFrame(np.ndarray):
+    """
+    A replayed frame that carries the TraceRecord it was read from as self.record,
+    so the landmarks always come with their own frame however far the capture
+    stage reads ahead.
+    """
+    def __array_finalize__(self, obj):
+        self.record = getattr(obj, "record", None)
+
+
+def replay_frame(img, record):
+    """
+    Returns img as a ReplayFrame tagged with record, without copying it.
+    """
+    frame = img.view(ReplayFrame)
+    frame.record = record
+    return frame
+
+
+class TraceRecorder:
+    """
+    Writes per-frame landmarks, handedness, timestamps and optionally
+    JPEG-compressed frames to a compact binary trace file.
+
+    Parameters:
+    path (str): Output file.
+    maxHands (int): Maximum number of hands per record.
+    saveFrames (bool): Also store every frame as JPEG.
+    quality (int): JPEG quality for stored frames.
+    """
+    def __init__(self, path, maxHands=2, saveFrames=False, quality=80):
+        self.maxHands = maxHands
+        self.saveFrames = saveFrames
+        self.quality = quality
+        self.count = 0
+        self.file = open(path, "wb")
+        self.file.write(FILE_HEADER.pack(MAGIC, VERSION, maxHands))
+
+    def record(self, detector, img, t=None):
+        """
+        Appends the detector's current hands. img is the frame findHands ran on, as
+        captured: a mirror=True detector already reports mirrored landmarks, and a
+        flipped frame would be flipped again by the mirror=True detector it is replayed into.
+        """
+        t = time.time() if t is None else t
+        n = min(detector.handCount, self.maxHands)
+        h, w = img.shape[:2]
+        jpeg = b""
+        if self.saveFrames:
+            jpeg = cv2.imencode(".jpg", img, [cv2.IMWRITE_JPEG_QUALITY, self.quality])[1].tobytes()
+
+        self.file.write(RECORD_HEADER.pack(t, self.count, w, h, n, len(jpeg)))
+        self.file.write(detector.landmarks[:n].astype("<f4").tobytes())
+        self.file.write(detector.rightHand[:n].astype(np.uint8).tobytes())
+        self.file.write(detector.scores[:n].astype("<f4").tobytes())
+        self.file.write(jpeg)
+        self.count += 1
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def read_trace(path):
+    """
+    Yields the TraceRecords of a trace file in order.
+    """
+    with open(path, "rb") as f:
+        magic, version, maxHands = FILE_HEADER.unpack(f.read(FILE_HEADER.size))
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} hand trace")
+        while True:
+            header = f.read(RECORD_HEADER.size)
+            if len(header) < RECORD_HEADER.size:
+                return
+            t, index, w, h, n, jpegSize = RECORD_HEADER.unpack(header)
+            landmarks = np.frombuffer(f.read(n * htm.NUM_LANDMARKS * 12), "<f4").reshape(n, htm.NUM_LANDMARKS, 3)
+            rightHand = np.frombuffer(f.read(n), np.uint8).astype(bool)
+            scores = np.frombuffer(f.read(n * 4), "<f4")
+            yield TraceRecord(t, index, (w, h), landmarks, rightHand, scores, f.read(jpegSize))
+
+
+class TraceReplay:
+    """
+    Replays a trace as a frame source with the cv2.VideoCapture read() interface.
+
+    read() returns the recorded frame, or a blank frame of the recorded size when
+    only landmarks were stored, as a ReplayFrame carrying its record. self.record
+    holds the record read last.
+
+    Parameters:
+    path (str): Trace file.
+    realtime (bool): Pace frames by their recorded timestamps instead of as fast as possible.
+    loop (bool): Start over at the end of the trace.
+    records (list): TraceRecords to replay instead of reading path.
+    """
+    def __init__(self, path=None, realtime=False, loop=False, records=None):
+        self.records = list(read_trace(path)) if records is None else list(records)
+        self.realtime = realtime
+        self.loop = loop
+        self.position = -1
+        self.record = None
+        self._blank = None
+        self._start = None
+
+    def read(self):
+        self.position += 1
+        if self.position >= len(self.records):
+            if not self.loop or not self.records:
+                return False, None
+            self.position = 0
+            self._start = None
+        record = self.records[self.position]
+
+        if self.realtime:
+            now = time.perf_counter()
+            if self._start is None:
+                self._start = now - (record.t - self.records[0].t)
+            delay = self._start + (record.t - self.records[0].t) - now
+            if delay > 0:
+                time.sleep(delay)
+
+        self.record = record
+        img = record.image()
+        if img is None:
+            w, h = record.size
+            if self._blank is None or self._blank.shape[:2] != (h, w):
+                self._blank = np.zeros((h, w, 3), np.uint8)
+            img = self._blank.copy()
+        return True, replay_frame(img, record)
+
+    def release(self):
+        pass
+
+
+class ReplayDetector(htm.handDetector):
+    """
+    A handDetector that takes its landmarks from a TraceReplay instead of
+    running MediaPipe, so the gesture and actuation layers can be driven
+    from a recording without a camera or an inference graph.
+    """
+    def __init__(self, replay, maxHands=2, overlay=None):
+        super().__init__(maxHands=maxHands, overlay=overlay)
+        self.replay = replay
+        self.results = None
+
+    def findHands(self, img, draw=True):
+        """
+        Loads the landmarks of the record img was read with, or of the replay's
+        latest record when img is not a ReplayFrame. img is left untouched.
+        """
+        record = getattr(img, "record", None)
+        if record is None:
+            record = self.replay.record
+        n = 0 if record is None else min(len(record.landmarks), self.maxHands)
+        if n:
+            self.landmarks[:n] = record.landmarks[:n]
+            self.rightHand[:n] = record.rightHand[:n]
+            self.scores[:n] = record.scores[:n]
+            np.copyto(self.pixels[:n], self.landmarks[:n, :, :2], casting='unsafe')
+        self.handCount = n
+        self.confidence = float(self.scores[:n].min()) if n else 0.0
+        return img
+
+
+def load_points(path, landmark=8):
+    """
+    Returns (t, points) for one landmark of the first hand in every record that
+    has a hand, in the format FilterModule.benchmark expects.
+    """
+    records = [record for record in read_trace(path) if len(record.landmarks)]
+    t = np.array([record.t for record in records])
+    points = np.array([record.landmarks[0, landmark, :2] for record in records], float)
+    return t, points
+
+
+def record_camera(path, saveFrames=False, maxHands=2, capture=None, inferenceWidth=None):
+    """
+    Records a trace from a live camera, or a video file or image directory
+    Capture, until 'q' is pressed or the source ends.
+    """
+    cap = (capture or Capture()).open()
+    print(cap.describe())
+    # Landmarks are recorded mirrored, as the controllers see them, and frames as captured
+    detector = htm.handDetector(maxHands=maxHands, inferenceWidth=inferenceWidth, mirror=True)
+    with TraceRecorder(path, maxHands, saveFrames) as recorder:
+        while True:
+            success, img = cap.read()
+            if not success:
+                break
+            detector.findHands(img, draw=False)
+            recorder.record(detector, img)
+            img = cv2.flip(img, 1, dst=img)
+
+            cv2.putText(img, f"REC {recorder.count}", (20, 50), cv2.FONT_HERSHEY_PLAIN, 2, (0, 0, 255), 2)
+            cv2.imshow("Image", img)
+            if cv2.waitKey(1) & 0xff == ord('q'):
+                break
+    cap.release()
+    cv2.destroyAllWindows()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Record and inspect hand landmark traces")
+    commands = parser.add_subparsers(dest="command", required=True)
+    record = commands.add_parser("record", help="Record a trace from the camera")
+    record.add_argument("path")
+    record.add_argument("--frames", action="store_true", help="Also store JPEG frames")
+    record.add_argument("--hands", type=int, default=2)
+    add_capture_arguments(record)
+    info = commands.add_parser("info", help="Summarize a trace")
+    info.add_argument("path")
+    args = parser.parse_args()
+
+    if args.command == "record":
+        record_camera(args.path, args.frames, args.hands, capture_from_args(args), args.inference_width)
+    else:
+        records = list(read_trace(args.path))
+        duration = records[-1].t - records[0].t if records else 0.0
+        withHands = sum(1 for record in records if len(record.landmarks))
+        withFrames = sum(1 for record in records if record.jpeg)
+        print(f"{len(records)} frames over {duration:.1f}s, {withHands} with hands, {withFrames} with images")
+
+
+if __name__ == "__main__":
+    main()